@@ -0,0 +1,219 @@
+# ───────────────────────────────────────────────────────────────────────
+# ARCHIVE INDEX (<archive>.idx sidecar for random-access restore)
+# ───────────────────────────────────────────────────────────────────────
+import fnmatch
+import io
+import os
+import tarfile
+import zipfile
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from backup_tool.manifest import HASH_CHUNK, MANIFEST_NAME, new_hasher
+from backup_tool.parallel_zip import ZIP_ZSTD, copy_member, zstd_reader
+
+INDEX_SUFFIX = ".idx"
+FRAME_BYTES = 4 << 20   # tar.zst: a new zstd frame after this much input, so a restore decompresses at most this much extra
+
+_HEADER = "# offset\tskip\tpacked\tsize\tmethod\tcrc32\tblake2b-256\tpath\n"
+
+
+class IndexEntry(NamedTuple):
+    """
+    Where one member's data is. Zip: `offset` is its local header, `packed` the
+    compressed size, `method` and `crc` as in the central directory. tar.zst: `offset`
+    is the start of the zstd frame holding it and `skip` the decompressed bytes
+    before its data in that frame (method ZIP_ZSTD, packed and crc unknown).
+    """
+    path: str
+    offset: int
+    skip: int
+    packed: int
+    size: int
+    method: int
+    crc: Optional[int]
+    digest: Optional[str]
+
+
+def index_path(archive: Path) -> Path:
+    return archive.with_name(archive.name + INDEX_SUFFIX)
+
+
+def write_index(archive: Path, entries: Iterable[IndexEntry]) -> Path:
+    """Atomically write <archive>.idx, one tab-separated line per member (path last)."""
+    target = index_path(archive)
+    tmp = target.with_name(target.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8", newline="\n") as f:
+        f.write(_HEADER)
+        for e in entries:
+            crc = "-" if e.crc is None else f"{e.crc:08x}"
+            f.write(f"{e.offset}\t{e.skip}\t{e.packed}\t{e.size}\t{e.method}\t{crc}\t{e.digest or '-'}\t{e.path}\n")
+    os.replace(tmp, target)
+    return target
+
+
+def load_index(archive: Path) -> Optional[List[IndexEntry]]:
+    """The entries of <archive>.idx; None if there is none or it is older than the archive."""
+    path = index_path(archive)
+    try:
+        if path.stat().st_mtime < archive.stat().st_mtime:
+            return None
+    except FileNotFoundError:
+        return None
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("#") or not line.strip():
+                continue
+            offset, skip, packed, size, method, crc, digest, rel = line.rstrip("\n").split("\t", 7)
+            entries.append(IndexEntry(rel, int(offset), int(skip), int(packed), int(size), int(method),
+                                      None if crc == "-" else int(crc, 16), None if digest == "-" else digest))
+    return entries
+
+
+def read_manifest(archive: Path, entries: Iterable[IndexEntry]) -> Dict[str, Tuple[int, int, str]]:
+    """The archive's own manifest.tsv member as {rel_path: (size, mtime_ns, digest)}; empty if it has none."""
+    manifest = next((e for e in entries if e.path == MANIFEST_NAME), None)
+    if manifest is None:
+        return {}
+    buf = io.BytesIO()
+    with open(archive, "rb") as f:
+        read_entry(f, manifest, buf)
+    rows = {}
+    for line in buf.getvalue().decode("utf-8").splitlines():
+        if line.startswith("#") or not line.strip():
+            continue
+        digest, size, mtime_ns, rel = line.split("\t", 3)
+        rows[rel] = (int(size), int(mtime_ns), digest)
+    return rows
+
+
+def _with_digests(archive: Path, entries: List[IndexEntry]) -> List[IndexEntry]:
+    """`entries` with the BLAKE2b of each member taken from the archive's manifest.tsv, if it has one."""
+    rows = read_manifest(archive, entries)
+    return [e._replace(digest=rows[e.path][2]) if e.path in rows else e for e in entries]
+
+
+def index_zip(zip_path: Path) -> List[IndexEntry]:
+    """Entries of a zip from its central directory, with BLAKE2b from its manifest.tsv member if it has one."""
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        infos = [info for info in zf.infolist() if not info.is_dir()]
+    entries = [IndexEntry(i.filename, i.header_offset, 0, i.compress_size, i.file_size, i.compress_type, i.CRC, None)
+               for i in infos]
+    return _with_digests(zip_path, entries)
+
+
+def index_tar_zst(archive: Path) -> List[IndexEntry]:
+    """
+    Entries of a tar.zst without an index, found by reading it once. Offsets are
+    from the start of the stream, so restoring from such an index still
+    decompresses everything before the member.
+    """
+    with open(archive, "rb") as f:
+        with tarfile.open(fileobj=zstd_reader(f), mode="r|") as tar:
+            entries = [IndexEntry(m.name, 0, m.offset_data, 0, m.size, ZIP_ZSTD, None, None) for m in tar if m.isfile()]
+    return _with_digests(archive, entries)
+
+
+def ensure_index(archive: Path) -> List[IndexEntry]:
+    """The archive's index, built and saved first if it is missing or stale (archives made before indexing)."""
+    entries = load_index(archive)
+    if entries is None:
+        entries = index_zip(archive) if archive.name.endswith(".zip") else index_tar_zst(archive)
+        write_index(archive, entries)
+    return entries
+
+
+def path_matches(rel: str, patterns: Iterable[str]) -> bool:
+    """True if `rel` equals or glob-matches one of `patterns`, or lies under a pattern naming a folder."""
+    for p in patterns:
+        p = p.replace("\\", "/").strip("/")
+        if fnmatch.fnmatchcase(rel, p) or rel.startswith(p + "/"):
+            return True
+    return False
+
+
+def select(entries: Iterable[IndexEntry], patterns: Iterable[str]) -> List[IndexEntry]:
+    """The entries whose path matches one of `patterns` (see path_matches)."""
+    return [e for e in entries if path_matches(e.path, patterns)]
+
+
+class _Verifier:
+    """Passes writes on to `dest` while hashing them, to check a member against its BLAKE2b."""
+    def __init__(self, dest):
+        self._dest = dest
+        self.hasher = new_hasher()
+
+    def write(self, buf):
+        self.hasher.update(buf)
+        return self._dest.write(buf)
+
+
+def _skip(stream, count: int, name: str):
+    while count:
+        buf = stream.read(min(HASH_CHUNK, count))
+        if not buf:
+            raise ValueError(f"Truncated archive before {name!r}")
+        count -= len(buf)
+
+
+def _copy(stream, entry: IndexEntry, out):
+    remaining = entry.size
+    while remaining:
+        buf = stream.read(min(HASH_CHUNK, remaining))
+        if not buf:
+            raise ValueError(f"Truncated member {entry.path!r}")
+        remaining -= len(buf)
+        out.write(buf)
+
+
+def _check(entry: IndexEntry, out):
+    if entry.digest and out.hasher.hexdigest() != entry.digest:
+        raise ValueError(f"BLAKE2b mismatch for {entry.path!r}")
+
+
+def read_frame(f, entries: List[IndexEntry], open_dest: Callable[[IndexEntry], object],
+               on_done: Optional[Callable[[IndexEntry, Optional[ValueError]], None]] = None):
+    """
+    Stream tar.zst members that share one zstd frame (same offset, sorted by skip) in
+    a single decompression pass; open_dest(entry) returns a writable file for each,
+    which is closed after its member is written and checked. With `on_done`, each
+    member is reported as on_done(entry, None) once it passed its check, or with the
+    ValueError of a failed BLAKE2b check, and the rest of the frame is still read;
+    without it a failed check raises.
+    """
+    f.seek(entries[0].offset)
+    stream = zstd_reader(f)
+    pos = 0
+    for entry in entries:
+        _skip(stream, entry.skip - pos, entry.path)
+        error = None
+        with open_dest(entry) as dest:
+            out = _Verifier(dest) if entry.digest else dest
+            _copy(stream, entry, out)
+            try:
+                _check(entry, out)
+            except ValueError as e:
+                if on_done is None:
+                    raise
+                error = e
+        pos = entry.skip + entry.size
+        if on_done is not None:
+            on_done(entry, error)
+
+
+def read_entry(f, entry: IndexEntry, dest):
+    """
+    Stream the member `entry` from the open archive `f` into `dest`, reading only that
+    member (plus, for tar.zst, the part of its zstd frame before it). Raises
+    ValueError or zipfile.BadZipFile if the data does not match the index.
+    """
+    out = _Verifier(dest) if entry.digest else dest
+    if entry.crc is not None:  # zip member
+        copy_member(f, entry.offset, entry.packed, entry.method, entry.crc, out, entry.path)
+    else:
+        f.seek(entry.offset)
+        stream = zstd_reader(f)
+        _skip(stream, entry.skip, entry.path)
+        _copy(stream, entry, out)
+    _check(entry, out)
@@ -0,0 +1,184 @@
+# ───────────────────────────────────────────────────────────────────────
+# SINGLE-PASS ARCHIVE SNAPSHOTS (snapshot --archive)
+# ───────────────────────────────────────────────────────────────────────
+import os
+import tarfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Tuple
+
+from backup_tool.archive_index import FRAME_BYTES, IndexEntry, index_zip, write_index
+from backup_tool.config import LOAD_CONFIG
+from backup_tool.file_index import FileIndex
+from backup_tool.logger import setup_logger
+from backup_tool.manifest import MANIFEST_NAME, Manifest, new_hasher
+from backup_tool.parallel_zip import COMPRESS_LEVEL, COMPRESS_WORKERS, CODECS, ZIP_ZSTD, ArchiveStats, write_archive, zstd_end_frame, zstd_writer
+from backup_tool.tree_walker import walk_tree
+from backup_tool.utils import snapshot_excludes
+
+env = LOAD_CONFIG()
+BASE_BACKUP = Path(env.get("BASE_BACKUP", "backup")).resolve()
+LOGS_DIR = Path(env.get("LOGS_DIR", "logs")).resolve()
+
+ARCHIVE_FORMATS = ("zip", "tar.zst")
+
+GLOBAL_LOGGER = setup_logger(LOGS_DIR, "backup_cli")
+
+
+class _HashingReader:
+    """
+    File wrapper that feeds everything read through it into a BLAKE2b hasher. tarfile
+    has already written the header with `expected` bytes, so a file that shrank since
+    is padded with zeros up to that size (and flagged `short`) instead of aborting the
+    whole archive with "unexpected end of data".
+    """
+    def __init__(self, f, expected: int):
+        self._f = f
+        self._left = expected
+        self.short = False
+        self.hasher = new_hasher()
+
+    def read(self, size: int = -1) -> bytes:
+        want = self._left if size < 0 else min(size, self._left)
+        buf = self._f.read(want) if not self.short else b""
+        if len(buf) < want:
+            self.short = True
+            buf += bytes(want - len(buf))
+        self._left -= len(buf)
+        self.hasher.update(buf)
+        return buf
+
+    def digest(self):
+        """BLAKE2b hex of the member, or None if it had to be padded."""
+        return None if self.short else self.hasher.hexdigest()
+
+
+class _BytesReader:
+    """Minimal read() over an in-memory buffer, for tarfile.addfile()."""
+    def __init__(self, data: bytes):
+        self._data = memoryview(data)
+        self._pos = 0
+
+    def read(self, size: int = -1) -> bytes:
+        end = len(self._data) if size < 0 else self._pos + size
+        buf = self._data[self._pos:end].tobytes()
+        self._pos += len(buf)
+        return buf
+
+
+def _write_tar_zst(target: Path, members, on_member, trailer, level: int, workers: int, index: list) -> ArchiveStats:
+    """
+    Stream the members into a zstd-compressed tar; zstd itself spreads the work over
+    `workers` threads. A new zstd frame starts once FRAME_BYTES were written since the
+    last one, and every member's frame offset is appended to `index`, so one member
+    can later be restored without decompressing the archive up to it.
+    """
+    stats = ArchiveStats("zstd", level, workers)
+    with open(target, "wb") as raw:
+        zout = zstd_writer(raw, level, workers)
+        with tarfile.open(fileobj=zout, mode="w", format=tarfile.PAX_FORMAT) as tar:
+            frame_offset, frame_start = 0, tar.offset
+
+            def _add(info, fileobj, digest_of=None):
+                nonlocal frame_offset, frame_start
+                if tar.offset - frame_start >= FRAME_BYTES:
+                    zstd_end_frame(zout)
+                    frame_offset, frame_start = raw.tell(), tar.offset
+                tar.addfile(info, fileobj)
+                padded = (info.size + tarfile.BLOCKSIZE - 1) // tarfile.BLOCKSIZE * tarfile.BLOCKSIZE
+                data_start = tar.offset - padded
+                digest = digest_of() if digest_of else None
+                index.append(IndexEntry(info.name, frame_offset, data_start - frame_start, 0, info.size, ZIP_ZSTD, None, digest))
+                return digest
+
+            for path, arcname in members:
+                try:
+                    f = open(path, "rb")
+                except (FileNotFoundError, PermissionError):
+                    stats.skipped += 1
+                    continue
+                with f:
+                    info = tar.gettarinfo(fileobj=f, arcname=arcname)
+                    reader = _HashingReader(f, info.size)
+                    digest = _add(info, reader, reader.digest)
+                stats.files += 1
+                stats.bytes_in += info.size
+                stats.failed += reader.short
+                on_member(arcname, digest)
+            for arcname, data in trailer().items():
+                info = tarfile.TarInfo(arcname)
+                info.size = len(data)
+                info.mtime = int(datetime.now().timestamp())
+                _add(info, _BytesReader(data))
+        zout.close()
+    stats.bytes_out = target.stat().st_size
+    stats.seconds = time.monotonic() - stats.started
+    return stats
+
+
+def archive_backup(args, src: Path, job: str, fmt: str) -> Tuple[Path, ArchiveStats]:
+    """
+    Stream `src` straight into BASE_BACKUP/<job>/Backup_full_<timestamp>.<fmt> in one
+    read pass: the same .igbackup exclusions as a folder snapshot, every file hashed
+    while it is compressed, the job index updated and the manifest stored inside the
+    archive as manifest.tsv. Nothing the size of the snapshot is written uncompressed.
+    An <archive>.idx index is written next to it for `backup restore`.
+
+    fmt "zip" uses the parallel zip engine (COMPRESS_CODEC/LEVEL, one process per
+    core, already-compressed files stored); "tar.zst" is one multi-threaded zstd
+    stream. Returns (archive path, stats), or raises; the caller logs and notifies.
+    """
+    if fmt not in ARCHIVE_FORMATS:
+        raise ValueError(f"Unknown archive format '{fmt}' (choose from {', '.join(ARCHIVE_FORMATS)})")
+    base_dst = BASE_BACKUP / job
+    base_dst.mkdir(parents=True, exist_ok=True)
+    target = base_dst / datetime.now().strftime(f"Backup_full_%d-%m-%Y_%H-%M.{fmt}")
+    tmp = target.with_name(target.name + ".tmp")
+
+    excludes = snapshot_excludes(src)
+    index = FileIndex(base_dst)
+    manifest = Manifest()
+    pending = {}  # arcname -> stat, until the member is written
+
+    def _members():
+        for rel, entry in walk_tree(src, dir_excluded=excludes.prunes_dir):
+            st = entry.stat()
+            if excludes.should_ignore(rel, st):
+                continue
+            pending[rel] = st
+            yield Path(entry.path), rel
+
+    def _written(arcname: str, digest: Optional[str]):
+        st = pending.pop(arcname)
+        if digest is None:
+            # Shrank while it was archived: the member is zero-padded, so the manifest
+            # says "-" and the job index is left alone for the next run to copy it again.
+            GLOBAL_LOGGER.warning(f"[⚠️ ARCHIVE] {arcname} changed size while archived; stored padded and marked failed")
+            manifest.add(arcname, st, "-")
+            return
+        index.update(arcname, st, digest)
+        manifest.add(arcname, st, digest)
+
+    def _manifest():
+        return {MANIFEST_NAME: "".join(manifest.lines()).encode("utf-8")}
+
+    workers = getattr(args, "workers", None) or COMPRESS_WORKERS
+    try:
+        if fmt == "zip":
+            stats = write_archive(None, tmp, workers=workers, members=_members(), on_member=_written, trailer=_manifest)
+        else:
+            level = COMPRESS_LEVEL if COMPRESS_LEVEL is not None else CODECS["zstd"][1]
+            entries = []
+            stats = _write_tar_zst(tmp, _members(), _written, _manifest, level, workers, entries)
+        os.replace(tmp, target)
+        write_index(target, index_zip(target) if fmt == "zip" else entries)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    finally:
+        index.close()
+    GLOBAL_LOGGER.info(f"[🗜️ ARCHIVE] {target.name}: {stats.report()}")
+    for line in stats.type_report(top=5):
+        GLOBAL_LOGGER.info(f"    {line}")
+    return target, stats
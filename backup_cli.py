@@ -9,6 +9,7 @@ A fully featured CLI backup tool with:
 - Automatic compression of old snapshots
 - test/dry-run mode
 - Manual compress/decompress
+- Restore of single files from archived snapshots
 - Cloud-sync stubs
 - Per-command help system
 
@@ -29,10 +30,12 @@ from pathlib import Path
 
 from backup_tool.get_help import print_help
 from backup_tool.backup_job_mane import run_job, start_job, status_jobs, stop_job
+from backup_tool.daemon import run_daemon
+from backup_tool.maintenance import run_maintenance
 from backup_tool.utils import show_history
 from backup_tool.cleanup_cmd import cleanup_with_prompt
 from backup_tool.config import (LOAD_CONFIG)
-from backup_tool.compress_decompress import compress_snapshot, decompress_snapshot, manual_snapshot, sync_cloud
+from backup_tool.compress_decompress import compress_snapshot, decompress_snapshot, manual_snapshot, restore_snapshot, sync_cloud
 from backup_tool.setting import handle_settings_command
 from backup_tool.test_suite import test_job
 from backup_tool.logger import setup_logger
@@ -70,6 +73,13 @@ def build_parser():
     sp_snapshot.add_argument("-s", "--source", required=True, help="Source folder to back up")
     sp_snapshot.add_argument("-n", "--name", required=True, help="Backup job name")
     sp_snapshot.add_argument("-m", "--tag", type=str, help="Optional tag/message for this snapshot")
+    sp_snapshot.add_argument("-w", "--workers", type=int, default=None, help="Number of parallel copy workers (default: COPY_WORKERS)")
+    sp_snapshot.add_argument("--incremental", action="store_true", help="Hard-link files unchanged since the previous full snapshot")
+    sp_snapshot.add_argument("--dedup", action="store_true", help="Store file contents once in BASE_BACKUP/.objects and hard-link them")
+    sp_snapshot.add_argument("--pack", action="store_true", help="Append files smaller than PACK_THRESHOLD_KB into pack segments")
+    sp_snapshot.add_argument("--resume", action="store_true", help="Continue the newest unfinished snapshot of the job instead of starting over")
+    sp_snapshot.add_argument("--archive", nargs="?", const="zip", choices=["zip", "tar.zst"], default=None, help="Stream the snapshot straight into one archive (zip or tar.zst) instead of a folder")
+    sp_snapshot.add_argument("--auto-restart", action="store_true", help="Retry a crashed snapshot with --resume (relauncher.py)")
     sp_snapshot.set_defaults(func=manual_snapshot)
 
     # Settings
@@ -113,11 +123,16 @@ def build_parser():
     sp_start.add_argument("-e", "--exclude", help="Path to exclude-list file (default: <SOURCE>/.igbackup)")
     sp_start.add_argument("--compress-days", type=int, default=None, help="Auto-compress snapshots older than N days")
     sp_start.add_argument("--auto-restart", action="store_true", help="Auto-restart job on crash")
+    sp_start.add_argument("--daemon", action="store_true", help="Host the job in the shared watcher daemon (default: DAEMON_MODE)")
     sp_start.set_defaults(func=start_job)
 
     # stop
     sp_stop = subs.add_parser("stop", add_help=False)
     sp_stop.add_argument("-n", "--name", required=True, help="Job name to stop")
+    sp_stop.add_argument("-w", "--workers", type=int, default=None, help="Number of parallel copy workers for the final snapshot (default: COPY_WORKERS)")
+    sp_stop.add_argument("--incremental", action="store_true", help="Hard-link files unchanged since the previous full snapshot")
+    sp_stop.add_argument("--dedup", action="store_true", help="Store file contents once in BASE_BACKUP/.objects and hard-link them")
+    sp_stop.add_argument("--pack", action="store_true", help="Append files smaller than PACK_THRESHOLD_KB into pack segments")
     sp_stop.set_defaults(func=stop_job)
 
     # status
@@ -140,14 +155,29 @@ def build_parser():
     sp_comp = subs.add_parser("compress", add_help=False)
     sp_comp.add_argument("-n", "--name", required=True, help="Job name")
     sp_comp.add_argument("-t", "--snapshot", required=True, help="Snapshot folder name (e.g. snapshot_02-06-2025_12-00-00)")
+    sp_comp.add_argument("--codec", choices=["deflate", "bz2", "lzma", "zstd"], default=None, help="Compression codec (default: COMPRESS_CODEC)")
+    sp_comp.add_argument("--level", type=int, default=None, help="Compression level (default: COMPRESS_LEVEL or the codec's default)")
+    sp_comp.add_argument("-w", "--workers", type=int, default=None, help="Compression processes (default: COMPRESS_WORKERS, all cores)")
+    sp_comp.add_argument("--compress-all", action="store_true", help="Compress every file, even ones that look already compressed")
     sp_comp.set_defaults(func=compress_snapshot)
 
     # decompress
     sp_decomp = subs.add_parser("decompress", add_help=False)
     sp_decomp.add_argument("-n", "--name", required=True, help="Job name")
     sp_decomp.add_argument("-t", "--snapshot", required=True, help="Snapshot base name (without .zip)")
+    sp_decomp.add_argument("-w", "--workers", type=int, default=None, help="Extraction threads (default: COMPRESS_WORKERS, all cores)")
     sp_decomp.set_defaults(func=decompress_snapshot)
 
+    # restore
+    sp_restore = subs.add_parser("restore", add_help=False)
+    sp_restore.add_argument("-n", "--name", required=True, help="Job name")
+    sp_restore.add_argument("-t", "--snapshot", required=True, help="Snapshot folder or archive name (extension optional)")
+    sp_restore.add_argument("-p", "--path", action="append", default=None, help="File, folder or glob inside the snapshot (repeatable)")
+    sp_restore.add_argument("-o", "--output", default=None, help="Folder to restore into (default: current folder)")
+    sp_restore.add_argument("--stdout", action="store_true", help="Write the restored file(s) to standard output")
+    sp_restore.add_argument("--list", action="store_true", help="List the matching files (all without -p) instead of restoring")
+    sp_restore.set_defaults(func=restore_snapshot)
+
     # Existing sync‐cloud stub:
     sp_sync = subs.add_parser("sync-cloud", add_help=False)
     sp_sync.add_argument("-n", "--name", required=True, help="Job name")
@@ -155,6 +185,15 @@ def build_parser():
     sp_sync.add_argument("-pcs", "--path_to_credential_json", help="You can add your Credential json file here")
     sp_sync.set_defaults(func=sync_cloud)
     
+    # ─── Hidden “daemon” (launched by 'start --daemon') ────────────
+    sp_daemon = subs.add_parser("daemon", add_help=False)
+    sp_daemon.set_defaults(func=run_daemon)
+
+    # ─── Hidden “maintain” (launched after every snapshot) ────────────
+    sp_maint = subs.add_parser("maintain", add_help=False)
+    sp_maint.add_argument("-n", "--name", required=True, help=argparse.SUPPRESS)
+    sp_maint.set_defaults(func=run_maintenance)
+
     # ─── Hidden “run-job” (invoked internally by 'start') ────────────
     sp_run = subs.add_parser("run-job", add_help=False)
     sp_run.add_argument("-s", "--source", required=True, help=argparse.SUPPRESS)
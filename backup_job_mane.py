@@ -7,16 +7,26 @@ from watchdog.observers import Observer
 import signal
 import subprocess
 import time
-import shutil
+import threading
+import errno
 
 from backup_tool.config import LOAD_CONFIG
 from backup_tool.logger import setup_logger
-from backup_tool.utils import HAS_ENOUGH_DISK_SPACE, emoji, notify, read_exclude_patterns
-from backup_tool.watcher import IncrementalBackupHandler
-from watcher import IncrementalBackupHandler, emoji, is_excluded
-from backup_tool.utils import find_igbackup_file_uptree, HAS_ENOUGH_DISK_SPACE, notify, pid_path_for, read_exclude_patterns, should_ignore, update_summary_log
+from backup_tool.utils import emoji
+from backup_tool.utils import get_latest_snapshot, HAS_ENOUGH_DISK_SPACE, notify, pid_path_for, snapshot_excludes, update_summary_log
 from backup_tool.tele_email_init import send_notification
-from backup_tool.cleanup_cmd import cleanup_old_backups
+from backup_tool.archive_snapshot import archive_backup
+from backup_tool.checkpoint import PARTIAL_SUFFIX, RESUMABLE_BYTES, Checkpoint, partial_snapshots, publish, resumable_copy
+from backup_tool.chunk_store import CDC_THRESHOLD_BYTES, chunking_enabled, recipe_path, reuse_recipe, store_chunked
+from backup_tool.copy_engine import COPY_WORKERS, CopyWorkerPool, copy_and_hash, fast_copy, parallel_copy, try_link
+from backup_tool.file_index import FileIndex
+from backup_tool.maintenance import spawn_maintenance
+from backup_tool.manifest import Manifest, hash_file
+from backup_tool.object_store import DEDUP_STORE, ObjectStore
+from backup_tool.pack_store import PACK_SMALL_FILES, PACK_THRESHOLD_BYTES, PackWriter
+from backup_tool.tree_walker import walk_tree
+from backup_tool.watch_job import WatchJob
+from backup_tool.daemon import DAEMON_MODE, daemon_pid, is_daemon_job, request_start, request_stop, spec_path_for
 
 
 env = LOAD_CONFIG()
@@ -31,8 +41,11 @@ EMOJI_ENABLED = env.get("EMOJI_ENABLED", "true").lower() in ("1", "true", "yes")
 COLOR_ENABLED = env.get("COLOR_ENABLED", "true").lower() in ("1", "true", "yes")
 MIN_FREE_SPACE_MB = int(env.get("MIN_FREE_SPACE_MB", "10000"))
 RETENTION_DAYS = int(LOAD_CONFIG().get("RETENTION_DAYS", "30"))
+INCREMENTAL_SNAPSHOTS = env.get("INCREMENTAL_SNAPSHOTS", "false").lower() in ("1", "true", "yes")
 
 GLOBAL_LOGGER = setup_logger(LOGS_DIR, "backup_cli")
+CLI_SCRIPT = Path(__file__).resolve().parent / "backup_cli.py"
+DAEMON_STOP_TIMEOUT = 600  # seconds to wait for a daemon job's final sync
 
 # ───────────────────────────────────────────────────────────────────────
 # RUN-JOB (DETTACHED) FUNCTION
@@ -43,8 +56,12 @@ def run_job( source: str, dest: str, exclude: str, compress_days: int, no_emoji:
     1) … same validation/creation …
     2) Create one “dest_root” folder for this run:
        BASE_BACKUP/<job>/Backup_runtime_<timestamp>
-    3) Every time the watcher sees a change, it copies into dest_root.
-    4) On SIGTERM, it does a final sync into dest_root, then logs summary.
+    3) Every time the watcher sees a change, it copies into dest_root and appends
+       the path to the job's change journal (BASE_BACKUP/<job>/.change_journal.tsv).
+    4) On SIGTERM, it does a final sync into dest_root, then logs summary. The final
+       sync replays the journal plus the directories modified since the start, so it
+       scales with the amount of change; only a job without an index yet walks the
+       whole source. A journal left by a crashed run is replayed on the next start.
     """
 
 
@@ -56,79 +73,33 @@ def run_job( source: str, dest: str, exclude: str, compress_days: int, no_emoji:
 
     # … (validate src and dst) …
 
-    src = Path(source).resolve() # → /path/to/source
-    dst = Path(dest).resolve()       # → BASE_BACKUP/<job>  //// → /path/to/destination
-    logfile_dir = dst / "logs"
-    JOB_LOGGER = setup_logger(logfile_dir, f"watcher_{src.name}")
-    JOB_LOGGER.info(emoji("[🚀 START]") + f" Watching: {src} → {dst}")
-
-    # Load exclude patterns
-    patterns = read_exclude_patterns(src, exclude)
-
-    # 2) Build exactly one timestamped subfolder:
-    timestamp = datetime.now().strftime('Backup_runtime_%d-%m-%Y_%H-%M')
-    dest_root = dst / timestamp
-    dest_root.mkdir(parents=True, exist_ok=True)
-
-    # 3) Set up the watcher to copy into dest_root
-    handler = IncrementalBackupHandler(src, dest_root, patterns, JOB_LOGGER, compress_days)
+    job = WatchJob(source, dest, exclude, compress_days, delay)
     observer = Observer()
-    observer.schedule(handler, str(src), recursive=True)
+    pool = CopyWorkerPool(logger=job.logger)
     observer.start()
+    job.start(observer, pool)
 
     # Graceful shutdown on SIGTERM
     def _graceful_shutdown(signum, frame):
-        JOB_LOGGER.info(emoji("[🛑 STOP]") + " Received stop signal. Running final sync…")
+        job.logger.info(emoji("[🛑 STOP]") + " Received stop signal. Running final sync…")
         observer.stop()
 
     signal.signal(signal.SIGTERM, _graceful_shutdown)
 
     # 4) Monitor for “<job>.kill” file as well
-    kill_flag = PID_DIR / f"{dst.name}.kill"
+    kill_flag = PID_DIR / f"{job.name}.kill"
     try:
         while observer.is_alive():
             time.sleep(1)
             if kill_flag.exists():
-                JOB_LOGGER.info(emoji("[💥 SELF-DESTRUCT]") + f" '{dst.name}' detected kill file.")
+                job.logger.info(emoji("[💥 SELF-DESTRUCT]") + f" '{job.name}' detected kill file.")
                 kill_flag.unlink(missing_ok=True)
                 observer.stop()
                 break
 
     finally:
         observer.join()
-
-        # 5) FINAL SYNC into dest_root:
-        JOB_LOGGER.info(emoji("[🔄 FINAL SYNC]") + " Checking for missed files…")
-        copied_count = 0
-        for root, dirs, files in os.walk(src):
-            for fname in files:
-                file_path = Path(root) / fname
-                if should_ignore(file_path, src, patterns):
-                    continue
-                try:
-                    rel = file_path.relative_to(src)
-                except Exception:
-                    continue
-                if is_excluded(rel, patterns):
-                    continue
-                if file_path.stat().st_size == 0:
-                    continue
-
-                dst_path = dest_root / rel
-                if not dst_path.exists():
-                    dst_path.parent.mkdir(parents=True, exist_ok=True)
-                    try:
-                        shutil.copy2(file_path, dst_path)
-                        JOB_LOGGER.info(emoji("[📄 SYNC]") + f" {rel}")
-                        copied_count += 1
-                    except Exception as e:
-                        JOB_LOGGER.error(f"[❌ ERROR] Final copy {rel}: {e}")
-
-        # 6) Append final‐sync summary into BASE_BACKUP/<job>/summary.log
-        ts = datetime.now().strftime("%d-%m-%Y %H:%M")
-        update_summary_log(dst,ts,"✔️",f"{dest_root.name} (final sync) → {copied_count} files copied.")
-        send_notification("Backup Completed", f"Backup has complete in folder{dst}")
-        JOB_LOGGER.info(emoji("[✅ END]") + " Job completed.")
+        job.stop()
 
 
 # ───────────────────────────────────────────────────────────────────────
@@ -146,16 +117,20 @@ def start_job(args):
 
     pid_file = pid_path_for(job)
     if pid_file.exists():
-        existing = int(pid_file.read_text().strip())
+        existing = int(pid_file.read_text().strip().splitlines()[0])
         if psutil.pid_exists(existing):
             print(f"Error: Job '{job}' is already running (PID {existing}).", file=sys.stderr)
             return
         else:
             pid_file.unlink()
             (PID_DIR / f"{job}.src").unlink(missing_ok=True)
+    if getattr(args, "daemon", False) or DAEMON_MODE:
+        _start_in_daemon(args, job, src, dst)
+        return
+
     cmd = [
         sys.executable,
-        str(Path(__file__).resolve()),
+        str(CLI_SCRIPT),
         "run-job",
         "-s", str(src),
         "-d", str(dst),
@@ -208,23 +183,108 @@ def start_job(args):
         print(f"Error: could not write PID/src files: {e}", file=sys.stderr)
         return
 
+def _start_in_daemon(args, job: str, src: Path, dst: Path):
+    """Hand the job to the watcher daemon, launching the daemon first if it is not running."""
+    if spec_path_for(job).exists() and daemon_pid() is not None:
+        print(f"Error: Job '{job}' is already requested from the daemon.", file=sys.stderr)
+        return
+    request_start(job, src, dst, args.exclude, args.compress_days)
+
+    pid = daemon_pid()
+    if pid is None:
+        cmd = [sys.executable, str(CLI_SCRIPT), "daemon"]
+        if args.auto_restart:
+            cmd = [sys.executable, "backup_tool/relauncher.py", "daemon"] + cmd
+        creationflags = subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0
+        try:
+            pid = subprocess.Popen(
+                cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, stdin=subprocess.DEVNULL,
+                creationflags=creationflags, close_fds=(os.name != "nt")).pid
+        except Exception as e:
+            spec_path_for(job).unlink(missing_ok=True)
+            print(f"Error: could not launch the daemon: {e}", file=sys.stderr)
+            return
+        GLOBAL_LOGGER.info(f"Started watcher daemon (PID {pid})")
+
+    GLOBAL_LOGGER.info(f"Requested job '{job}' from the daemon (PID {pid})")
+    print(emoji(">>"))
+    print(f"{emoji('[📡 WATCHING]')} '{src}' → '{dst}' (daemon PID {pid})")
+    print(f"Use: backup stop -n {job}")
+
+
 def perform_backup(args, src: Path, job: str, tag: str = "Full backup",):
     """
     Creates a single “Backup_full_<timestamp>” folder and copies all (non‐excluded)
     files into that folder. Then logs file counts into summary.log.
+
+    In incremental mode (--incremental or INCREMENTAL_SNAPSHOTS=true) files whose size
+    and mtime match the previous full snapshot are hard-linked from it instead of
+    copied, so every snapshot is still complete on disk but only changed bytes cost space.
+
+    With --dedup (or DEDUP_STORE=true) every file goes through the content-addressed
+    store in BASE_BACKUP/.objects (see object_store): content any job already stored is
+    hard-linked from there instead of written again.
+
+    With CDC_THRESHOLD_MB set, files at least that large are split into content-defined
+    chunks (see chunk_store): only chunks the object store does not have are written
+    and the snapshot holds a small <file>.cdc recipe; a file whose recipe in the
+    previous full snapshot already matches its known hash is not even read.
+
+    With --pack (or PACK_SMALL_FILES=true) files smaller than PACK_THRESHOLD_KB are
+    appended to a few large segments under <dest_root>/.packs/ with an index instead
+    of being written one by one (see pack_store); restore reads them through it.
+
+    The snapshot is built in Backup_full_<timestamp>.partial and renamed into place
+    only once it is complete. Finished files are recorded in its checkpoint (see
+    checkpoint), so after an interruption `snapshot --resume` continues the newest
+    unfinished snapshot instead of starting over. Returns True once published, False
+    if the run stopped with an unfinished snapshot.
+
+    With --archive [zip|tar.zst] the snapshot is streamed straight into one archive
+    instead (see archive_snapshot.archive_backup); --incremental does not apply there.
     """
     if not HAS_ENOUGH_DISK_SPACE(str(BASE_BACKUP), MIN_FREE_SPACE_MB):
         msg = f"❌ Not enough disk space. Required: {MIN_FREE_SPACE_MB} MB free."
         GLOBAL_LOGGER.error(msg)
         notify("Backup Skipped", msg)
         return
+
+    if getattr(args, "archive", None):
+        return _perform_archive_backup(args, src, job, tag)
     
     # 1) Build two Paths:
     #    base_dst = BASE_BACKUP/<job>
-    #    dest_root = BASE_BACKUP/<job>/Backup_full_<timestamp>
+    #    dest_root = BASE_BACKUP/<job>/Backup_full_<timestamp>.partial (until it is complete)
     timestamp = datetime.now().strftime('Backup_full_%d-%m-%Y_%H-%M')
     base_dst   = BASE_BACKUP / job
-    dest_root  = base_dst / timestamp
+    dest_root  = base_dst / (timestamp + PARTIAL_SUFFIX)
+    resuming = False
+    if getattr(args, "resume", False):
+        unfinished = partial_snapshots(base_dst)
+        if unfinished:
+            dest_root = unfinished[-1]
+            resuming = True
+            GLOBAL_LOGGER.info(f"[⏯️ RESUME] Continuing {dest_root.name}")
+        else:
+            GLOBAL_LOGGER.info("[⏯️ RESUME] No unfinished snapshot to resume: starting a new one")
+
+    # Previous full snapshot to hard-link unchanged files from (incremental mode only)
+    prev_root = None
+    if getattr(args, "incremental", False) or INCREMENTAL_SNAPSHOTS:
+        prev_root = get_latest_snapshot(job, BASE_BACKUP, prefixes=("Backup_full_",))
+        if prev_root is not None:
+            GLOBAL_LOGGER.info(f"[🔗 INCREMENTAL] Linking unchanged files from {prev_root.name}")
+
+    store = ObjectStore(BASE_BACKUP) if (getattr(args, "dedup", False) or DEDUP_STORE) else None
+
+    # Large files go to the object store as chunks; unchanged ones reuse the last recipe
+    chunks = ObjectStore(BASE_BACKUP) if CDC_THRESHOLD_BYTES else None
+    recipe_root = None
+    if chunks is not None:
+        recipe_root = get_latest_snapshot(job, BASE_BACKUP, prefixes=("Backup_full_",))
+    chunked_bytes = [0]
+    chunked_lock = threading.Lock()
+    packer = None
 
     # 2) Make exactly dest_root (and its “logs/” subfolder)
     try:
@@ -236,46 +296,172 @@ def perform_backup(args, src: Path, job: str, tag: str = "Full backup",):
     logs_folder = dest_root / "logs"
     logs_folder.mkdir(exist_ok=True)
 
+    # Small files go into pack segments; their folders are only made for files that are not packed
+    if getattr(args, "pack", False) or PACK_SMALL_FILES:
+        packer = PackWriter(dest_root)
+    made_dirs = set()
+
+    # Finished files are journaled in the checkpoint; pack bytes reach the disk before rows point at them
+    checkpoint = Checkpoint(dest_root, before_flush=packer.flush if packer is not None else None)
+    if checkpoint.done:
+        GLOBAL_LOGGER.info(f"[⏯️ RESUME] {len(checkpoint.done)} files already done")
+    out_of_space = threading.Event()
+
     # 3) Load ignore patterns
-    igbackup_file = find_igbackup_file_uptree(src)
-    ignore_list = []
-    if igbackup_file:
-        with open(igbackup_file, "r", encoding="utf-8") as f:
-            ignore_list = [line.strip() for line in f if line.strip()]
-
-    # 4) Walk src → copy into dest_root
-    total_copied = 0
+    excludes = snapshot_excludes(src)
+
+    # 4) Walk src → copy into dest_root (walker thread feeds a pool of copy workers).
+    #    Directories whose every path .igbackup excludes are pruned before being opened.
+
+    def _snapshot_tasks():
+        for rel, entry in walk_tree(
+            src,
+            dir_excluded=excludes.prunes_dir,
+            on_dir=None if packer is not None else lambda rel_dir: (dest_root / rel_dir).mkdir(parents=True, exist_ok=True),
+        ):
+            st = entry.stat()
+            if excludes.should_ignore(rel, st):
+                continue
+            yield Path(entry.path), dest_root / rel, st
+
+    # Remember the state of every copied file in BASE_BACKUP/<job>/.file_index.sqlite
+    # and list it, with its BLAKE2b, in <dest_root>/manifest.tsv
+    index = FileIndex(base_dst)
+    manifest = Manifest()
+
+    def _copy(src_file, dst_file, st):
+        try:
+            return _copy_one(src_file, dst_file, st)
+        except OSError as e:
+            if e.errno == errno.ENOSPC:
+                out_of_space.set()  # stop short of publishing: the snapshot is not complete
+            raise
+
+    def _drop_unfinished(dst_file, rel, st):
+        """
+        Unlink what an interrupted attempt left at `dst_file` unless it is a large copy
+        its checkpoint row lets resumable_copy continue. It may be a hard link into the
+        object store or the previous snapshot, and copying over it would rewrite that.
+        """
+        try:
+            if checkpoint.resume_offset(rel, st) and os.lstat(dst_file).st_nlink == 1:
+                return
+            dst_file.unlink()
+        except FileNotFoundError:
+            pass
+
+    def _copy_one(src_file, dst_file, st):
+        rel = dst_file.relative_to(dest_root)
+        done = checkpoint.completed(rel.as_posix(), st)
+        if done is not None:
+            if done.pack is not None and packer is not None:
+                packer.keep(done.pack)
+            elif done.pack is not None or not (dst_file.exists() or recipe_path(dst_file).exists()):
+                done = None  # packed last time but not now, or its copy is gone
+        if done is not None:
+            index.update(rel, st, done.digest)
+            manifest.add(rel, st, done.digest)
+            return "resumed"
+        if resuming:
+            _drop_unfinished(dst_file, rel.as_posix(), st)
+        if packer is not None:
+            if st.st_size < PACK_THRESHOLD_BYTES:
+                digest, entry = packer.add(src_file, rel.as_posix(), st)
+                index.update(rel, st, digest)
+                manifest.add(rel, st, digest)
+                checkpoint.add_done(rel.as_posix(), st, digest, entry)
+                return "packed"
+            if dst_file.parent not in made_dirs:
+                dst_file.parent.mkdir(parents=True, exist_ok=True)
+                made_dirs.add(dst_file.parent)
+        digest = index.known_hash(rel, st)
+        if chunks is not None and chunking_enabled(st.st_size):
+            if digest is not None and recipe_root is not None and reuse_recipe(recipe_path(recipe_root / rel), dst_file, digest):
+                outcome = "recipe reused"
+            else:
+                outcome = "chunked"
+                digest, written, _ = store_chunked(src_file, dst_file, chunks)
+                with chunked_lock:
+                    chunked_bytes[0] += written
+        elif prev_root is not None and try_link(prev_root / rel, dst_file, st):
+            outcome = "linked"
+            digest = digest or hash_file(dst_file)
+        elif store is not None:
+            outcome, digest, st = store.put(src_file, dst_file, st, digest)
+        elif st.st_size >= RESUMABLE_BYTES:
+            outcome, digest = resumable_copy(src_file, dst_file, st, rel.as_posix(), checkpoint)
+        elif digest is not None:
+            outcome = fast_copy(src_file, dst_file)  # hash already known: keep data in the kernel
+        else:
+            outcome, digest, st = copy_and_hash(src_file, dst_file)
+        index.update(rel, st, digest)
+        manifest.add(rel, st, digest)
+        checkpoint.add_done(rel.as_posix(), st, digest)
+        return outcome
+
+    workers = getattr(args, "workers", None) or COPY_WORKERS
     try:
-        for root, dirs, files in os.walk(src):
-            rel_path = Path(root).relative_to(src)
-            target_dir = dest_root / rel_path
-            target_dir.mkdir(parents=True, exist_ok=True)
-
-            for fname in files:
-                src_file = Path(root) / fname
-                if should_ignore(src_file, src, ignore_list):
-                    continue
-
-                dst_file = target_dir / fname
-                try:
-                    shutil.copy2(src_file, dst_file)
-                    total_copied += 1
-                except Exception as e:
-                    GLOBAL_LOGGER.error(f"[❌ ERROR] Failed to copy {src_file} → {dst_file}: {e}")
+        try:
+            stats = parallel_copy(_snapshot_tasks(), workers=workers, copy_file=_copy, logger=GLOBAL_LOGGER)
+        finally:
+            index.close()
+            checkpoint.close()
+        if out_of_space.is_set():
+            raise OSError(errno.ENOSPC, "Backup disk is full")
+        if packer is not None:
+            packer.close()
+        manifest.write(dest_root)
+        dest_root = publish(dest_root)
+        total_copied = stats.copied
+        GLOBAL_LOGGER.info(f"[⚙️ COPY] {dest_root.name}: {dict(stats.outcomes)}")
+        linked = f" ({stats.outcomes['linked']} hard-linked from {prev_root.name})" if prev_root is not None else ""
+        if store is not None:
+            linked += f" ({stats.outcomes['deduped']} deduplicated from the object store)"
+        if packer is not None:
+            linked += f" ({stats.outcomes['packed']} small files packed into {len(packer.segments)} segments)"
+        if chunks is not None and (stats.outcomes['chunked'] or stats.outcomes['recipe reused']):
+            linked += (f" ({stats.outcomes['chunked'] + stats.outcomes['recipe reused']} large files chunked,"
+                       f" {chunked_bytes[0] / 2**20:.1f} MiB of new chunks)")
         # Log success into summary.log
         ts = datetime.now().strftime("%d-%m-%Y %H:%M")
-        update_summary_log(base_dst, ts, "✔️", f"tag(s) = {tag}, {dest_root.name} → {total_copied} files copied.")
+        update_summary_log(base_dst, ts, "✔️", f"tag(s) = {tag}, {dest_root.name} → {total_copied} files copied.{linked}")
 
         send_notification("Backup Completed", f"Backup has complete in folder{dest_root}")
         GLOBAL_LOGGER.info(f"[✅ BACKUP SUCCESS] Full snapshot at {dest_root}")
-        cleanup_old_backups(base_dst, args)  # prune old snapshots under BASE_BACKUP/<job>/
+        spawn_maintenance(job, CLI_SCRIPT)  # compress/prune old snapshots under BASE_BACKUP/<job>/ in the background
         notify("Backup Completed", f"Backup successful: {dest_root}")
+        return True
 
     except Exception as e:
         ts = datetime.now().strftime("%d-%m-%Y %H:%M")
         update_summary_log(base_dst, ts, "❌", f"tag(s) = {tag}, {dest_root.name} → ERROR during copy: {e}")
         notify("Backup Failed", f"Backup failed for job '{job}': {e}")
+        GLOBAL_LOGGER.error(f"[❌ BACKUP ERROR] {e} (resume with: backup snapshot -n {job} -s {src} --resume)")
+        return False
+
+def _perform_archive_backup(args, src: Path, job: str, tag: str):
+    """snapshot --archive: one read pass from `src` into a compressed archive. Returns True once written, False if it failed."""
+    base_dst = BASE_BACKUP / job
+    if getattr(args, "incremental", False):
+        GLOBAL_LOGGER.warning("[⚠️ WARNING] --incremental is ignored with --archive (archives are always full)")
+    try:
+        target, stats = archive_backup(args, src, job, args.archive)
+        ts = datetime.now().strftime("%d-%m-%Y %H:%M")
+        skipped = f" ({stats.skipped} vanished while archiving)" if stats.skipped else ""
+        update_summary_log(base_dst, ts, "✔️", f"tag(s) = {tag}, {target.name} → archived {stats.report()}{skipped}")
+
+        send_notification("Backup Completed", f"Backup has complete in archive {target}")
+        GLOBAL_LOGGER.info(f"[✅ BACKUP SUCCESS] Archived snapshot at {target}")
+        spawn_maintenance(job, CLI_SCRIPT)
+        notify("Backup Completed", f"Backup successful: {target}")
+        return True
+
+    except Exception as e:
+        ts = datetime.now().strftime("%d-%m-%Y %H:%M")
+        update_summary_log(base_dst, ts, "❌", f"tag(s) = {tag}, {args.archive} archive → ERROR during archiving: {e}")
+        notify("Backup Failed", f"Backup failed for job '{job}': {e}")
         GLOBAL_LOGGER.error(f"[❌ BACKUP ERROR] {e}")
+        return False
 
 def stop_job(args):
     job      = args.name
@@ -289,8 +475,8 @@ def stop_job(args):
 
     # Read only the PID from <job>.pid
     try:
-        pid = int(pid_file.read_text().strip())
-    except ValueError:
+        pid = int(pid_file.read_text().strip().splitlines()[0])  # only first line
+    except (ValueError, IndexError):
         print(f"Error: Invalid PID in {pid_file}.", file=sys.stderr)
         pid_file.unlink()
         if src_file.exists():
@@ -310,6 +496,18 @@ def stop_job(args):
         print(f"Performing final backup for job '{job}' from {src}...")
         perform_backup(args=args, src=src, job=job)
 
+    if is_daemon_job(pid_file):
+        # One process hosts every job: ask it to stop this one and wait for the final sync.
+        request_stop(job)
+        deadline = time.time() + DAEMON_STOP_TIMEOUT
+        while pid_file.exists() and psutil.pid_exists(pid) and time.time() < deadline:
+            time.sleep(0.5)
+        if pid_file.exists() and psutil.pid_exists(pid):
+            print(f"Error: daemon did not stop job '{job}' within {DAEMON_STOP_TIMEOUT}s.", file=sys.stderr)
+            return
+        print(emoji("[✅ STOPPED]") + f" Job '{job}' (daemon PID {pid}) stopped.")
+        return
+
     try:
         if os.name == "nt":
             subprocess.run(["taskkill", "/PID", str(pid), "/F"], check=True, stdout=subprocess.DEVNULL)
@@ -328,6 +526,9 @@ def stop_job(args):
 
 def status_jobs(_args):
     any_active = False
+    dpid = daemon_pid()
+    if dpid is not None:
+        print(emoji("[🛰️ DAEMON]") + f" Watcher daemon running (PID {dpid})")
     for pid_file in PID_DIR.glob("*.pid"):
         job = pid_file.stem
         pid_text = pid_file.read_text().strip().splitlines()[0]  # only first line
@@ -342,7 +543,8 @@ def status_jobs(_args):
             continue
 
         if psutil.pid_exists(pid):
-            print(emoji("[📡 ACTIVE]") + f" Job '{job}' (PID {pid})")
+            host = "daemon PID" if is_daemon_job(pid_file) else "PID"
+            print(emoji("[📡 ACTIVE]") + f" Job '{job}' ({host} {pid})")
             any_active = True
         else:
             print(emoji("[⚠️ STALE]") + f" Job '{job}' (PID {pid}) – cleaning up")
@@ -352,5 +554,11 @@ def status_jobs(_args):
             if src_file.exists():
                 src_file.unlink()
 
+    # Jobs requested from the daemon that it has not picked up (yet)
+    for spec in PID_DIR.glob("*.job"):
+        if not pid_path_for(spec.stem).exists():
+            state = "starting" if dpid is not None else "daemon not running"
+            print(emoji("[⏳ PENDING]") + f" Job '{spec.stem}' ({state})")
+
     if not any_active:
         print(emoji("[⛔ INACTIVE]") + " No jobs running.")
@@ -0,0 +1,104 @@
+# ───────────────────────────────────────────────────────────────────────
+# DURABLE CHANGE JOURNAL (run-job)
+# ───────────────────────────────────────────────────────────────────────
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Set
+
+JOURNAL_NAME = ".change_journal.tsv"
+FSYNC_INTERVAL = 1.0   # seconds; lines are flushed to the OS at once, fsync'ed at most this often
+
+
+class JournalState:
+    """What an unfinished run left behind: where it was copying to, since when, and which paths changed."""
+    def __init__(self, dest_root: str, since_ns: int):
+        self.dest_root = dest_root
+        self.since_ns = since_ns
+        self.files: Set[str] = set()
+        self.trees: Set[str] = set()
+
+    def __len__(self):
+        return len(self.files) + len(self.trees)
+
+
+class ChangeJournal:
+    """
+    Append-only list of the paths a run-job watcher saw change, kept in
+    BASE_BACKUP/<job>/.change_journal.tsv:
+
+        B<TAB><start time ns><TAB><dest_root folder name>   one per run
+        F<TAB><relative path>                               a file changed
+        T<TAB><relative path>                               a directory moved in; replay walks it
+
+    Each path is written once per run, so the journal grows with the number of distinct
+    changed paths, not with the number of events. The final sync replays it and then
+    reset()s it; a journal that is still there on startup belongs to a run that crashed
+    or was killed, and is replayed before watching starts again.
+    """
+    def __init__(self, job_dir: Path):
+        self.path = Path(job_dir) / JOURNAL_NAME
+        self._lock = threading.Lock()
+        self._seen: Set[str] = set()
+        self._file = None
+        self._last_sync = 0.0
+
+    def load(self) -> Optional[JournalState]:
+        """Parse a leftover journal; None if there is none. A torn last line is ignored."""
+        if not self.path.exists():
+            return None
+        state = None
+        with open(self.path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break  # torn by a crash mid-write
+                parts = line.rstrip("\n").split("\t", 2)
+                try:
+                    if parts[0] == "B" and state is None:
+                        state = JournalState(parts[2], int(parts[1]))
+                    elif parts[0] == "F" and state is not None:
+                        state.files.add(parts[1])
+                    elif parts[0] == "T" and state is not None:
+                        state.trees.add(parts[1])
+                except (IndexError, ValueError):
+                    continue
+        return state
+
+    def begin(self, dest_root: Path, since_ns: int):
+        """Start journaling a run that copies into `dest_root` and began at `since_ns`."""
+        with self._lock:
+            self._file = open(self.path, "a", encoding="utf-8", newline="\n")
+            self._write(f"B\t{since_ns}\t{Path(dest_root).name}\n", sync=True)
+
+    def record(self, rel: str, tree: bool = False):
+        key = ("T" if tree else "F") + rel
+        if key in self._seen:
+            return
+        with self._lock:
+            if key in self._seen or self._file is None:
+                return
+            self._seen.add(key)
+            self._write(f"{key[0]}\t{rel}\n")
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+
+    def reset(self):
+        """Everything journaled has been synced: drop the journal."""
+        self.close()
+        self._seen.clear()
+        self.path.unlink(missing_ok=True)
+
+    def _write(self, line: str, sync: bool = False):
+        self._file.write(line)
+        self._file.flush()
+        now = time.monotonic()
+        if sync or now - self._last_sync >= FSYNC_INTERVAL:
+            os.fsync(self._file.fileno())
+            self._last_sync = now
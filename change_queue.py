@@ -0,0 +1,232 @@
+# ───────────────────────────────────────────────────────────────────────
+# PER-PATH COALESCING CHANGE QUEUE (watcher)
+# ───────────────────────────────────────────────────────────────────────
+import heapq
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from backup_tool.config import LOAD_CONFIG
+
+env = LOAD_CONFIG()
+WATCH_SETTLE_SECONDS = float(env.get("WATCH_SETTLE_SECONDS", "1"))
+WATCH_MAX_COOLDOWN = float(env.get("BACKUP_DELAY", "30"))
+WATCH_STABLE_PROBES = int(env.get("WATCH_STABLE_PROBES", "2"))
+WATCH_STABLE_MAX_WAIT = float(env.get("WATCH_STABLE_MAX_WAIT", "300"))
+MIN_PROBE_INTERVAL = 0.5
+
+
+class _Dirty:
+    __slots__ = ("due", "deadline", "events", "hold_until", "sig", "stable", "closed")
+
+    def __init__(self, due: float, deadline: float, hold_until: float):
+        self.due = min(due, deadline)
+        self.deadline = deadline
+        self.events = 1
+        self.hold_until = hold_until   # stop waiting for stability after this
+        self.sig = None                # (size, mtime_ns) seen by the last probe
+        self.stable = 0                # consecutive probes that saw `sig`
+        self.closed = False            # the writer closed the file (IN_CLOSE_WRITE)
+
+
+class CoalescingChangeQueue:
+    """
+    Dirty set keyed by relative path, replacing the old global debounce.
+
+    - push(rel) marks a path dirty; repeated events for the same path merge into
+      one entry, so nothing is dropped and nothing is copied twice for one burst.
+    - A flush thread hands a path to `sink(rel)` once it has been quiet for `settle`
+      seconds, or at the latest `max_cooldown` seconds after it first became dirty,
+      so a file that never stops changing is still backed up.
+    - Files that keep changing right after being flushed (hot logs, …) get an adaptive
+      cooldown: it doubles each time (up to `max_cooldown`, BACKUP_DELAY by default)
+      and decays again once the file calms down, so a hot file is copied at most once
+      per cooldown while quiet files still go out after `settle`.
+    - With a `probe(rel) -> (size, mtime_ns) | None`, a settled path is only handed on
+      once `stable_probes` consecutive probes (one per settle interval, scheduled on the
+      same heap, so thousands of pending files cost one small entry each) saw the same
+      size and mtime, so files still being written are not copied half-way. A close
+      event from the writer (push(rel, closed=True)) ends the wait at once (and skips the
+      settle time), and nothing waits longer than `stable_max_wait`.
+    - close() flushes everything still pending before returning.
+    """
+    def __init__(self, sink: Callable[[str], None], settle: float = WATCH_SETTLE_SECONDS,
+                 max_cooldown: float = WATCH_MAX_COOLDOWN, logger: Optional[logging.Logger] = None,
+                 probe: Optional[Callable[[str], Optional[Tuple[int, int]]]] = None,
+                 stable_probes: int = WATCH_STABLE_PROBES, stable_max_wait: float = WATCH_STABLE_MAX_WAIT):
+        self.sink = sink
+        self.settle = max(0.0, settle)
+        self.max_cooldown = max(self.settle, max_cooldown)
+        self.logger = logger or logging.getLogger("backup_cli")
+        self.probe = probe if stable_probes > 0 else None
+        self.stable_probes = stable_probes
+        self.stable_max_wait = max(0.0, stable_max_wait)
+        self.probe_interval = max(MIN_PROBE_INTERVAL, self.settle)
+
+        self._dirty: Dict[str, _Dirty] = {}
+        self._heap = []                              # (due, rel); at most one live entry per path
+        self._cooldown: Dict[str, tuple] = {}        # rel -> (cooldown seconds, last flush time)
+        self._cond = threading.Condition()
+        self._closing = False
+        self._thread = threading.Thread(target=self._run, name="change-flush", daemon=True)
+        self._thread.start()
+
+    def push(self, rel: str, closed: bool = False):
+        """Mark `rel` dirty; `closed=True` for a close-after-write event, which ends a stability wait."""
+        now = time.monotonic()
+        with self._cond:
+            earliest = now  # cooldown of a hot file; a close event skips the settle time, not this
+            cooldown, last_flush = self._cooldown.get(rel, (0.0, None))
+            if last_flush is not None:
+                if now - last_flush < max(cooldown, self.settle) * 2:
+                    cooldown = min(self.max_cooldown, max(self.settle, cooldown * 2))  # still hot
+                else:
+                    cooldown /= 2                                                      # calming down
+                if cooldown < self.settle:
+                    self._cooldown.pop(rel, None)
+                else:
+                    self._cooldown[rel] = (cooldown, last_flush)
+                    earliest = max(earliest, last_flush + cooldown)
+            due = earliest if closed else max(earliest, now + self.settle)
+
+            entry = self._dirty.get(rel)
+            if entry is None:
+                entry = self._dirty[rel] = _Dirty(due, now + self.max_cooldown, now + self.stable_max_wait)
+                entry.closed = closed
+                heapq.heappush(self._heap, (entry.due, rel))
+                self._cond.notify()
+            else:
+                entry.events += 1
+                entry.closed = closed
+                if not closed:
+                    entry.stable = 0
+                    entry.due = min(max(entry.due, due), entry.deadline)  # heap entry is re-armed lazily
+                elif entry.due > due:
+                    entry.due = due                                       # writer is done: no need to settle
+                    heapq.heappush(self._heap, (due, rel))
+                    self._cond.notify()
+
+    def discard(self, rel: str, tree: bool = False):
+        """
+        Forget a pending path (e.g. it was deleted); with tree=True also everything below
+        it. Heap entries are dropped lazily.
+        """
+        with self._cond:
+            self._dirty.pop(rel, None)
+            if tree:
+                prefix = rel + "/"
+                for key in [k for k in self._dirty if k.startswith(prefix)]:
+                    del self._dirty[key]
+
+    def rename(self, old: str, new: str, tree: bool = False) -> bool:
+        """
+        Re-key pending entries after a move (with tree=True, everything below `old` too),
+        so a file written under a temporary name and renamed over its target is copied
+        once, under its final name. Returns True if anything was pending.
+        """
+        moved = False
+        with self._cond:
+            keys = [old] + ([k for k in self._dirty if k.startswith(old + "/")] if tree else [])
+            for key in keys:
+                entry = self._dirty.pop(key, None)
+                if entry is None:
+                    continue
+                moved = True
+                target = new + key[len(old):]
+                existing = self._dirty.get(target)
+                if existing is not None:
+                    existing.events += entry.events
+                    existing.due = min(max(existing.due, entry.due), existing.deadline)
+                else:
+                    self._dirty[target] = entry
+                    heapq.heappush(self._heap, (entry.due, target))
+            if moved:
+                self._cond.notify()
+        return moved
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._dirty)
+
+    def close(self):
+        """Stop accepting delays: flush every pending path now, then stop the thread."""
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        self._thread.join()
+
+    def _next_ready(self) -> Tuple[Optional[str], Optional[_Dirty]]:
+        """Next path that is due: (rel, None) to flush, (rel, entry) to probe, (None, None) once closed."""
+        with self._cond:
+            while True:
+                if not self._heap:
+                    if self._closing:
+                        return None, None
+                    self._cond.wait()
+                    continue
+                due, rel = self._heap[0]
+                entry = self._dirty.get(rel)
+                if entry is None:
+                    heapq.heappop(self._heap)      # discarded
+                    continue
+                if entry.due > due:
+                    heapq.heapreplace(self._heap, (entry.due, rel))  # more events arrived since
+                    continue
+                now = time.monotonic()
+                if due > now and not self._closing:
+                    self._cond.wait(due - now)
+                    continue
+                heapq.heappop(self._heap)
+                if self.probe is not None and not (entry.closed or self._closing or now >= entry.hold_until):
+                    return rel, entry  # stays dirty while it is probed
+                self._take(rel, now)
+                return rel, None
+
+    def _take(self, rel: str, now: float):
+        del self._dirty[rel]
+        cooldown, _ = self._cooldown.get(rel, (0.0, None))
+        self._cooldown[rel] = (cooldown, now)
+
+    def _check_stable(self, rel: str, entry: _Dirty) -> bool:
+        """Probe a due path; True if it should be flushed now, else it is re-armed for another probe."""
+        try:
+            sig = self.probe(rel)
+        except OSError:
+            sig = None
+        now = time.monotonic()
+        with self._cond:
+            if self._dirty.get(rel) is not entry:
+                return False  # discarded or renamed while probing; its new entry has its own heap slot
+            if entry.stable == 0 or sig != entry.sig:
+                entry.sig, entry.stable = sig, 1
+            else:
+                entry.stable += 1
+            if sig is None or entry.stable >= self.stable_probes or entry.closed or self._closing:
+                self._take(rel, now)
+                return True
+            entry.due = max(entry.due, now + self.probe_interval)
+            heapq.heappush(self._heap, (entry.due, rel))
+            return False
+
+    def _run(self):
+        while True:
+            rel, probing = self._next_ready()
+            if rel is None:
+                return
+            if probing is not None and not self._check_stable(rel, probing):
+                continue
+            try:
+                self.sink(rel)
+            except Exception as e:
+                self.logger.error(f"[❌ ERROR] Flushing {rel}: {e}")
+            self._prune_cooldowns()
+
+    def _prune_cooldowns(self):
+        # Paths flushed long ago are no longer hot; keep the map from growing with the tree.
+        if len(self._cooldown) < 4096:
+            return
+        horizon = time.monotonic() - self.max_cooldown * 4
+        with self._cond:
+            for rel in [r for r, (_, last) in self._cooldown.items() if last is not None and last < horizon]:
+                del self._cooldown[rel]
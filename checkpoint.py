@@ -0,0 +1,193 @@
+# ───────────────────────────────────────────────────────────────────────
+# SNAPSHOT CHECKPOINTS (resumable full snapshots)
+# ───────────────────────────────────────────────────────────────────────
+import os
+import shutil
+import stat
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+from backup_tool.manifest import HASH_CHUNK, new_hasher
+from backup_tool.pack_store import PackEntry
+
+PARTIAL_SUFFIX = ".partial"        # Backup_full_<ts>.partial until the snapshot is complete
+CHECKPOINT_NAME = "checkpoint.tsv"
+FLUSH_SECONDS = 5.0                # checkpoint rows are written in batches …
+FLUSH_ROWS = 2000                  # … at least this often
+RESUMABLE_BYTES = 256 * 1024 * 1024   # files this large also record how far their copy got
+PROGRESS_BYTES = 64 * 1024 * 1024     # … every this many bytes
+
+_HEADER = "# kind\tdigest_or_offset\tsize\tmtime_ns\tpath (pack rows: segment, offset, mode before the path)\n"
+
+
+class Done(NamedTuple):
+    digest: str
+    size: int
+    mtime_ns: int
+    pack: Optional[PackEntry]
+
+
+def partial_snapshots(job_dir: Path) -> List[Path]:
+    """Unfinished snapshot folders of a job, newest last."""
+    if not job_dir.is_dir():
+        return []
+    found = [p for p in job_dir.iterdir() if p.is_dir() and p.name.endswith(PARTIAL_SUFFIX)]
+    return sorted(found, key=lambda p: p.stat().st_mtime)
+
+
+def publish(partial: Path) -> Path:
+    """
+    Rename a finished Backup_full_<ts>.partial into place (one rename: the snapshot
+    appears complete or not at all). If that name is taken (a run in the same
+    minute), the snapshot is published with seconds in its timestamp instead.
+    """
+    (partial / CHECKPOINT_NAME).unlink(missing_ok=True)
+    target = partial.with_name(partial.name[:-len(PARTIAL_SUFFIX)])
+    if target.exists():
+        target = target.with_name(time.strftime("Backup_full_%d-%m-%Y_%H-%M-%S"))
+    os.rename(partial, target)
+    return target
+
+
+class Checkpoint:
+    """
+    Sidecar journal of a snapshot in progress, <partial>/checkpoint.tsv. Every
+    finished file is a row (digest, size, mtime_ns; packed files also where their
+    bytes are), large files add progress rows while they are copied. Rows are
+    appended in batches, every FLUSH_SECONDS or FLUSH_ROWS, and fsync'd, so an
+    interruption loses at most one batch. A resumed run skips every file whose row
+    still matches its size and mtime.
+    """
+    def __init__(self, root: Path, before_flush=None):
+        self.path = Path(root) / CHECKPOINT_NAME
+        self.done: Dict[str, Done] = {}
+        self.progress: Dict[str, tuple] = {}   # rel -> (offset, size, mtime_ns)
+        self._before_flush = before_flush      # e.g. flush pack segments before rows point into them
+        self._pending: List[str] = []
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        if self.path.exists():
+            self._load()
+            self._file = open(self.path, "a", encoding="utf-8", newline="\n")
+        else:
+            self._file = open(self.path, "w", encoding="utf-8", newline="\n")
+            self._file.write(_HEADER)
+
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n") or line.startswith("#"):
+                    continue  # a torn last line of an interrupted flush
+                fields = line.rstrip("\n").split("\t")
+                kind = fields[0]
+                try:
+                    if kind == "done":
+                        _, digest, size, mtime_ns, rel = fields
+                        self.done[rel] = Done(digest, int(size), int(mtime_ns), None)
+                        self.progress.pop(rel, None)
+                    elif kind == "pack":
+                        _, digest, size, mtime_ns, segment, offset, mode, rel = fields
+                        entry = PackEntry(rel, segment, int(offset), int(size), int(mode, 8), int(mtime_ns))
+                        self.done[rel] = Done(digest, int(size), int(mtime_ns), entry)
+                    elif kind == "part":
+                        _, offset, size, mtime_ns, rel = fields
+                        self.progress[rel] = (int(offset), int(size), int(mtime_ns))
+                except ValueError:
+                    continue
+
+    def completed(self, rel: str, st: os.stat_result) -> Optional[Done]:
+        """The row of `rel` if an earlier attempt finished it and it has not changed since."""
+        done = self.done.get(rel)
+        if done is not None and done.size == st.st_size and done.mtime_ns == st.st_mtime_ns:
+            return done
+        return None
+
+    def resume_offset(self, rel: str, st: os.stat_result) -> int:
+        """How many bytes of `rel` an earlier attempt already copied (0 if it changed since)."""
+        offset, size, mtime_ns = self.progress.get(rel, (0, -1, -1))
+        return offset if size == st.st_size and mtime_ns == st.st_mtime_ns else 0
+
+    def add_done(self, rel: str, st: os.stat_result, digest: str, pack: Optional[PackEntry] = None):
+        if pack is not None:
+            row = f"pack\t{digest}\t{st.st_size}\t{st.st_mtime_ns}\t{pack.segment}\t{pack.offset}\t{pack.mode:o}\t{rel}\n"
+        else:
+            row = f"done\t{digest}\t{st.st_size}\t{st.st_mtime_ns}\t{rel}\n"
+        self._add(row)
+
+    def add_progress(self, rel: str, st: os.stat_result, offset: int):
+        self._add(f"part\t{offset}\t{st.st_size}\t{st.st_mtime_ns}\t{rel}\n")
+
+    def _add(self, row: str):
+        with self._lock:
+            self._pending.append(row)
+            if len(self._pending) >= FLUSH_ROWS or time.monotonic() - self._last_flush >= FLUSH_SECONDS:
+                self._flush()
+
+    def _flush(self):
+        if self._pending:
+            if self._before_flush is not None:
+                self._before_flush()
+            self._file.writelines(self._pending)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._pending.clear()
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        """Write the last batch (also after an interruption) and close the file."""
+        with self._lock:
+            if not self._file.closed:
+                self._flush()
+                self._file.close()
+
+
+def resumable_copy(src_file: Path, dst_file: Path, st: os.stat_result, rel: str, checkpoint: Checkpoint):
+    """
+    Copy a large file while recording its progress in `checkpoint` every
+    PROGRESS_BYTES (after an fsync, so the rows never claim bytes still in the page
+    cache). A copy an earlier attempt got part-way through continues at its last
+    recorded offset; that prefix is only re-read from the destination to hash it.
+    The copy is only continued in place when the destination is a regular file with
+    no other hard link; otherwise it is unlinked and written anew.
+    Returns (outcome, digest).
+    """
+    hasher = new_hasher()
+    offset = checkpoint.resume_offset(rel, st)
+    if offset:
+        try:
+            dst_st = os.lstat(dst_file)
+            if not (stat.S_ISREG(dst_st.st_mode) and dst_st.st_nlink == 1 and dst_st.st_size >= offset):
+                offset = 0
+        except FileNotFoundError:
+            offset = 0
+    if not offset:
+        dst_file.unlink(missing_ok=True)  # never truncate an inode another snapshot may share
+    outcome = "resumed" if offset else "stream"
+    with open(src_file, "rb") as f, open(dst_file, "r+b" if offset else "wb") as out:
+        remaining = offset
+        while remaining:
+            buf = out.read(min(HASH_CHUNK, remaining))
+            if not buf:
+                raise ValueError(f"Partial copy of {rel} is shorter than its checkpoint")
+            hasher.update(buf)
+            remaining -= len(buf)
+        f.seek(offset)
+        out.seek(offset)
+        out.truncate()
+        pos, reported = offset, offset
+        while True:
+            buf = f.read(HASH_CHUNK)
+            if not buf:
+                break
+            out.write(buf)
+            hasher.update(buf)
+            pos += len(buf)
+            if pos - reported >= PROGRESS_BYTES:
+                out.flush()
+                os.fsync(out.fileno())
+                checkpoint.add_progress(rel, st, pos)
+                reported = pos
+    shutil.copystat(src_file, dst_file)
+    return outcome, hasher.hexdigest()
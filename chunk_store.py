@@ -0,0 +1,270 @@
+# ───────────────────────────────────────────────────────────────────────
+# CONTENT-DEFINED CHUNKING (large files that change a little at a time)
+# ───────────────────────────────────────────────────────────────────────
+import hashlib
+import os
+import shutil
+from bisect import bisect_left
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from backup_tool.config import LOAD_CONFIG
+from backup_tool.logger import setup_logger
+from backup_tool.manifest import new_hasher
+from backup_tool.object_store import ObjectStore
+
+try:
+    import numpy as _np   # in requirements.txt: vectorised chunk boundaries at disk speed
+except ImportError:
+    _np = None
+
+env = LOAD_CONFIG()
+LOGS_DIR = Path(env.get("LOGS_DIR", "logs")).resolve()
+CDC_THRESHOLD_MB = int(env.get("CDC_THRESHOLD_MB", "0") or 0)   # 0 = chunking off
+CDC_THRESHOLD_BYTES = CDC_THRESHOLD_MB * 1024 * 1024
+
+RECIPE_SUFFIX = ".cdc"
+PENDING_SUFFIX = ".pending"   # <file>.cdc.pending: chunks of a file still being chunked, for the GC mark phase
+CDC_MIN = 256 * 1024          # FastCDC sizes: no cut before MIN, normalised towards AVG, forced at MAX
+CDC_AVG = 1024 * 1024
+CDC_MAX = 4 * 1024 * 1024
+SEGMENT_BYTES = 4 * 1024 * 1024
+MASK_S = 0xFFFFFC00           # 22 bits: hard to match before AVG …
+MASK_L = 0xFFFFC000           # … 18 bits: easy to match after it
+_WINDOW = 32                  # a 32-bit gear hash only depends on the last 32 bytes
+_M32 = 0xFFFFFFFF
+_NP_BLOCK = 64 * 1024         # bytes hashed per numpy pass (working set stays in cache)
+
+_RECIPE_HEADER = "# cdc-recipe v1"
+
+# Fixed gear table, so every run and every machine cuts the same content at the same place
+_GEAR = [int.from_bytes(hashlib.blake2b(bytes([i]), digest_size=4).digest(), "little") for i in range(256)]
+_GEAR_NP = _np.array(_GEAR, dtype=_np.uint32) if _np is not None else None
+_slow_warned = False
+
+GLOBAL_LOGGER = setup_logger(LOGS_DIR, "backup_cli")
+
+
+def chunking_enabled(size: int) -> bool:
+    return CDC_THRESHOLD_BYTES > 0 and size >= CDC_THRESHOLD_BYTES
+
+
+def recipe_path(dst_file: Path) -> Path:
+    return dst_file.with_name(dst_file.name + RECIPE_SUFFIX)
+
+
+def pending_path(dst_file: Path) -> Path:
+    return dst_file.with_name(dst_file.name + RECIPE_SUFFIX + PENDING_SUFFIX)
+
+
+def _candidates_np(segment: bytes, context: bytes, offset: int) -> Tuple[List[int], List[int]]:
+    """
+    Absolute offsets in `segment` where the gear hash matches MASK_S / MASK_L.
+    The hash over the window ending at i is sum(G[b[i-k]] << k, k < 32) mod 2**32,
+    built in five doubling passes (1, 2, 4, 8, 16) instead of a loop over bytes, one
+    cache-sized block at a time.
+    """
+    data = _np.frombuffer(context + segment, dtype=_np.uint8)
+    cand_s, cand_l = [], []
+    for start in range(len(context), len(data), _NP_BLOCK):
+        lo = max(0, start - (_WINDOW - 1))
+        h = _GEAR_NP[data[lo:start + _NP_BLOCK]]
+        width = 1
+        while width < _WINDOW:
+            h[width:] += h[:-width] << _np.uint32(width)
+            width *= 2
+        h = h[start - lo:]
+        hits = _np.flatnonzero((h & _np.uint32(MASK_L)) == 0)
+        base = offset + start - len(context)
+        cand_l += (hits + base).tolist()
+        cand_s += (hits[(h[hits] & _np.uint32(MASK_S)) == 0] + base).tolist()
+    return cand_s, cand_l
+
+
+def _candidates_py(segment: bytes, context: bytes, offset: int) -> Tuple[List[int], List[int]]:
+    """Same as _candidates_np, one byte at a time (no numpy: about 30 times slower)."""
+    gear = _GEAR
+    h = 0
+    for b in context:
+        h = ((h << 1) + gear[b]) & _M32
+    cand_s, cand_l = [], []
+    for i, b in enumerate(segment):
+        h = ((h << 1) + gear[b]) & _M32
+        if not h & MASK_L:
+            cand_l.append(offset + i)
+            if not h & MASK_S:
+                cand_s.append(offset + i)
+    return cand_s, cand_l
+
+
+_candidates = _candidates_np if _np is not None else _candidates_py
+
+
+def iter_chunks(f) -> Iterator[bytes]:
+    """
+    Split the stream `f` into content-defined chunks (FastCDC with normalised
+    chunking): a cut after byte p needs a MASK_S match while the chunk is shorter
+    than CDC_AVG, a MASK_L match after that, and is forced at CDC_MAX. Inserting or
+    deleting bytes only changes the chunks around the edit.
+    """
+    pending = bytearray()
+    start = 0                         # file offset of pending[0]
+    cand_s: List[int] = []
+    cand_l: List[int] = []
+    context = b""
+    eof = False
+    while True:
+        if not eof:
+            segment = f.read(SEGMENT_BYTES)
+            if segment:
+                s, l = _candidates(segment, context, start + len(pending))
+                cand_s += s
+                cand_l += l
+                context = (context + segment)[-(_WINDOW - 1):]
+                pending += segment
+            else:
+                eof = True
+        end = start + len(pending)
+        cut = 0
+        while start + cut < end:
+            lo = start + cut + CDC_MIN - 1
+            chunk_start = start + cut
+            i = bisect_left(cand_s, lo)
+            if i < len(cand_s) and cand_s[i] < chunk_start + CDC_AVG - 1:
+                p = cand_s[i]
+            else:
+                j = bisect_left(cand_l, max(lo, chunk_start + CDC_AVG - 1))
+                p = cand_l[j] if j < len(cand_l) and cand_l[j] < chunk_start + CDC_MAX - 1 else chunk_start + CDC_MAX - 1
+            if p >= end:
+                if not eof:
+                    break     # the cut depends on data not read yet
+                p = end - 1
+            yield bytes(pending[cut:p + 1 - start])
+            cut = p + 1 - start
+        if cut:
+            del pending[:cut]
+            start += cut
+            cand_s = cand_s[bisect_left(cand_s, start):]
+            cand_l = cand_l[bisect_left(cand_l, start):]
+        if eof and not pending:
+            return
+
+
+def _write_recipe(target: Path, size: int, digest: str, chunks: List[Tuple[str, int]]):
+    tmp = target.with_name(target.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8", newline="\n") as f:
+        f.write(f"{_RECIPE_HEADER}\t{size}\t{digest}\n")
+        f.writelines(f"{d}\t{n}\n" for d, n in chunks)
+    os.replace(tmp, target)
+
+
+def read_recipe(text: str) -> Tuple[int, str, List[Tuple[str, int]]]:
+    """(file size, file BLAKE2b, [(chunk digest, length), ...]) of a recipe's text."""
+    lines = text.splitlines()
+    if not lines or not lines[0].startswith(_RECIPE_HEADER):
+        raise ValueError("Not a chunk recipe")
+    _, size, digest = lines[0].split("\t")
+    chunks = []
+    for line in lines[1:]:
+        if line:
+            d, n = line.split("\t")
+            chunks.append((d, int(n)))
+    return int(size), digest, chunks
+
+
+def as_recipe(data: bytes) -> Optional[str]:
+    """The text of `data` if it is a recipe (a user file may end in .cdc too), else None."""
+    if not data.startswith(_RECIPE_HEADER.encode()):
+        return None
+    try:
+        text = data.decode("utf-8")
+        read_recipe(text)
+    except ValueError:
+        return None
+    return text
+
+
+def store_chunked(src_file: Path, dst_file: Path, store: ObjectStore) -> Tuple[str, int, str]:
+    """
+    Back up `src_file` as chunks in the object store plus a recipe at <dst_file>.cdc
+    (any plain copy at `dst_file` is removed); only chunks the store does not have
+    yet are written. Until the recipe exists, every chunk is appended to
+    <dst_file>.cdc.pending before it is stored, so a GC running meanwhile marks
+    the chunks of a file that takes longer than its grace period to chunk.
+    Returns (file BLAKE2b, bytes written, description for the log).
+    """
+    global _slow_warned
+    if _np is None and not _slow_warned:
+        _slow_warned = True
+        GLOBAL_LOGGER.warning("[⚠️ WARNING] numpy is not installed: chunking large files runs in plain Python at a few MB/s."
+                              " Install it (pip install -r requirements.txt) or set CDC_THRESHOLD_MB=0.")
+    hasher = new_hasher()
+    chunks: List[Tuple[str, int]] = []
+    new = new_bytes = size = 0
+    pending = pending_path(dst_file)
+    try:
+        with open(src_file, "rb") as f, open(pending, "w", encoding="utf-8", newline="\n") as journal:
+            for data in iter_chunks(f):
+                hasher.update(data)
+                digest = hashlib.blake2b(data, digest_size=32).hexdigest()
+                journal.write(f"{digest}\t{len(data)}\n")  # listed before it is stored
+                journal.flush()
+                if store.put_chunk(digest, data):
+                    new += 1
+                    new_bytes += len(data)
+                chunks.append((digest, len(data)))
+                size += len(data)
+        digest = hasher.hexdigest()
+        _write_recipe(recipe_path(dst_file), size, digest, chunks)
+        shutil.copystat(src_file, recipe_path(dst_file))
+    finally:
+        pending.unlink(missing_ok=True)  # only once the recipe lists the chunks (or nothing will)
+    if dst_file.exists():
+        dst_file.unlink()
+    return digest, new_bytes, f"chunked: {new}/{len(chunks)} chunks new, {new_bytes / 2**20:.1f} MiB written"
+
+
+def reuse_recipe(prev_recipe: Path, dst_file: Path, digest: str) -> bool:
+    """Link the previous snapshot's recipe if it describes content `digest` (file unchanged): no read, no chunk written."""
+    try:
+        with open(prev_recipe, "r", encoding="utf-8") as f:
+            header = f.readline().rstrip("\n").split("\t")
+        if header[0] != _RECIPE_HEADER or header[2] != digest:
+            return False
+        target = recipe_path(dst_file)
+        try:
+            os.link(prev_recipe, target)
+        except OSError:
+            shutil.copy2(prev_recipe, target)
+        return True
+    except (OSError, IndexError):
+        return False
+
+
+def rebuild(recipe_text: str, dest, store: ObjectStore, name: str = "?") -> int:
+    """Write the file described by a recipe to the file object `dest` from its chunks and check its BLAKE2b; returns its size."""
+    size, digest, chunks = read_recipe(recipe_text)
+    hasher = new_hasher()
+    for chunk, length in chunks:
+        try:
+            with open(store.path_for(chunk), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            raise ValueError(f"Chunk {chunk[:12]}… of {name!r} is missing from the object store")
+        if len(data) != length:
+            raise ValueError(f"Chunk {chunk[:12]}… of {name!r} has the wrong size")
+        hasher.update(data)
+        dest.write(data)
+    if hasher.hexdigest() != digest:
+        raise ValueError(f"BLAKE2b mismatch for {name!r}")
+    return size
+
+
+def recipe_digests(text: str) -> List[str]:
+    """Chunk digests a recipe references (GC mark phase)."""
+    return [d for d, _n in read_recipe(text)[2]]
+
+
+def pending_digests(text: str) -> List[str]:
+    """Chunk digests listed so far in a <file>.cdc.pending journal (a torn last line is ignored)."""
+    return [line.split("\t", 1)[0] for line in text.splitlines(keepends=True) if line.endswith("\n")]
@@ -1,10 +1,10 @@
-import os
 from pathlib import Path
 import shutil
 import time
-from backup_tool.compress_decompress import compress_snapshot
 from backup_tool.config import LOAD_CONFIG
 from backup_tool.logger import setup_logger
+from backup_tool.maintenance import compress_old_snapshots
+from backup_tool.object_store import run_gc
 
 env = LOAD_CONFIG()
 
@@ -13,19 +13,10 @@ LOGS_DIR = Path(env.get("LOGS_DIR", "logs")).resolve()
 GLOBAL_LOGGER = setup_logger(LOGS_DIR, "backup_cli")
 
 def cleanup_old_backups(args, dst, days=7):
-    
-    cutoff_time = time.time() - (days * 86400)  # 86400 seconds in a day
-    for folder in os.listdir(dst):
-        path = os.path.join(dst, folder)
-        if os.path.isdir(path) and folder.startswith("Backup_full_"):
-            try:
-                if os.path.getmtime(path) < cutoff_time:
-                    compress_snapshot(args = args)
-                    shutil.rmtree(path)
-                    GLOBAL_LOGGER.info(f"[🗑️ DELETED] Old backup removed: {path}")
-                    GLOBAL_LOGGER.info(f"Deleted old backup: {path}")
-            except Exception as e:
-                GLOBAL_LOGGER.error(f"[⚠️ ERROR] Deleting old backup: {e}")
+    """Zip Backup_ folders under `dst` older than `days` and remove the folders (same task the maintenance scheduler runs)."""
+    for _ in compress_old_snapshots(Path(dst), days, GLOBAL_LOGGER):
+        pass
+    run_gc(BASE_BACKUP, GLOBAL_LOGGER)  # the zips hold their own copies: drop objects only the folders used
                 
 def cleanup_old_snapshots(dst: Path, days: int):
     """This will delete folder when there is no need of that perticular job folder"""
@@ -38,6 +29,7 @@ def cleanup_old_snapshots(dst: Path, days: int):
                     GLOBAL_LOGGER.info(f"[🗑️ DELETED] Old snapshot removed: {folder}")
             except Exception as e:
                 GLOBAL_LOGGER.error(f"[⚠️ ERROR] Deleting {folder}: {e}")
+    run_gc(BASE_BACKUP, GLOBAL_LOGGER)
                 
 def cleanup_with_prompt(args):
     job = args.name
@@ -71,4 +63,5 @@ def cleanup_with_prompt(args):
     if deleted == 0:
         print("[✅ CLEAN] No backups deleted.")
     else:
+        run_gc(BASE_BACKUP, GLOBAL_LOGGER)  # free objects only the deleted snapshots used
         print(f"[✅ DONE] {deleted} old backups deleted.")
\ No newline at end of file
@@ -2,6 +2,7 @@
 # COMPRESS, DECOMPRESS, SYNC‐CLOUD STUBS
 # ───────────────────────────────────────────────────────────────────────
 
+import io
 import os
 from pathlib import Path
 import shutil
@@ -10,8 +11,16 @@ import sys
 import zipfile
 
     
+from backup_tool.archive_index import ensure_index, index_zip, path_matches, read_entry, write_index
+from backup_tool.chunk_store import RECIPE_SUFFIX, as_recipe, read_recipe, rebuild
 from backup_tool.config import LOAD_CONFIG
 from backup_tool.logger import setup_logger
+from backup_tool.object_store import ObjectStore
+from backup_tool.pack_store import is_pack_member, load_pack_index, read_packed
+from backup_tool.compress_policy import DEFAULT_POLICY
+from backup_tool.parallel_extract import extract_archive
+from backup_tool.parallel_zip import member_path, write_archive
+from backup_tool.tree_walker import walk_tree
 from backup_tool.utils import get_latest_snapshot
 from backup_tool.watcher import emoji
 
@@ -41,32 +50,215 @@ def compress_snapshot(args):
     if not target.exists() or not target.is_dir():
         print(f"Error: Snapshot not found: {target}", file=sys.stderr)
         return
-    zip_path = target.with_suffix(".zip")
-    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
-        for root, _, files in os.walk(target):
-            for f in files:
-                fp = Path(root) / f
-                arc = fp.relative_to(target)
-                zf.write(fp, arc)
+    zip_path = target.with_name(target.name + ".zip")
+    tmp = target.with_name(target.name + ".zip.tmp")
+    try:
+        stats = write_archive(target, tmp, codec=getattr(args, "codec", None), level=getattr(args, "level", None),
+                              workers=getattr(args, "workers", None),
+                              policy=None if getattr(args, "compress_all", False) else DEFAULT_POLICY)
+        os.replace(tmp, zip_path)
+    except (ValueError, OSError, zipfile.BadZipFile) as e:
+        tmp.unlink(missing_ok=True)
+        print(f"Error: Compressing {snap} failed: {e}", file=sys.stderr)
+        return
     shutil.rmtree(target)
+    write_index(zip_path, index_zip(zip_path))  # member offsets for `backup restore`
     print(emoji("[🗜️ COMPRESSED]") + f" {snap} → {zip_path.name}")
+    print(emoji("[📊 STATS]") + f" {stats.report()}")
+    for line in stats.type_report():
+        print(f"    {line}")
 
 def decompress_snapshot(args):
     """
-    Decompress a snapshot.zip back into a folder.
+    Decompress a snapshot.zip (or .tar.zst) back into a folder, on several threads.
     """
     job = args.name
     snap = args.snapshot
     dst = BASE_BACKUP / job
-    zip_path = dst / f"{snap}.zip"
-    if not zip_path.exists():
-        print(f"Error: ZIP not found: {zip_path}", file=sys.stderr)
+    archive = next((p for p in (dst / f"{snap}.zip", dst / f"{snap}.tar.zst") if p.exists()), None)
+    if archive is None:
+        print(f"Error: ZIP not found: {dst / snap}.zip", file=sys.stderr)
         return
     extract_dir = dst / snap
-    with zipfile.ZipFile(zip_path, "r") as zf:
-        zf.extractall(extract_dir)
-    print(emoji("[📂 DECOMPRESSED]") + f" {snap}.zip → {snap}")
+    try:
+        stats = extract_archive(archive, extract_dir, workers=getattr(args, "workers", None),
+                                progress=lambda s: print(emoji("[📦 EXTRACTING]") + f" {s.progress()}"), logger=CDS_LOGGER)
+    except (ValueError, OSError, zipfile.BadZipFile) as e:
+        print(f"Error: Decompressing {archive.name} failed: {e}", file=sys.stderr)
+        return
+    print(emoji("[📂 DECOMPRESSED]") + f" {archive.name} → {snap}")
+    print(emoji("[📊 STATS]") + f" {stats.report()}")
+    if stats.failed:
+        print(f"Error: {stats.failed} member(s) of {archive.name} failed their check and were not restored", file=sys.stderr)
+        sys.exit(1)
     
+def _find_snapshot(job_dir: Path, snap: str):
+    """The snapshot folder or archive named `snap` (extension optional) under `job_dir`, or None."""
+    for name in (snap, f"{snap}.zip", f"{snap}.tar.zst"):
+        candidate = job_dir / name
+        if candidate.exists() and not name.endswith(".idx"):
+            return candidate
+    return None
+
+
+def restore_snapshot(args):
+    """
+    Restore single files, folders or globs from one snapshot without extracting the
+    rest. Archives are read through their <archive>.idx index: each requested member
+    is read straight from its offset and checked against its CRC-32/BLAKE2b, so the
+    time depends on what is restored, not on the archive size. Chunked files (a
+    <file>.cdc recipe, see chunk_store) are rebuilt from the object store and packed
+    small files (see pack_store) are cut out of their segments. With --list the
+    matching files are printed instead.
+    """
+    job_dir = BASE_BACKUP / args.name
+    source = _find_snapshot(job_dir, args.snapshot)
+    if source is None:
+        print(f"Error: Snapshot not found: {job_dir / args.snapshot}", file=sys.stderr)
+        return
+    listing = getattr(args, "list", False)
+    patterns = args.path or (["*"] if listing else None)
+    if not patterns:
+        print("Error: Name what to restore with -p (or use --list)", file=sys.stderr)
+        return
+    to_stdout = getattr(args, "stdout", False)
+    out_dir = Path(args.output or ".").resolve()
+    status = sys.stderr if to_stdout else sys.stdout
+
+    def _wanted(rel: str) -> bool:
+        # a chunked file is stored as <file>.cdc: match it by either name
+        return path_matches(rel, patterns) or (rel.endswith(RECIPE_SUFFIX) and path_matches(rel[:-len(RECIPE_SUFFIX)], patterns))
+
+    archive_entries = None
+    try:
+        if source.is_dir():
+            packed = load_pack_index(source)
+            members = sorted(rel for rel, _entry in walk_tree(source))
+        else:
+            archive_entries = ensure_index(source)
+            packed = load_pack_index(source, archive_entries)
+            members = archive_entries
+    except (ValueError, OSError, zipfile.BadZipFile) as e:
+        print(f"Error: Reading the index of {source.name} failed: {e}", file=sys.stderr)
+        return
+    # Pack segments are reached through the pack index only
+    matches = [m for m in members if not (packed is not None and is_pack_member(m if archive_entries is None else m.path))
+               and _wanted(m if archive_entries is None else m.path)]
+    packed = [e for e in packed or () if path_matches(e.path, patterns)]
+    if not matches and not packed:
+        print(f"Error: Nothing in {source.name} matches {', '.join(patterns)}", file=sys.stderr)
+        return
+
+    chunks = ObjectStore(BASE_BACKUP)
+    archive = None if archive_entries is None else open(source, "rb")
+
+    def _recipe(member, rel: str):
+        """The recipe text if `member` is a chunk recipe, else None."""
+        if not rel.endswith(RECIPE_SUFFIX):
+            return None
+        if archive is None:
+            return as_recipe((source / rel).read_bytes())
+        buf = io.BytesIO()
+        read_entry(archive, member, buf)
+        return as_recipe(buf.getvalue())
+
+    if listing:
+        rows = [(e.path, e.length) for e in packed]
+        try:
+            for member in matches:
+                rel = member if archive is None else member.path
+                recipe = _recipe(member, rel)
+                if recipe is not None:
+                    rows.append((rel[:-len(RECIPE_SUFFIX)], read_recipe(recipe)[0]))
+                else:
+                    rows.append((rel, (source / rel).stat().st_size if archive is None else member.size))
+        except (ValueError, OSError, zipfile.BadZipFile) as e:
+            print(f"Error: Listing {source.name} failed: {e}", file=sys.stderr)
+            return
+        finally:
+            if archive is not None:
+                archive.close()
+        for rel, size in sorted(rows):
+            print(f"{size:>14}  {rel}")
+        print(f"{len(rows)} file(s), {sum(size for _rel, size in rows) / 2**20:.1f} MiB in {source.name}", file=sys.stderr)
+        return
+
+    restored = failed = total = 0
+
+    def _deliver(name: str, produce, finish=None):
+        """Write one file through produce(out) -> size, into its .restoring temp file or to stdout."""
+        nonlocal restored, failed, total
+        tmp = None
+        try:
+            if to_stdout:
+                size = produce(sys.stdout.buffer)
+            else:
+                target = member_path(out_dir, name)
+                target.parent.mkdir(parents=True, exist_ok=True)
+                tmp = target.with_name(target.name + ".restoring")
+                with open(tmp, "wb") as out:
+                    size = produce(out)
+                if finish is not None:
+                    finish(tmp)
+                os.replace(tmp, target)
+                tmp = None
+            restored += 1
+            total += size
+        except (ValueError, OSError, zipfile.BadZipFile) as e:
+            failed += 1
+            print(f"Error: Restoring {name} failed: {e}", file=sys.stderr)
+        finally:
+            if tmp is not None:
+                tmp.unlink(missing_ok=True)
+
+    def _copy_file(rel: str):
+        def produce(out):
+            with open(source / rel, "rb") as f:
+                shutil.copyfileobj(f, out)
+            return (source / rel).stat().st_size
+        return produce
+
+    def _copy_member(member):
+        def produce(out):
+            read_entry(archive, member, out)
+            return member.size
+        return produce
+
+    try:
+        for member in matches:
+            rel = member if archive is None else member.path
+            try:
+                recipe = _recipe(member, rel)
+            except (ValueError, OSError, zipfile.BadZipFile) as e:
+                failed += 1
+                print(f"Error: Restoring {rel} failed: {e}", file=sys.stderr)
+                continue
+            stat_from = (lambda tmp, rel=rel: shutil.copystat(source / rel, tmp)) if archive is None else None
+            if recipe is not None:
+                name = rel[:-len(RECIPE_SUFFIX)]
+                _deliver(name, lambda out, recipe=recipe, name=name: rebuild(recipe, out, chunks, name), stat_from)
+            else:
+                _deliver(rel, _copy_file(rel) if archive is None else _copy_member(member), stat_from)
+
+        for entry, data, error in read_packed(source, packed, archive_entries):
+            if error is not None:
+                failed += 1
+                print(f"Error: Restoring {entry.path} failed: {error}", file=sys.stderr)
+                continue
+
+            def _finish(tmp, entry=entry):
+                os.chmod(tmp, entry.mode)
+                os.utime(tmp, ns=(entry.mtime_ns, entry.mtime_ns))
+            _deliver(entry.path, lambda out, data=data: out.write(data), _finish)
+    finally:
+        if archive is not None:
+            archive.close()
+        if to_stdout:
+            sys.stdout.buffer.flush()
+    where = "stdout" if to_stdout else str(out_dir)
+    print(emoji("[♻️ RESTORED]") + f" {restored} file(s), {total / 2**20:.1f} MiB from {source.name} → {where}"
+          + (f" ({failed} failed)" if failed else ""), file=status)
+
 def sync_cloud(args):
     """
     Sync the latest snapshot for job=<job> to the requested cloud provider via rclone.
@@ -127,8 +319,30 @@ def manual_snapshot(args):
     if not src.exists():
         print(f"[❌ ERROR] Source path does not exist: {src}")
         return
+    if getattr(args, "auto_restart", False):
+        sys.exit(_relaunch_snapshot(args, src, job))
     try:
         from backup_tool.backup_job_mane import perform_backup
-        perform_backup(args=args, src=src, job=job, tag=tag)
+        if perform_backup(args=args, src=src, job=job, tag=tag) is False:
+            sys.exit(1)  # left unfinished: relauncher.py retries with --resume
     except Exception as e:
         print(f"[❌ ERROR] Snapshot failed: {e}")
+        sys.exit(1)
+
+
+def _relaunch_snapshot(args, src: Path, job: str) -> int:
+    """snapshot --auto-restart: run the snapshot under relauncher.py, which retries a crashed run with --resume."""
+    from backup_tool.backup_job_mane import CLI_SCRIPT
+    from backup_tool.relauncher import relaunch_loop
+
+    cmd = [sys.executable, str(CLI_SCRIPT), "snapshot", "-s", str(src), "-n", job]
+    if args.tag:
+        cmd += ["-m", args.tag]
+    if args.workers:
+        cmd += ["-w", str(args.workers)]
+    for flag in ("incremental", "dedup", "pack", "resume"):
+        if getattr(args, flag, False):
+            cmd.append(f"--{flag}")
+    if args.archive:
+        cmd += ["--archive", args.archive]
+    return relaunch_loop(job, cmd)
@@ -0,0 +1,82 @@
+# ───────────────────────────────────────────────────────────────────────
+# STORE-OR-COMPRESS POLICY (per archive member)
+# ───────────────────────────────────────────────────────────────────────
+import os
+import threading
+import zlib
+from pathlib import Path
+from typing import Dict, Tuple
+
+# Formats that are already compressed (or encrypted): deflating them again only burns CPU
+KNOWN_COMPRESSED = {
+    ".7z", ".aac", ".apk", ".avi", ".avif", ".br", ".bz2", ".cab", ".deb", ".docx", ".epub", ".flac",
+    ".gif", ".gz", ".heic", ".jar", ".jpeg", ".jpg", ".lz4", ".lzma", ".m4a", ".m4v", ".mkv", ".mov",
+    ".mp3", ".mp4", ".odp", ".ods", ".odt", ".ogg", ".opus", ".png", ".pptx", ".rar", ".rpm", ".tgz",
+    ".webm", ".webp", ".whl", ".woff", ".woff2", ".xlsx", ".xz", ".zip", ".zst",
+}
+SAMPLE_BYTES = 64 * 1024    # read from the start of the file for the trial compression
+SAMPLE_MIN_BYTES = 4096     # smaller files are simply compressed: too small to matter
+STORE_RATIO = 0.95          # trial output above this share of the sample → store
+SIGNATURE_BYTES = 8         # leading "magic" bytes that identify a format
+TRUST_AFTER = 8             # identical verdicts before an extension or signature is trusted without sampling
+
+
+class CompressionPolicy:
+    """
+    Decides per file whether an archive member is stored (ZIP_STORED) or compressed.
+
+    Files with a known compressed extension are stored outright. Otherwise the first
+    SAMPLE_BYTES are deflated at level 1; if that saves less than 5 % the file is
+    stored. Verdicts are remembered per extension and per content signature (the
+    first SIGNATURE_BYTES, e.g. a PNG or SQLite header): once TRUST_AFTER files of an
+    extension or signature agreed and none disagreed, later ones skip the sample.
+    One instance is shared per process, so long-running jobs keep what they learnt.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_ext: Dict[str, list] = {}   # ext -> [stored, compressed]
+        self._by_sig: Dict[bytes, list] = {}
+
+    def should_store(self, path: Path, size: int) -> Tuple[bool, str]:
+        """(store?, reason) for one file."""
+        ext = path.suffix.lower()
+        if ext in KNOWN_COMPRESSED:
+            return True, "extension"
+        if size < SAMPLE_MIN_BYTES:
+            return False, "small"
+        verdict = self._trusted(self._by_ext.get(ext))
+        if verdict is not None:
+            return verdict, "extension cache"
+        try:
+            with open(path, "rb") as f:
+                sample = f.read(SAMPLE_BYTES)
+        except OSError:
+            return False, "unreadable"
+        sig = sample[:SIGNATURE_BYTES]
+        verdict = self._trusted(self._by_sig.get(sig))
+        if verdict is not None:
+            return verdict, "signature cache"
+        store = len(zlib.compress(sample, 1)) > len(sample) * STORE_RATIO
+        with self._lock:
+            self._by_ext.setdefault(ext, [0, 0])[0 if store else 1] += 1
+            self._by_sig.setdefault(sig, [0, 0])[0 if store else 1] += 1
+        return store, "sample"
+
+    @staticmethod
+    def _trusted(counts):
+        if counts is None:
+            return None
+        stored, compressed = counts
+        if stored >= TRUST_AFTER and not compressed:
+            return True
+        if compressed >= TRUST_AFTER and not stored:
+            return False
+        return None
+
+
+DEFAULT_POLICY = CompressionPolicy()
+
+
+def file_type(name: str) -> str:
+    """Key for the per-type stats: the lower-case extension, or '(none)'."""
+    return os.path.splitext(name)[1].lower() or "(none)"
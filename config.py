@@ -34,7 +34,12 @@ def split_config(config):
                 "BASE_BACKUP", "PID_DIR", "LOGS_DIR",
                 "DEFAULT_EXCLUDE_FILENAME", "COMPRESS_THRESHOLD_DAYS",
                 "RETENTION_DAYS", "EXCLUDE_EXTENSIONS", "MAX_FILE_SIZE_MB",
-                "MIN_FREE_SPACE_MB", "EMOJI_ENABLED", "COLOR_ENABLED", "BACKUP_DELAY"
+                "MIN_FREE_SPACE_MB", "EMOJI_ENABLED", "COLOR_ENABLED", "BACKUP_DELAY",
+                "COPY_WORKERS", "INCREMENTAL_SNAPSHOTS", "WATCH_SETTLE_SECONDS",
+                "WATCH_WORKERS", "DAEMON_MODE", "WATCH_STABLE_PROBES",
+                "WATCH_STABLE_MAX_WAIT", "MAINTENANCE_BUDGET", "MAINTENANCE_INTERVAL_SECONDS",
+                "COMPRESS_CODEC", "COMPRESS_LEVEL", "COMPRESS_WORKERS", "DEDUP_STORE",
+                "CDC_THRESHOLD_MB", "PACK_SMALL_FILES", "PACK_THRESHOLD_KB"
             }
         },
         "cloud": {
@@ -0,0 +1,454 @@
+# ───────────────────────────────────────────────────────────────────────
+# PARALLEL COPY ENGINE
+# ───────────────────────────────────────────────────────────────────────
+import errno
+import logging
+import os
+import queue
+import shutil
+import threading
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterable, Optional, Tuple
+
+from backup_tool.config import LOAD_CONFIG
+from backup_tool.logger import setup_logger
+from backup_tool.manifest import HASH_CHUNK, new_hasher
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+env = LOAD_CONFIG()
+
+LOGS_DIR = Path(env.get("LOGS_DIR", "logs")).resolve()
+COPY_WORKERS = int(env.get("COPY_WORKERS", "8"))
+COPY_QUEUE_SIZE = int(env.get("COPY_QUEUE_SIZE", "1024"))
+HASH_WORKERS = int(env.get("HASH_WORKERS", str(os.cpu_count() or 2)))
+WATCH_WORKERS = int(env.get("WATCH_WORKERS", "4"))
+
+GLOBAL_LOGGER = setup_logger(LOGS_DIR, "backup_cli")
+
+_DONE = None  # sentinel: one per worker, tells it the walker has finished
+
+FICLONE = 0x40049409  # linux/fs.h: _IOW(0x94, 9, int)
+_CHUNK = 1 << 30      # max bytes per copy_file_range/sendfile call
+
+# errnos meaning "this strategy does not work for this pair of filesystems"
+_UNSUPPORTED_ERRNOS = {
+    errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.ENOTTY, errno.EBADF, errno.ENOTSOCK,
+    getattr(errno, "EOPNOTSUPP", errno.ENOSYS), getattr(errno, "ENOTSUP", errno.ENOSYS),
+}
+_unsupported = set()  # {(strategy, src_dev, dst_dev)} learned at runtime
+_unsupported_lock = threading.Lock()
+
+
+def _reflink(src_fd: int, dst_fd: int, size: int):
+    fcntl.ioctl(dst_fd, FICLONE, src_fd)
+
+
+def _copy_file_range(src_fd: int, dst_fd: int, size: int):
+    copied = 0
+    while copied < size:
+        n = os.copy_file_range(src_fd, dst_fd, min(_CHUNK, size - copied))
+        if n == 0:
+            break
+        copied += n
+
+
+def _sendfile(src_fd: int, dst_fd: int, size: int):
+    offset = 0
+    while offset < size:
+        n = os.sendfile(dst_fd, src_fd, offset, min(_CHUNK, size - offset))
+        if n == 0:
+            break
+        offset += n
+
+
+COPY_STRATEGIES = []
+if fcntl is not None and os.name == "posix":
+    COPY_STRATEGIES.append(("reflink", _reflink))
+if hasattr(os, "copy_file_range"):
+    COPY_STRATEGIES.append(("copy_file_range", _copy_file_range))
+if hasattr(os, "sendfile"):
+    COPY_STRATEGIES.append(("sendfile", _sendfile))
+
+
+def fast_copy(src_file: Path, dst_file: Path) -> str:
+    """
+    Drop-in replacement for shutil.copy2 that keeps the data in the kernel when it can.
+    Tries, in order: reflink clone (FICLONE, btrfs/XFS), os.copy_file_range, os.sendfile,
+    and finally shutil.copy2. A strategy that fails with an "unsupported" errno is
+    remembered per (source device, destination device) and not retried.
+    Returns the name of the strategy that produced the copy.
+    """
+    if COPY_STRATEGIES:
+        with open(src_file, "rb") as fsrc:
+            src_st = os.fstat(fsrc.fileno())
+            with open(dst_file, "wb") as fdst:
+                dst_dev = os.fstat(fdst.fileno()).st_dev
+                for name, strategy in COPY_STRATEGIES:
+                    key = (name, src_st.st_dev, dst_dev)
+                    if key in _unsupported:
+                        continue
+                    try:
+                        strategy(fsrc.fileno(), fdst.fileno(), src_st.st_size)
+                    except OSError as e:
+                        if e.errno not in _UNSUPPORTED_ERRNOS:
+                            raise
+                        with _unsupported_lock:
+                            _unsupported.add(key)
+                        fdst.truncate(0)
+                        os.lseek(fdst.fileno(), 0, os.SEEK_SET)  # truncate() keeps the offset: no hole at the start
+                        fsrc.seek(0)
+                        continue
+                    break
+                else:
+                    name = None
+        if name is not None:
+            shutil.copystat(src_file, dst_file)
+            return name
+    shutil.copy2(src_file, dst_file)
+    return "copy2"
+
+
+class CopyStats:
+    """
+    Counters shared by all copy workers of one run.
+    `copied` counts every file that reached the destination; `outcomes` breaks that
+    down by whatever the copy function returned (e.g. "linked", "reflink", "stream").
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.copied = 0
+        self.failed = 0
+        self.outcomes = Counter()
+
+    def add(self, field: str, n: int = 1):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + n)
+
+    def record(self, outcome: Optional[str]):
+        with self._lock:
+            self.copied += 1
+            self.outcomes[outcome or "copied"] += 1
+
+
+def try_link(prev_file: Path, dst_file: Path, st: os.stat_result) -> bool:
+    """
+    rsync --link-dest style reuse: if `prev_file` (the same path in the previous
+    snapshot) has the size and mtime (whole seconds) described by `st`, hard-link it
+    to `dst_file` and return True. Returns False when the data has to be copied.
+    """
+    try:
+        prev_st = prev_file.stat()
+        if st.st_size != prev_st.st_size or int(st.st_mtime) != int(prev_st.st_mtime):
+            return False
+        try:
+            os.link(prev_file, dst_file)
+        except FileExistsError:
+            dst_file.unlink()
+            os.link(prev_file, dst_file)
+        return True
+    except OSError:
+        return False  # missing in previous snapshot, cross-device, no hard-link support …
+
+
+_hash_pool = None
+_hash_pool_lock = threading.Lock()
+
+
+def _get_hash_pool() -> ThreadPoolExecutor:
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            _hash_pool = ThreadPoolExecutor(max_workers=max(1, HASH_WORKERS), thread_name_prefix="hash")
+        return _hash_pool
+
+
+def _as_copied(st: os.stat_result, size: int) -> os.stat_result:
+    """`st` with st_size replaced by the number of bytes actually copied."""
+    fields = list(st)
+    fields[6] = size
+    return os.stat_result(fields, {"st_atime_ns": st.st_atime_ns, "st_mtime_ns": st.st_mtime_ns, "st_ctime_ns": st.st_ctime_ns})
+
+
+def copy_and_hash(src_file: Path, dst_file: Path, hasher=None) -> Tuple[str, str, os.stat_result]:
+    """
+    Copy `src_file` to `dst_file` and compute its BLAKE2b-256 from the same read pass.
+    Each chunk is handed to the shared hash thread pool while the copy thread writes it
+    and reads the next one, so hashing overlaps I/O instead of serialising behind it.
+    A reflink clone is tried first; the clone is then hashed (no data read for the copy,
+    one read for the hash). Pass a fresh `hasher` to keep its state afterwards (e.g. to
+    extend the digest when the file grows).
+
+    Returns (strategy, hex digest, stat). The stat is the source's fstat taken when the
+    copy started, with the size of the bytes actually copied: a file that changes while
+    it is copied no longer matches that stat on the next run, which copies it again.
+    """
+    h = hasher if hasher is not None else new_hasher()
+    pool = _get_hash_pool()
+    pending = None
+    strategy = "stream"
+    size = 0
+    with open(src_file, "rb") as fsrc, open(dst_file, "wb") as fdst:
+        st = os.fstat(fsrc.fileno())
+        if COPY_STRATEGIES and COPY_STRATEGIES[0][0] == "reflink":
+            key = ("reflink", st.st_dev, os.fstat(fdst.fileno()).st_dev)
+            if key not in _unsupported:
+                try:
+                    _reflink(fsrc.fileno(), fdst.fileno(), 0)
+                    strategy = "reflink"
+                except OSError as e:
+                    if e.errno not in _UNSUPPORTED_ERRNOS:
+                        raise
+                    with _unsupported_lock:
+                        _unsupported.add(key)
+        clone = open(dst_file, "rb") if strategy == "reflink" else None
+        reader = clone or fsrc
+        try:
+            while True:
+                buf = reader.read(HASH_CHUNK)
+                if not buf:
+                    break
+                if pending is not None:
+                    pending.result()  # updates must reach the hasher in order
+                pending = pool.submit(h.update, buf)
+                size += len(buf)
+                if strategy == "stream":
+                    fdst.write(buf)
+            if pending is not None:
+                pending.result()
+        finally:
+            if clone is not None:
+                clone.close()
+    if size != st.st_size:
+        st = _as_copied(st, size)  # grew or shrank while it was copied
+    shutil.copystat(src_file, dst_file)
+    return strategy, h.hexdigest(), st
+
+
+def parallel_copy(
+    tasks: Iterable[tuple],
+    workers: int = COPY_WORKERS,
+    copy_file: Callable = fast_copy,
+    logger: Optional[logging.Logger] = None,
+    queue_size: int = COPY_QUEUE_SIZE,
+) -> CopyStats:
+    """
+    Copy every (src_file, dst_file, *extra) task yielded by `tasks` using a pool of
+    worker threads; each task is run as `copy_file(*task)`.
+
+    - A walker thread consumes `tasks` (usually a generator walking the source tree)
+      and feeds the workers through a bounded queue, so memory stays flat on huge trees.
+    - `copy_file` returns an outcome name that is tallied in
+      `CopyStats.outcomes`.
+    - A failed copy is logged per file and counted in `failed`; the run continues.
+    - If `tasks` itself raises (e.g. the source walk fails), the workers finish what
+      was already queued and the exception is re-raised in the caller.
+    """
+    logger = logger or GLOBAL_LOGGER
+    workers = max(1, int(workers))
+    jobs: "queue.Queue" = queue.Queue(maxsize=max(workers, queue_size))
+    stats = CopyStats()
+    walk_error = []
+
+    def _walker():
+        try:
+            for task in tasks:
+                jobs.put(task)
+        except BaseException as e:
+            walk_error.append(e)
+        finally:
+            for _ in range(workers):
+                jobs.put(_DONE)
+
+    def _worker():
+        while True:
+            task = jobs.get()
+            if task is _DONE:
+                return
+            src_file, dst_file = task[0], task[1]
+            try:
+                stats.record(copy_file(*task))
+            except Exception as e:
+                stats.add("failed")
+                logger.error(f"[❌ ERROR] Failed to copy {src_file} → {dst_file}: {e}")
+
+    threads = [threading.Thread(target=_walker, name="copy-walker", daemon=True)]
+    threads += [threading.Thread(target=_worker, name=f"copy-worker-{i}", daemon=True) for i in range(workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    if walk_error:
+        raise walk_error[0]
+    return stats
+
+
+class _Lane:
+    """Per-lane (per-job) state of a CopyWorkerPool."""
+    __slots__ = ("name", "jobs", "inflight", "redo", "unfinished")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.jobs = deque()      # (key, fn, args) waiting for a worker
+        self.inflight = set()    # keys queued or running
+        self.redo = {}           # key -> {fn: args} submitted while the key was in flight
+        self.unfinished = 0      # queued + running
+
+
+class CopyWorkerPool:
+    """
+    Long-lived, bounded pool of copy threads for the watcher, so no copy ever runs on
+    the watchdog observer thread.
+
+    - submit(key, fn, *args) blocks while the queue is full: backpressure lands on the
+      change-queue flush thread, where further events keep coalescing per path.
+    - Work for a `key` (the relative path) never runs twice at once; a submit for a key
+      already in flight is remembered and run right after the current one (repeated
+      submits of the same function coalesce, different ones run in submit order).
+    - lane(name) returns a view with the same interface for one job of a shared pool:
+      each lane has its own queue bound, and workers take from the lanes with queued
+      work in turn, so one busy job cannot starve the others.
+    - ensure_dir() caches destination directories already created.
+    - shutdown() lets the workers drain the queue and joins them.
+    """
+    def __init__(self, workers: int = WATCH_WORKERS, queue_size: int = COPY_QUEUE_SIZE,
+                 logger: Optional[logging.Logger] = None, name: str = "watch-copy"):
+        self.logger = logger or GLOBAL_LOGGER
+        self.workers = max(1, int(workers))
+        self.queue_size = max(self.workers, queue_size)
+        self._cond = threading.Condition()
+        self._lanes = {}
+        self._ready = deque()    # lanes with queued work, served round-robin
+        self._stopping = False
+        self._dirs = set()
+        self._default = self._lane("")
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"{name}-{i}", daemon=True) for i in range(self.workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def lane(self, name: str) -> "PoolLane":
+        with self._cond:
+            return PoolLane(self, self._lane(name))
+
+    def submit(self, key, fn: Callable, *args):
+        self._submit(self._default, key, fn, args)
+
+    def busy(self) -> bool:
+        """True while anything is queued or being copied, in any lane."""
+        with self._cond:
+            return any(lane.unfinished for lane in self._lanes.values())
+
+    def ensure_dir(self, path: Path):
+        if path in self._dirs:
+            return
+        path.mkdir(parents=True, exist_ok=True)
+        with self._cond:
+            self._dirs.add(path)
+
+    def forget_dir(self, path: Path):
+        """Drop `path` and everything below it from the directory cache (after a move/delete)."""
+        with self._cond:
+            self._dirs = {d for d in self._dirs if d != path and path not in d.parents}
+
+    def shutdown(self, wait: bool = True):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if wait:
+            for t in self._threads:
+                t.join()
+
+    def _lane(self, name: str) -> _Lane:
+        lane = self._lanes.get(name)
+        if lane is None:
+            lane = self._lanes[name] = _Lane(name)
+        return lane
+
+    def _submit(self, lane: _Lane, key, fn: Callable, args: tuple):
+        with self._cond:
+            if key in lane.inflight:
+                lane.redo.setdefault(key, {})[fn] = args
+                return
+            while len(lane.jobs) >= self.queue_size and not self._stopping:
+                self._cond.wait()
+            lane.inflight.add(key)
+            lane.unfinished += 1
+            if not lane.jobs:
+                self._ready.append(lane)
+            lane.jobs.append((key, fn, args))
+            self._cond.notify_all()
+
+    def _drain(self, lane: _Lane):
+        with self._cond:
+            while lane.unfinished:
+                self._cond.wait()
+
+    def _next(self):
+        with self._cond:
+            while not self._ready:
+                if self._stopping:
+                    return None, None
+                self._cond.wait()
+            lane = self._ready.popleft()
+            item = lane.jobs.popleft()
+            if lane.jobs:
+                self._ready.append(lane)  # back of the line: the other lanes go first
+            self._cond.notify_all()       # room for a blocked submitter
+            return lane, item
+
+    def _worker(self):
+        while True:
+            lane, item = self._next()
+            if lane is None:
+                return
+            key, fn, args = item
+            while True:
+                try:
+                    fn(*args)
+                except Exception as e:
+                    self.logger.error(f"[❌ ERROR] Worker failed on {key}: {e}")
+                with self._cond:
+                    again = lane.redo.get(key)
+                    if not again:
+                        lane.redo.pop(key, None)
+                        lane.inflight.discard(key)
+                        lane.unfinished -= 1
+                        self._cond.notify_all()
+                        break
+                    fn = next(iter(again))
+                    args = again.pop(fn)
+
+
+class PoolLane:
+    """One job's share of a CopyWorkerPool; shutdown() waits for this lane only."""
+    def __init__(self, pool: CopyWorkerPool, lane: _Lane):
+        self._pool = pool
+        self._lane = lane
+        self.name = lane.name
+
+    def submit(self, key, fn: Callable, *args):
+        self._pool._submit(self._lane, key, fn, args)
+
+    def busy(self) -> bool:
+        return self._lane.unfinished > 0
+
+    def ensure_dir(self, path: Path):
+        self._pool.ensure_dir(path)
+
+    def forget_dir(self, path: Path):
+        self._pool.forget_dir(path)
+
+    def shutdown(self, wait: bool = True):
+        if wait:
+            self._pool._drain(self._lane)
+        with self._pool._cond:
+            if not self._lane.unfinished:
+                self._pool._lanes.pop(self.name, None)
@@ -0,0 +1,177 @@
+# ───────────────────────────────────────────────────────────────────────
+# MULTI-JOB WATCHER DAEMON
+# ───────────────────────────────────────────────────────────────────────
+import json
+import os
+import signal
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+import psutil
+from watchdog.observers import Observer
+
+from backup_tool.config import LOAD_CONFIG
+from backup_tool.copy_engine import WATCH_WORKERS, CopyWorkerPool
+from backup_tool.logger import setup_logger
+from backup_tool.utils import HAS_ENOUGH_DISK_SPACE, emoji, notify, pid_path_for
+from backup_tool.watch_job import WatchJob
+
+env = LOAD_CONFIG()
+BASE_BACKUP = Path(env.get("BASE_BACKUP", "backup")).resolve()
+PID_DIR = Path(env.get("PID_DIR", "pid")).resolve()
+LOGS_DIR = Path(env.get("LOGS_DIR", "logs")).resolve()
+MIN_FREE_SPACE_MB = int(env.get("MIN_FREE_SPACE_MB", "10000"))
+DAEMON_MODE = env.get("DAEMON_MODE", "false").lower() in ("1", "true", "yes")
+
+DAEMON_LOCK = PID_DIR / "daemon.lock"   # holds the daemon's PID
+DAEMON_TAG = "daemon"                   # second line of <job>.pid for daemon-hosted jobs
+POLL_SECONDS = 1.0
+
+GLOBAL_LOGGER = setup_logger(LOGS_DIR, "backup_cli")
+
+
+def spec_path_for(job: str) -> Path:
+    return PID_DIR / f"{job}.job"
+
+
+def daemon_pid() -> Optional[int]:
+    """PID of the running daemon, or None."""
+    try:
+        pid = int(DAEMON_LOCK.read_text().strip())
+    except (OSError, ValueError):
+        return None
+    return pid if psutil.pid_exists(pid) else None
+
+
+def is_daemon_job(pid_file: Path) -> bool:
+    lines = pid_file.read_text().strip().splitlines()
+    return len(lines) > 1 and lines[1].strip() == DAEMON_TAG
+
+
+def request_start(job: str, src: Path, dst: Path, exclude: Optional[str], compress_days: Optional[int]):
+    """Ask the daemon to host a job: <job>.job stays in PID_DIR for as long as the job should run."""
+    PID_DIR.mkdir(parents=True, exist_ok=True)
+    spec = {"source": str(src), "dest": str(dst), "exclude": exclude, "compress_days": compress_days}
+    tmp = spec_path_for(job).with_suffix(".job.tmp")
+    tmp.write_text(json.dumps(spec), encoding="utf-8")
+    os.replace(tmp, spec_path_for(job))
+
+
+def request_stop(job: str):
+    """Same <job>.kill flag a run-job process watches for."""
+    (PID_DIR / f"{job}.kill").touch()
+
+
+class WatchDaemon:
+    """
+    Hosts every watched job in one process: one watchdog Observer, one CopyWorkerPool
+    with a fair lane per job, and a WatchJob per job.
+
+    Requests are files in PID_DIR, like the per-process jobs' kill flags:
+    - <job>.job (written by `backup start`) asks for a job to run; it survives a daemon
+      restart, so the daemon picks its jobs up again when relaunched.
+    - <job>.kill (written by `backup stop`) stops a job: final sync, then its .job,
+      .pid and .src files are removed.
+    While a job runs, <job>.pid holds the daemon's PID and a "daemon" line, so status
+    and stop can tell it apart from a run-job process.
+    """
+    def __init__(self, workers: int = WATCH_WORKERS):
+        self.observer = Observer()
+        self.pool = CopyWorkerPool(workers=workers, logger=GLOBAL_LOGGER, name="daemon-copy")
+        self.jobs: Dict[str, WatchJob] = {}
+        self._stopping: Dict[str, threading.Thread] = {}
+        self._failed = set()   # specs that could not be started; retried once they change
+        self._running = True
+
+    def run(self):
+        PID_DIR.mkdir(parents=True, exist_ok=True)
+        DAEMON_LOCK.write_text(str(os.getpid()))
+        signal.signal(signal.SIGTERM, lambda signum, frame: self._request_exit())
+        self.observer.start()
+        GLOBAL_LOGGER.info(emoji("[🛰️ DAEMON]") + f" Started (PID {os.getpid()}).")
+        try:
+            while self._running:
+                self._poll()
+                time.sleep(POLL_SECONDS)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for name in list(self.jobs):
+                self._stop_job(name, remove_spec=False)  # specs stay: a relaunched daemon resumes them
+            for t in list(self._stopping.values()):
+                t.join()
+            self.observer.stop()
+            self.observer.join()
+            self.pool.shutdown()
+            DAEMON_LOCK.unlink(missing_ok=True)
+            GLOBAL_LOGGER.info(emoji("[🛑 DAEMON]") + " Stopped.")
+
+    def _request_exit(self):
+        self._running = False
+
+    def _poll(self):
+        for kill_flag in PID_DIR.glob("*.kill"):
+            name = kill_flag.stem
+            if name in self.jobs:
+                kill_flag.unlink(missing_ok=True)
+                spec_path_for(name).unlink(missing_ok=True)
+                t = threading.Thread(target=self._stop_job, args=(name,), name=f"stop-{name}", daemon=True)
+                self._stopping[name] = t
+                t.start()
+        for name, t in list(self._stopping.items()):
+            if not t.is_alive():
+                del self._stopping[name]
+
+        for spec in PID_DIR.glob("*.job"):
+            name = spec.stem
+            if name in self.jobs or name in self._stopping:
+                continue
+            try:
+                key = (name, spec.stat().st_mtime_ns)
+            except OSError:
+                continue
+            if key not in self._failed:
+                self._start_job(name, spec, key)
+
+    def _start_job(self, name: str, spec: Path, key):
+        if not HAS_ENOUGH_DISK_SPACE(str(BASE_BACKUP), MIN_FREE_SPACE_MB):
+            msg = f"❌ Not enough disk space. Required: {MIN_FREE_SPACE_MB} MB free."
+            GLOBAL_LOGGER.error(msg)
+            notify("Backup Skipped", msg)
+            self._failed.add(key)
+            return
+        try:
+            cfg = json.loads(spec.read_text(encoding="utf-8"))
+            job = WatchJob(cfg["source"], cfg["dest"], cfg.get("exclude"), cfg.get("compress_days"))
+            job.start(self.observer, self.pool.lane(name), busy=self.pool.busy)  # maintain only while no job copies
+        except Exception as e:
+            GLOBAL_LOGGER.error(f"[❌ ERROR] Daemon could not start job '{name}': {e}")
+            self._failed.add(key)
+            return
+        self.jobs[name] = job
+        pid_path_for(name).write_text(f"{os.getpid()}\n{DAEMON_TAG}")
+        (PID_DIR / f"{name}.src").write_text(str(job.src))
+        GLOBAL_LOGGER.info(emoji("[📡 WATCHING]") + f" Daemon job '{name}': {job.src} → {job.dst}")
+
+    def _stop_job(self, name: str, remove_spec: bool = True):
+        job = self.jobs.pop(name, None)
+        if job is None:
+            return
+        try:
+            job.stop(self.observer)
+        except Exception as e:
+            job.logger.error(f"[❌ ERROR] Stopping job '{name}': {e}")
+        finally:
+            pid_path_for(name).unlink(missing_ok=True)
+            (PID_DIR / f"{name}.src").unlink(missing_ok=True)
+            if remove_spec:
+                spec_path_for(name).unlink(missing_ok=True)
+
+
+def run_daemon(_args=None):
+    if daemon_pid() is not None:
+        print(f"Error: Daemon is already running (PID {daemon_pid()}).")
+        return
+    WatchDaemon().run()
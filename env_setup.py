@@ -31,7 +31,23 @@ env_vars = [
     ("MIN_FREE_SPACE_MB", "Min free space (MB)", "10000", False),
     ("EMOJI_ENABLED", "Enable emoji output? (True/False)", "False", False),
     ("COLOR_ENABLED", "Enable color output? (True/False)", "True", False),
-    ("BACKUP_DELAY", "Backup delay (seconds)", "45", False),
+    ("BACKUP_DELAY", "Max cooldown between copies of a file that keeps changing (seconds)", "45", False),
+    ("WATCH_SETTLE_SECONDS", "Quiet time before a changed file is copied (seconds)", "1", False),
+    ("WATCH_WORKERS", "Copy worker threads per watched job", "4", False),
+    ("WATCH_STABLE_PROBES", "Unchanged size/mtime probes before copying a file still being written (0 = off)", "2", False),
+    ("WATCH_STABLE_MAX_WAIT", "Longest wait for a file to stop changing (seconds)", "300", False),
+    ("COPY_WORKERS", "Parallel copy workers for snapshots", "8", False),
+    ("INCREMENTAL_SNAPSHOTS", "Hard-link unchanged files from the previous snapshot? (true/false)", "false", False),
+    ("DAEMON_MODE", "Host all watched jobs in one daemon process? (true/false)", "false", False),
+    ("MAINTENANCE_BUDGET", "Share of time background maintenance may spend on CPU or disk (0-1)", "0.2", False),
+    ("MAINTENANCE_INTERVAL_SECONDS", "How often a watched job re-runs compression, retention and compaction (seconds)", "3600", False),
+    ("COMPRESS_CODEC", "Snapshot compression codec (deflate/bz2/lzma/zstd)", "deflate", False),
+    ("COMPRESS_LEVEL", "Compression level (empty = codec default)", "", False),
+    ("COMPRESS_WORKERS", "Compression processes (0 = all cores)", "0", False),
+    ("DEDUP_STORE", "Store identical file contents once across snapshots and jobs? (true/false)", "false", False),
+    ("CDC_THRESHOLD_MB", "Store files of at least this many MB as content-defined chunks (0 = off)", "0", False),
+    ("PACK_SMALL_FILES", "Pack small files of snapshots into large segment files? (true/false)", "false", False),
+    ("PACK_THRESHOLD_KB", "Files smaller than this many KB are packed", "64", False),
 ]
 
 def prompt_env():
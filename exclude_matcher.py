@@ -0,0 +1,138 @@
+# ───────────────────────────────────────────────────────────────────────
+# COMPILED EXCLUSION MATCHER
+# ───────────────────────────────────────────────────────────────────────
+import fnmatch
+import os
+import re
+import threading
+from typing import Iterable, Optional
+
+from backup_tool.config import LOAD_CONFIG
+
+env = LOAD_CONFIG()
+EXCLUDE_EXTENSIONS = env.get("EXCLUDE_EXTENSIONS", "").split(",") if env.get("EXCLUDE_EXTENSIONS") else []
+MAX_FILE_SIZE_MB = int(env.get("MAX_FILE_SIZE_MB", "100"))
+MAX_FILE_SIZE_BYTES = MAX_FILE_SIZE_MB * 1024 * 1024
+
+DIR_CACHE_SIZE = 65536
+
+
+def _combine(globs: Iterable[str]) -> Optional["re.Pattern"]:
+    """One regex that matches when any of the fnmatch globs would."""
+    parts = [f"(?:{fnmatch.translate(os.path.normcase(g))})" for g in globs]
+    return re.compile("|".join(parts)) if parts else None
+
+
+class CompiledExcludeSet:
+    """
+    All exclusion rules of a job, compiled once from read_exclude_patterns() and
+    EXCLUDE_EXTENSIONS, and shared by the watcher, full snapshots and the final sync.
+
+    Two pattern semantics are kept, each folded into a single regex and exactly
+    equivalent to the per-pattern fnmatch loops they replace:
+
+    - is_excluded(rel): watcher semantics. A trailing "/" is dropped and the pattern
+      also matches as a prefix ("build/" excludes "build/x/y"). Since fnmatch's "*"
+      (and therefore "**") crosses "/", an excluded directory excludes everything
+      below it, so per-directory decisions are cached and reused for children.
+    - matches(rel): should_ignore semantics, a plain fnmatch of the whole path.
+      prunes_dir(rel_dir) is its directory counterpart for full snapshots: True only
+      when every path below the directory matches, so skipping the whole subtree
+      drops nothing matches() would have kept ("build/*" prunes "build/", "build"
+      or "test" prune nothing, as neither matches "build/x" or "tests/x").
+
+    Matching goes through os.path.normcase like fnmatch.fnmatch does, so on Windows
+    it stays case-insensitive and accepts either separator.
+    """
+    def __init__(self, patterns: Iterable[str], extensions: Iterable[str] = EXCLUDE_EXTENSIONS, max_size_bytes: int = MAX_FILE_SIZE_BYTES):
+        self.patterns = list(patterns)
+        self.extensions = frozenset(e.strip().lower() for e in extensions if e.strip())
+        self.max_size_bytes = max_size_bytes
+
+        prefix_globs = []
+        for pat in self.patterns:
+            pat_norm = pat.rstrip("/")
+            prefix_globs.append(pat_norm)
+            if not pat_norm.endswith("*"):
+                prefix_globs.append(pat_norm + "*")
+        self._prefix_re = _combine(prefix_globs)
+        self._exact_re = _combine(self.patterns)
+        # A directory (or directory + "/") matching a pattern ending in "*" has every path below it match too
+        self._subtree_re = _combine(p for p in self.patterns if p.endswith("*"))
+
+        self._dir_cache = {}
+        self._prune_cache = {}
+        self._cache_lock = threading.Lock()
+
+    def is_excluded(self, rel_path) -> bool:
+        """Watcher semantics (prefix/directory aware)."""
+        if self._prefix_re is None:
+            return False
+        rp = str(rel_path).replace("\\", "/")
+        parent = rp.rpartition("/")[0]
+        if parent and self.excludes_dir(parent):
+            return True
+        return self._prefix_re.match(os.path.normcase(rp)) is not None
+
+    def excludes_dir(self, rel_dir) -> bool:
+        """is_excluded() for a directory, cached; an excluded directory excludes its whole subtree."""
+        if self._prefix_re is None:
+            return False
+        rd = str(rel_dir).replace("\\", "/")
+        hit = self._dir_cache.get(rd)
+        if hit is not None:
+            return hit
+        parent = rd.rpartition("/")[0]
+        excluded = (bool(parent) and self.excludes_dir(parent)) or self._prefix_re.match(os.path.normcase(rd)) is not None
+        with self._cache_lock:
+            if len(self._dir_cache) >= DIR_CACHE_SIZE:
+                self._dir_cache.clear()
+            self._dir_cache[rd] = excluded
+        return excluded
+
+    def prunes_dir(self, rel_dir) -> bool:
+        """should_ignore semantics for a directory, cached: True if matches() holds for everything below it."""
+        if self._subtree_re is None:
+            return False
+        rd = str(rel_dir).replace("\\", "/")
+        hit = self._prune_cache.get(rd)
+        if hit is not None:
+            return hit
+        nd = os.path.normcase(rd)
+        pruned = self._subtree_re.match(nd) is not None or self._subtree_re.match(nd + "/") is not None
+        with self._cache_lock:
+            if len(self._prune_cache) >= DIR_CACHE_SIZE:
+                self._prune_cache.clear()
+            self._prune_cache[rd] = pruned
+        return pruned
+
+    def matches(self, rel_path) -> bool:
+        """should_ignore semantics: any pattern fnmatches the whole relative path."""
+        return self._exact_re is not None and self._exact_re.match(os.path.normcase(str(rel_path))) is not None
+
+    def excludes_extension(self, rel_path) -> bool:
+        return os.path.splitext(str(rel_path))[1].lower() in self.extensions
+
+    def should_ignore(self, rel_path, st: Optional[os.stat_result] = None) -> bool:
+        """Pattern, extension and MAX_FILE_SIZE_MB checks of a full snapshot; `st` avoids a stat when known."""
+        if self.matches(rel_path) or self.excludes_extension(rel_path):
+            return True
+        return st is not None and st.st_size > self.max_size_bytes
+
+
+_compiled = {}
+_compiled_lock = threading.Lock()
+
+
+def compiled_for(patterns: Iterable[str]) -> CompiledExcludeSet:
+    """Shared CompiledExcludeSet for a pattern list, built on first use."""
+    key = tuple(patterns)
+    found = _compiled.get(key)
+    if found is None:
+        with _compiled_lock:
+            found = _compiled.get(key)
+            if found is None:
+                if len(_compiled) >= 64:
+                    _compiled.clear()
+                found = _compiled[key] = CompiledExcludeSet(key)
+    return found
@@ -0,0 +1,149 @@
+# ───────────────────────────────────────────────────────────────────────
+# PER-JOB FILE-STATE INDEX (SQLite)
+# ───────────────────────────────────────────────────────────────────────
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterator, Optional
+
+INDEX_FILENAME = ".file_index.sqlite"
+COMMIT_EVERY = 1000  # batch size for writes coming from full snapshots
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path     TEXT PRIMARY KEY,
+    size     INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode    INTEGER NOT NULL,
+    hash     TEXT
+)
+"""
+
+# Keep a known hash only while size/mtime say the content did not change.
+_UPSERT = """
+INSERT INTO files (path, size, mtime_ns, inode, hash) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(path) DO UPDATE SET
+    hash = CASE
+        WHEN excluded.hash IS NOT NULL THEN excluded.hash
+        WHEN files.size = excluded.size AND files.mtime_ns = excluded.mtime_ns THEN files.hash
+        ELSE NULL
+    END,
+    size = excluded.size,
+    mtime_ns = excluded.mtime_ns,
+    inode = excluded.inode
+"""
+
+
+def index_key(rel_path) -> str:
+    """Paths are stored relative to the job source, always with forward slashes."""
+    return str(rel_path).replace("\\", "/")
+
+
+class FileIndex:
+    """
+    Remembers, per job, the state (size, mtime_ns, inode, optional content hash) of
+    every source file at the moment it was last backed up. Lives in
+    BASE_BACKUP/<job>/.file_index.sqlite and is shared by full snapshots, the watcher
+    and the final sync, so a file whose stat matches its row can be skipped without
+    being opened.
+
+    One connection is shared between threads; all access goes through a lock.
+    """
+    def __init__(self, job_dir: Path):
+        job_dir.mkdir(parents=True, exist_ok=True)
+        self.path = job_dir / INDEX_FILENAME
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+
+    def get(self, rel_path) -> Optional[tuple]:
+        """Returns (size, mtime_ns, inode, hash) or None."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT size, mtime_ns, inode, hash FROM files WHERE path = ?", (index_key(rel_path),)
+            ).fetchone()
+
+    def is_unchanged(self, rel_path, st: os.stat_result) -> bool:
+        row = self.get(rel_path)
+        return row is not None and row[0] == st.st_size and row[1] == st.st_mtime_ns and row[2] == st.st_ino
+
+    def known_hash(self, rel_path, st: os.stat_result) -> Optional[str]:
+        """The stored content hash, if the file still has the size/mtime it was hashed at."""
+        row = self.get(rel_path)
+        if row is not None and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            return row[3]
+        return None
+
+    def update(self, rel_path, st: os.stat_result, digest: Optional[str] = None):
+        with self._lock:
+            self._conn.execute(_UPSERT, (index_key(rel_path), st.st_size, st.st_mtime_ns, st.st_ino, digest))
+            self._pending += 1
+            if self._pending >= COMMIT_EVERY:
+                self._commit()
+
+    def remove(self, rel_path, tree: bool = False):
+        """Forget a file; with tree=True, also everything below it (a deleted directory)."""
+        key = index_key(rel_path)
+        with self._lock:
+            self._conn.execute("DELETE FROM files WHERE path = ?", (key,))
+            if tree:
+                prefix = key + "/"
+                self._conn.execute("DELETE FROM files WHERE substr(path, 1, ?) = ?", (len(prefix), prefix))
+            self._pending += 1
+
+    def rename(self, old_path, new_path, tree: bool = False):
+        """Move rows after a rename in the source; with tree=True, the whole directory."""
+        old, new = index_key(old_path), index_key(new_path)
+        with self._lock:
+            self._conn.execute("DELETE FROM files WHERE path = ?", (new,))
+            self._conn.execute("UPDATE files SET path = ? WHERE path = ?", (new, old))
+            if tree:
+                prefix = old + "/"
+                self._conn.execute("DELETE FROM files WHERE substr(path, 1, ?) = ?", (len(new) + 1, new + "/"))
+                self._conn.execute(
+                    "UPDATE files SET path = ? || substr(path, ?) WHERE substr(path, 1, ?) = ?",
+                    (new + "/", len(prefix) + 1, len(prefix), prefix),
+                )
+            self._pending += 1
+
+    def paths(self) -> Iterator[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT path FROM files").fetchall()
+        for (p,) in rows:
+            yield p
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM files LIMIT 1").fetchone() is None
+
+    def flush(self):
+        with self._lock:
+            self._commit()
+
+    def compact(self):
+        """Commit, fold the WAL back into the database and truncate it, refresh query statistics."""
+        with self._lock:
+            self._commit()
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._conn.execute("PRAGMA optimize")
+
+    def close(self):
+        with self._lock:
+            self._commit()
+            self._conn.close()
+
+    def _commit(self):
+        if self._pending:
+            self._conn.commit()
+            self._pending = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
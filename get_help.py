@@ -27,6 +27,8 @@ def get_help_test_subcommand() -> str:
       3. Compression Test: create test_backup.zip
       4. PID Test: create a dummy backup.pid
       5. Watcher Simulation Test: touch a new file and verify watcher picks it up
+      6. Compiled Exclusion Matcher Test: same decisions as the fnmatch loops, plus
+         a matches-per-second micro-benchmark
     Prints PASS/FAIL for each step, stops on first failure with suggested fix.
 
 🧾 Syntax:
@@ -66,6 +68,7 @@ Commands:
     test         Run complete automated test suite
     compress     Manually compress a named snapshot
     decompress   Manually decompress a named snapshot.zip
+    restore      Restore single files or globs from a snapshot
     sync-cloud   Sync job snapshots to a cloud provider
     setting      Manage global setting (delay, compression, etc.)
     snapshot     Take a manual snapshot of a source folder for a job
@@ -80,6 +83,7 @@ Commands:
     backup test
     backup compress -n myjob -t snapshot_2025-06-02_12-00-00
     backup decompress -n myjob -t snapshot_2025-06-02_12-00-00
+    backup restore -n myjob -t snapshot_2025-06-02_12-00-00 -p config/app.yaml
     backup sync-cloud -n myjob --provider gdrive
     backup snapshot -s /path/to/src -n myjob -m "Before upgrade"
     backup cleanup -n myjob --retention 30
@@ -97,12 +101,14 @@ def get_help_start() -> str:
     finalizes a full sync on stop.
 
 🧾 Syntax:
-    backup start -s <SOURCE> -n <JOB_NAME> [-e <EXCLUDE_FILE>] [--compress-days N] [--no-emoji] [--no-color] [--auto-restart]
+    backup start -s <SOURCE> -n <JOB_NAME> [-e <EXCLUDE_FILE>] [--compress-days N] [--no-emoji] [--no-color] [--auto-restart] [--daemon]
 
 🏷️ Flags:
     --no-emoji        Disable emojis in output
     --no-color        Disable ANSI colors in output
     --auto-restart    Add this in Command if you want to auto start at crash/error
+    --daemon          Run the job inside the shared watcher daemon (one process for all jobs);
+                      default from DAEMON_MODE
 
 ⚙️ Options:
     -s, --source      Source folder to watch (required)
@@ -113,6 +119,7 @@ def get_help_start() -> str:
 🧪 Examples:
     backup start -s C:/Users/adi/project -n project_backup
     backup start -s C:/Users/adi/project -n project_backup --auto-restart
+    backup start -s C:/Users/adi/project -n project_backup --daemon
     backup start -s C:/Users/adi/project -n project_backup -e C:/Users/adi/.igbackup --compress-days 7
 """
 
@@ -124,16 +131,20 @@ def get_help_stop() -> str:
     Stops a running backup job and performs a final sync (copy any missed files).
 
 🧾 Syntax:
-    backup stop -n <JOB_NAME>
+    backup stop -n <JOB_NAME> [-w N] [--incremental] [--dedup] [--pack]
 
 🏷️ Flags:
-    None
+    --incremental Hard-link files unchanged since the previous full snapshot
+    --dedup       Keep file contents once in BASE_BACKUP/.objects and hard-link them
+    --pack        Append files smaller than PACK_THRESHOLD_KB into pack segments
 
 ⚙️ Options:
     -n, --name    Job name to stop (required)
+    -w, --workers Parallel copy workers for the final snapshot (default: COPY_WORKERS)
 
 🧪 Examples:
     backup stop -n project_backup
+    backup stop -n project_backup --workers 16
 """
 
 def get_help_status() -> str:
@@ -202,18 +213,27 @@ def get_help_compress() -> str:
 🧠 Description:
     Manually compress a named snapshot folder under BASE_BACKUP/<JOB>/snapshot_<TIMESTAMP>.
 
+    Files are compressed on all cores and the archive reports its throughput.
+    Files that are already compressed (JPEG, MP4, zip, random data …) are stored
+    as they are; the report lists sizes and ratios per file type.
+
 🧾 Syntax:
-    backup compress -n <JOB_NAME> -t <SNAPSHOT_NAME>
+    backup compress -n <JOB_NAME> -t <SNAPSHOT_NAME> [--codec C] [--level N] [-w N] [--compress-all]
 
 🏷️ Flags:
-    None
+    --compress-all  Compress every file, even ones that look already compressed
 
 ⚙️ Options:
     -n, --name      Job name (required)
     -t, --snapshot  Snapshot folder name (required)
+    --codec         deflate, bz2, lzma or zstd (zstd needs Python 3.14+ or 'zstandard')
+                    (default: COMPRESS_CODEC)
+    --level         Compression level (default: COMPRESS_LEVEL, else the codec's default)
+    -w, --workers   Compression processes (default: COMPRESS_WORKERS, all cores)
 
 🧪 Examples:
     backup compress -n project_backup -t snapshot_02-06-2025_12-00-00
+    backup compress -n project_backup -t Backup_full_02-06-2025_12-00 --codec zstd --level 9
 """
 
 def get_help_decompress() -> str:
@@ -221,10 +241,13 @@ def get_help_decompress() -> str:
 📦 Backup CLI → Decompress Command
 
 🧠 Description:
-    Manually decompress a named snapshot.zip under BASE_BACKUP/<JOB>.
+    Manually decompress a named snapshot.zip (or .tar.zst) under BASE_BACKUP/<JOB>.
+    Members are extracted on several threads, each with its own file handle;
+    unsafe member paths are skipped, every file is checked against its
+    CRC-32/BLAKE2b, and original modification times are restored at the end.
 
 🧾 Syntax:
-    backup decompress -n <JOB_NAME> -t <SNAPSHOT_NAME>
+    backup decompress -n <JOB_NAME> -t <SNAPSHOT_NAME> [-w N]
 
 🏷️ Flags:
     None
@@ -232,9 +255,44 @@ def get_help_decompress() -> str:
 ⚙️ Options:
     -n, --name      Job name (required)
     -t, --snapshot  Snapshot base name (without .zip) (required)
+    -w, --workers   Extraction threads (default: COMPRESS_WORKERS, all cores)
 
 🧪 Examples:
     backup decompress -n project_backup -t snapshot_02-06-2025_12-00-00
+    backup decompress -n project_backup -t Backup_full_02-06-2025_12-00 -w 16
+"""
+
+def get_help_restore() -> str:
+    return """
+📦 Backup CLI → Restore Command
+
+🧠 Description:
+    Restore single files, folders or globs from one snapshot without extracting the
+    rest. Archived snapshots (.zip, .tar.zst) are read through their <archive>.idx
+    index, so only the requested files are read and each is checked against its
+    CRC-32/BLAKE2b. Archives made before indexing get their index on first use.
+    Chunked large files are rebuilt and packed small files are read through the
+    snapshot's pack index.
+
+🧾 Syntax:
+    backup restore -n <JOB_NAME> -t <SNAPSHOT_NAME> -p <PATH_OR_GLOB> [-p ...] [-o <DIR> | --stdout]
+    backup restore -n <JOB_NAME> -t <SNAPSHOT_NAME> --list [-p <PATH_OR_GLOB> ...]
+
+🏷️ Flags:
+    --stdout        Write the restored file(s) to standard output instead
+    --list          Print the size and path of the matching files (all without -p)
+
+⚙️ Options:
+    -n, --name      Job name (required)
+    -t, --snapshot  Snapshot folder or archive name, extension optional (required)
+    -p, --path      File, folder or glob inside the snapshot (repeatable; required unless --list)
+    -o, --output    Folder to restore into (default: current folder); existing files are replaced
+
+🧪 Examples:
+    backup restore -n project_backup -t Backup_full_02-06-2025_12-00 -p config/app.yaml
+    backup restore -n project_backup -t Backup_full_02-06-2025_12-00 -p "src/*.py" -o /tmp/restored
+    backup restore -n project_backup -t Backup_full_02-06-2025_12-00 -p notes.txt --stdout | less
+    backup restore -n project_backup -t Backup_full_02-06-2025_12-00 --list -p "docs/*"
 """
 
 def get_help_sync_cloud() -> str:
@@ -272,7 +330,7 @@ def get_help_help() -> str:
     None
 
 ⚙️ Options:
-    <command>    One of: start, stop, status, test, compress, decompress, sync-cloud, setting, snapshot, cleanup, history
+    <command>    One of: start, stop, status, test, compress, decompress, restore, sync-cloud, setting, snapshot, cleanup, history
 
 🧪 Examples:
     backup help
@@ -290,7 +348,7 @@ def get_help_setting() -> str:
     backup setting [--option value] ...
 
 ⚙️ Options:
-    --delay N                         Set backup delay (seconds)
+    --delay N                         Set max cooldown for files that keep changing (seconds)
     --compress-threshold-days N       Set days before auto-compression
     --gdrive-credentials PATH         Path to Google Drive credentials
     --onedrive-credentials PATH       Path to OneDrive credentials
@@ -351,18 +409,36 @@ def get_help_manual_snapshot() -> str:
     Take a manual snapshot of a source folder for a job, with an optional tag.
 
 🧾 Syntax:
-    backup snapshot -s <SOURCE> -n <JOB_NAME> [-m <TAG>]
+    backup snapshot -s <SOURCE> -n <JOB_NAME> [-m <TAG>] [-w N] [--incremental]
+                    [--dedup] [--pack] [--resume] [--archive [zip|tar.zst]] [--auto-restart]
 
 🏷️ Flags:
-    None
+    --incremental  Hard-link files unchanged since the previous full snapshot
+                   (like rsync --link-dest); default from INCREMENTAL_SNAPSHOTS
+    --dedup        Keep file contents once in BASE_BACKUP/.objects and hard-link
+                   them; default from DEDUP_STORE
+    --pack         Append files smaller than PACK_THRESHOLD_KB into a few pack
+                   segments with an index; default from PACK_SMALL_FILES
+    --resume       Continue the newest unfinished snapshot (Backup_full_<ts>.partial)
+                   of the job from its checkpoint instead of starting over
+    --archive      Stream the snapshot straight into Backup_full_<ts>.zip (default)
+                   or .tar.zst in a single read pass, with the manifest inside
+    --auto-restart Run the snapshot under relauncher.py: a run that crashes or is
+                   left unfinished is retried with --resume (up to 5 attempts)
 
 ⚙️ Options:
     -s, --source   Source folder to back up (required)
     -n, --name     Backup job name (required)
     -m, --tag      Optional tag/message for this snapshot
+    -w, --workers  Parallel copy workers (default: COPY_WORKERS from .env)
 
 🧪 Examples:
     backup snapshot -s /path/to/src -n myjob
+    backup snapshot -s /path/to/src -n myjob -w 16
+    backup snapshot -s /path/to/src -n myjob --incremental
+    backup snapshot -s /path/to/src -n myjob --resume
+    backup snapshot -s /path/to/src -n myjob --auto-restart
+    backup snapshot -s /path/to/src -n myjob --archive tar.zst
     backup snapshot -s /path/to/src -n myjob -m "Before upgrade
     """
     
@@ -405,6 +481,7 @@ def print_help(topic: Optional[str]):
         "test": get_help_test(),
         "compress": get_help_compress(),
         "decompress": get_help_decompress(),
+        "restore": get_help_restore(),
         "sync-cloud": get_help_sync_cloud(),
         "setting": get_help_setting(),
         "help": get_help_help(),
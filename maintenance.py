@@ -0,0 +1,365 @@
+# ───────────────────────────────────────────────────────────────────────
+# BACKGROUND MAINTENANCE (compression, retention, index compaction)
+# ───────────────────────────────────────────────────────────────────────
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional
+
+import psutil
+
+from backup_tool.archive_index import index_path, index_zip, write_index
+from backup_tool.change_journal import ChangeJournal
+from backup_tool.checkpoint import CHECKPOINT_NAME, partial_snapshots
+from backup_tool.config import LOAD_CONFIG
+from backup_tool.file_index import FileIndex
+from backup_tool.logger import setup_logger
+from backup_tool.object_store import ObjectStore, collect_garbage
+from backup_tool.parallel_zip import archive_steps
+from backup_tool.utils import emoji
+
+env = LOAD_CONFIG()
+BASE_BACKUP = Path(env.get("BASE_BACKUP", "backup")).resolve()
+LOGS_DIR = Path(env.get("LOGS_DIR", "logs")).resolve()
+COMPRESS_THRESHOLD_DAYS = int(env.get("COMPRESS_THRESHOLD_DAYS", "7"))
+RETENTION_DAYS = int(env.get("RETENTION_DAYS", "30"))
+MAINTENANCE_BUDGET = min(1.0, max(0.01, float(env.get("MAINTENANCE_BUDGET", "0.2"))))
+MAINTENANCE_INTERVAL = float(env.get("MAINTENANCE_INTERVAL_SECONDS", "3600"))
+
+MAINTENANCE_NICE = 10          # CPU niceness of the maintenance thread (Linux)
+MAINTENANCE_WORKERS = 2        # compression processes of background maintenance (not COMPRESS_WORKERS)
+IDLE_RECHECK = 0.5             # seconds between busy() checks while maintenance is paused
+COMPACT_BATCH = 500            # index rows checked per step
+LOCK_NAME = ".maintenance.lock"
+LOCK_STALE_SECONDS = 60        # an unreadable lock older than this is treated as abandoned
+SNAPSHOT_PREFIXES = ("snapshot_", "Backup_full_", "Backup_runtime_")
+ARCHIVE_EXTENSIONS = (".zip", ".tar.zst")  # compressed snapshots and snapshot --archive output
+_STAMP_FORMATS = ("%d-%m-%Y_%H-%M-%S", "%d-%m-%Y_%H-%M")
+
+GLOBAL_LOGGER = setup_logger(LOGS_DIR, "backup_cli")
+
+
+def snapshot_time(name: str) -> Optional[datetime]:
+    """Timestamp encoded in a snapshot folder or archive name (snapshot_…, Backup_full_…, Backup_runtime_…)."""
+    stem = name
+    for ext in ARCHIVE_EXTENSIONS:
+        if name.endswith(ext):
+            stem = name[:-len(ext)]
+            break
+    for prefix in SNAPSHOT_PREFIXES:
+        if stem.startswith(prefix):
+            for fmt in _STAMP_FORMATS:
+                try:
+                    return datetime.strptime(stem[len(prefix):], fmt)
+                except ValueError:
+                    continue
+    return None
+
+
+def _snapshots(job_dir: Path, keep=()):
+    """
+    (path, time) of the job's snapshot folders and zips, oldest first. Left out: `keep`,
+    the newest full snapshot and the runtime folder a running watcher journals into.
+    """
+    state = ChangeJournal(job_dir).load()
+    live = {job_dir / state.dest_root} if state is not None else set()
+    items = []
+    for item in job_dir.iterdir():
+        ts = snapshot_time(item.name)
+        if ts is None or item in keep or item in live or item.name.endswith(".tmp"):
+            continue
+        items.append((ts, item))
+    items.sort()
+    fulls = [item for _, item in items if item.is_dir() and item.name.startswith("Backup_full_")]
+    newest_full = fulls[-1] if fulls else None  # incremental snapshots hard-link from it
+    return [(item, ts) for ts, item in items if item != newest_full]
+
+
+# ─── Tasks: generators that yield after each small unit of work ────────
+
+def compress_old_snapshots(job_dir: Path, days: int, logger: logging.Logger, keep=()) -> Iterator[None]:
+    """Zip snapshot folders older than `days` into <folder>.zip (see parallel_zip) and remove the folder."""
+    cutoff = datetime.now() - timedelta(days=days)
+    for item, ts in _snapshots(job_dir, keep):
+        if ts >= cutoff or not item.is_dir():
+            continue
+        zip_name = item.with_name(item.name + ".zip")
+        tmp = item.with_name(item.name + ".zip.tmp")
+        done = False
+        try:
+            stats = yield from archive_steps(item, tmp, workers=MAINTENANCE_WORKERS, low_priority=True)
+            os.replace(tmp, zip_name)
+            done = True
+            shutil.rmtree(item)
+            write_index(zip_name, index_zip(zip_name))  # for `backup restore`
+            logger.info(emoji("[🗜️ COMPRESSED]") + f" {item.name} → {zip_name.name}: {stats.report()}")
+            for line in stats.type_report(top=5):
+                logger.info(f"    {line}")
+        except Exception as e:
+            logger.error(f"[⚠️ ERROR] Compressing {item}: {e}")
+        finally:
+            if not done:
+                tmp.unlink(missing_ok=True)  # interrupted or failed: the folder is still intact
+        yield
+
+
+def expire_old_snapshots(job_dir: Path, days: int, logger: logging.Logger, keep=()) -> Iterator[None]:
+    """
+    Delete snapshot folders and zips older than `days` (retention), and unfinished
+    Backup_full_….partial folders nothing has written to for `days` (an abandoned
+    snapshot would otherwise keep its object-store content alive for ever).
+    """
+    cutoff = datetime.now() - timedelta(days=days)
+    for partial in partial_snapshots(job_dir):
+        if partial in keep:
+            continue
+        try:
+            checkpoint = partial / CHECKPOINT_NAME
+            last = max(partial.stat().st_mtime, checkpoint.stat().st_mtime if checkpoint.exists() else 0)
+            if datetime.fromtimestamp(last) >= cutoff:
+                continue
+            shutil.rmtree(partial)
+            logger.info(emoji("[🗑️ DELETED]") + f" Abandoned unfinished snapshot removed: {partial.name}"
+                        f" (last written {datetime.fromtimestamp(last):%d-%m-%Y %H:%M})")
+        except FileNotFoundError:
+            continue
+        except Exception as e:
+            logger.error(f"[⚠️ ERROR] Deleting {partial}: {e}")
+        yield
+    for item, ts in _snapshots(job_dir, keep):
+        if ts >= cutoff:
+            continue
+        try:
+            if item.is_dir():
+                shutil.rmtree(item)
+            else:
+                item.unlink()
+                index_path(item).unlink(missing_ok=True)
+            logger.info(emoji("[🗑️ DELETED]") + f" Old backup removed: {item.name}")
+        except Exception as e:
+            logger.error(f"[⚠️ ERROR] Deleting {item}: {e}")
+        yield
+
+
+def compact_index(index: FileIndex, source: Path, logger: logging.Logger) -> Iterator[None]:
+    """Drop index rows of files that no longer exist in the source, then checkpoint the index."""
+    removed = 0
+    for n, rel in enumerate(index.paths(), 1):
+        if not os.path.lexists(source / rel):
+            index.remove(rel)
+            removed += 1
+        if n % COMPACT_BATCH == 0:
+            index.flush()
+            yield
+    index.compact()
+    if removed:
+        logger.info(emoji("[🧹 COMPACTED]") + f" Index: dropped {removed} rows of deleted files")
+    yield
+
+
+# ─── Scheduler ──────────────────────────────────────────────────────────
+
+class _Task:
+    __slots__ = ("name", "factory", "every", "due")
+
+    def __init__(self, name: str, factory: Callable[[], Iterator[None]], every: Optional[float]):
+        self.name = name
+        self.factory = factory
+        self.every = every       # None: run once
+        self.due = 0.0
+
+
+def _lower_priority():
+    """Low CPU and idle I/O priority for the calling thread (Linux); elsewhere a no-op."""
+    if not sys.platform.startswith("linux"):
+        return
+    tid = threading.get_native_id()
+    try:
+        os.setpriority(os.PRIO_PROCESS, tid, MAINTENANCE_NICE)
+        psutil.Process(tid).ionice(psutil.IOPRIO_CLASS_IDLE)
+    except (OSError, psutil.Error, AttributeError):
+        pass
+
+
+def _children_cpu(seen: Dict[int, float]) -> float:
+    """CPU seconds this process's children (e.g. compression workers) used since the last call."""
+    spent = 0.0
+    try:
+        children = psutil.Process().children(recursive=True)
+    except psutil.Error:
+        return 0.0
+    for child in children:
+        try:
+            t = child.cpu_times()
+        except psutil.Error:
+            continue  # exited meanwhile
+        total = t.user + t.system
+        spent += max(0.0, total - seen.get(child.pid, 0.0))
+        seen[child.pid] = total
+    return spent
+
+
+def _claim(job_dir: Path) -> bool:
+    """Take BASE_BACKUP/<job>/.maintenance.lock, so a job and a `maintain` process never work on the same folders."""
+    lock = job_dir / LOCK_NAME
+    for _ in range(2):
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                owner = int(lock.read_text().strip())
+            except (OSError, ValueError):
+                owner = None  # being written right now, or torn
+            if owner is None:
+                try:
+                    if time.time() - lock.stat().st_mtime < LOCK_STALE_SECONDS:
+                        return False
+                except OSError:
+                    continue
+            elif owner != os.getpid() and psutil.pid_exists(owner):
+                return False
+            lock.unlink(missing_ok=True)  # left behind by a dead process
+            continue
+        with os.fdopen(fd, "w") as f:
+            f.write(str(os.getpid()))
+        return True
+    return False
+
+
+class MaintenanceScheduler:
+    """
+    Runs a job's housekeeping on one background thread at low CPU and I/O priority,
+    so the copy path never compresses, deletes or compacts anything itself.
+
+    A task is a function returning a generator that yields after each small unit of
+    work (a chunk zipped, a folder deleted, a batch of index rows). The scheduler only
+    steps a task while `busy()` (the job's copy pool) reports no queued or running
+    copies, and charges every step's CPU time (its own and that of its worker processes)
+    and I/O wait against MAINTENANCE_BUDGET: with a budget of 0.2, a step that took
+    50 ms is followed by a 200 ms rest. Tasks
+    run again every `every` seconds. While one process works on a job's folders it
+    holds BASE_BACKUP/<job>/.maintenance.lock; a busy lock just postpones the cycle.
+    """
+    def __init__(self, job_dir: Path, logger: logging.Logger, busy: Optional[Callable[[], bool]] = None,
+                 budget: float = MAINTENANCE_BUDGET, name: str = "maintenance"):
+        self.job_dir = Path(job_dir)
+        self.logger = logger
+        self.busy = busy or (lambda: False)
+        self.budget = budget
+        self.name = name
+        self._tasks = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add(self, name: str, factory: Callable[[], Iterator[None]], every: Optional[float] = MAINTENANCE_INTERVAL):
+        self._tasks.append(_Task(name, factory, every))
+
+    def start(self):
+        if self._tasks:
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop after the current step; an unfinished zip is discarded, its folder stays."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def run_once(self):
+        """Run every task to completion once, on the calling thread (for the `maintain` command)."""
+        _lower_priority()
+        self._cycle(self._tasks)
+
+    def _run(self):
+        _lower_priority()
+        while not self._stop.is_set():
+            now = time.monotonic()
+            due = [t for t in self._tasks if t.due <= now]
+            if due:
+                self._cycle(due)
+            pending = [t.due for t in self._tasks if t.due != float("inf")]
+            if not pending:
+                return  # only run-once tasks, all done
+            self._stop.wait(max(IDLE_RECHECK, min(pending) - time.monotonic()))
+
+    def _cycle(self, tasks):
+        if not _claim(self.job_dir):
+            self.logger.info(emoji("[⏳ MAINTENANCE]") + f" {self.job_dir.name}: another process is maintaining it, retrying later")
+            for task in tasks:
+                task.due = time.monotonic() + (task.every or IDLE_RECHECK * 120)
+            return
+        try:
+            for task in tasks:
+                if self._stop.is_set():
+                    return
+                self._step_through(task)
+                task.due = time.monotonic() + task.every if task.every is not None else float("inf")
+        finally:
+            (self.job_dir / LOCK_NAME).unlink(missing_ok=True)
+
+    def _step_through(self, task: _Task):
+        gen = task.factory()
+        seen: Dict[int, float] = {}
+        _children_cpu(seen)  # baseline: only CPU spent from here on is charged
+        try:
+            while not self._stop.is_set():
+                while self.busy():
+                    if self._stop.wait(IDLE_RECHECK):
+                        return
+                cpu0, wall0 = time.thread_time(), time.monotonic()
+                try:
+                    next(gen)
+                except StopIteration:
+                    return
+                own = time.thread_time() - cpu0
+                io = max(0.0, time.monotonic() - wall0 - own)
+                spent = max(own + _children_cpu(seen), io)
+                if spent > 0:
+                    self._stop.wait(spent * (1 - self.budget) / self.budget)
+        except Exception as e:
+            self.logger.error(f"[⚠️ ERROR] Maintenance task '{task.name}': {e}")
+        finally:
+            gen.close()
+
+
+def job_scheduler(job_dir: Path, logger: logging.Logger, compress_days: Optional[int], index: Optional[FileIndex] = None,
+                  source: Optional[Path] = None, busy: Optional[Callable[[], bool]] = None, keep=(),
+                  every: Optional[float] = MAINTENANCE_INTERVAL) -> MaintenanceScheduler:
+    """A MaintenanceScheduler with the standard tasks for one job (compression only when `compress_days` is set)."""
+    job_dir = Path(job_dir)
+    scheduler = MaintenanceScheduler(job_dir, logger, busy=busy, name=f"maintenance-{job_dir.name}")
+    if RETENTION_DAYS > 0:  # first, so nothing is zipped just to be deleted
+        scheduler.add("retention", lambda: expire_old_snapshots(job_dir, RETENTION_DAYS, logger, keep), every)
+    if compress_days is not None:
+        scheduler.add("compress", lambda: compress_old_snapshots(job_dir, compress_days, logger, keep), every)
+    if index is not None and source is not None:
+        scheduler.add("compact", lambda: compact_index(index, source, logger), every)
+    if ObjectStore(job_dir.parent).exists():  # after retention/compression dropped snapshot links
+        scheduler.add("gc", lambda: collect_garbage(job_dir.parent, logger), every)
+    return scheduler
+
+
+def spawn_maintenance(job: str, cli_script: Path):
+    """Run `backup maintain -n <job>` as a detached low-priority process, so a snapshot returns as soon as it is written."""
+    cmd = [sys.executable, str(cli_script), "maintain", "-n", job]
+    creationflags = subprocess.CREATE_NO_WINDOW | subprocess.BELOW_NORMAL_PRIORITY_CLASS if os.name == "nt" else 0
+    try:
+        subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, stdin=subprocess.DEVNULL,
+                         creationflags=creationflags, close_fds=(os.name != "nt"))
+    except Exception as e:
+        GLOBAL_LOGGER.error(f"[⚠️ ERROR] Could not launch maintenance for '{job}': {e}")
+
+
+def run_maintenance(args):
+    """Hidden `maintain` command: compression (COMPRESS_THRESHOLD_DAYS), retention (RETENTION_DAYS) and object-store GC for one job."""
+    job_dir = BASE_BACKUP / args.name
+    if not job_dir.is_dir():
+        print(f"Error: Job folder not found: {job_dir}", file=sys.stderr)
+        return
+    job_scheduler(job_dir, GLOBAL_LOGGER, COMPRESS_THRESHOLD_DAYS, every=None).run_once()
@@ -0,0 +1,103 @@
+# ───────────────────────────────────────────────────────────────────────
+# SNAPSHOT MANIFEST (path, size, mtime, BLAKE2b)
+# ───────────────────────────────────────────────────────────────────────
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+MANIFEST_NAME = "manifest.tsv"
+HASH_DIGEST_SIZE = 32   # BLAKE2b-256
+HASH_CHUNK = 1 << 20    # 1 MiB read/hash granularity
+
+_HEADER = "# blake2b-256\tsize\tmtime_ns\tpath\n"
+
+
+def new_hasher():
+    return hashlib.blake2b(digest_size=HASH_DIGEST_SIZE)
+
+
+def hash_file(path: Path) -> str:
+    """BLAKE2b-256 of a whole file (used only when no copy pass is available to hash from)."""
+    h = new_hasher()
+    with open(path, "rb") as f:
+        for buf in iter(lambda: f.read(HASH_CHUNK), b""):
+            h.update(buf)
+    return h.hexdigest()
+
+
+class Manifest:
+    """
+    Collects one entry per backed-up file and writes them to <root>/manifest.tsv:
+
+        <blake2b-256 hex>\\t<size>\\t<mtime_ns>\\t<relative path>
+
+    The path is the last column so it may contain tabs. Safe to fill from several threads.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[int, int, str]] = {}
+
+    @classmethod
+    def load(cls, root: Path) -> "Manifest":
+        """A Manifest pre-filled from root/manifest.tsv (empty if there is none), to extend and rewrite."""
+        manifest = cls()
+        manifest._entries.update(load_manifest(root) or {})
+        return manifest
+
+    def add(self, rel_path, st: os.stat_result, digest: str):
+        key = str(rel_path).replace("\\", "/")
+        with self._lock:
+            self._entries[key] = (st.st_size, st.st_mtime_ns, digest)
+
+    def remove(self, rel_path):
+        with self._lock:
+            self._entries.pop(str(rel_path).replace("\\", "/"), None)
+
+    def rename(self, old_path, new_path, tree: bool = False):
+        old = str(old_path).replace("\\", "/")
+        new = str(new_path).replace("\\", "/")
+        with self._lock:
+            keys = [old] + ([k for k in self._entries if k.startswith(old + "/")] if tree else [])
+            for key in keys:
+                if key in self._entries:
+                    self._entries[new + key[len(old):]] = self._entries.pop(key)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, rel_path):
+        return str(rel_path).replace("\\", "/") in self._entries
+
+    def lines(self):
+        """The manifest.tsv lines, header first, sorted by path."""
+        with self._lock:
+            items = sorted(self._entries.items())
+        yield _HEADER
+        for rel, (size, mtime_ns, digest) in items:
+            yield f"{digest}\t{size}\t{mtime_ns}\t{rel}\n"
+
+    def write(self, root: Path) -> Path:
+        """Atomically (re)write root/manifest.tsv, sorted by path."""
+        target = root / MANIFEST_NAME
+        tmp = root / (MANIFEST_NAME + ".tmp")
+        with open(tmp, "w", encoding="utf-8", newline="\n") as f:
+            f.writelines(self.lines())
+        os.replace(tmp, target)
+        return target
+
+
+def load_manifest(root: Path) -> Optional[Dict[str, Tuple[int, int, str]]]:
+    """Read root/manifest.tsv back into {rel_path: (size, mtime_ns, digest)}; None if absent."""
+    path = root / MANIFEST_NAME
+    if not path.exists():
+        return None
+    entries = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("#") or not line.strip():
+                continue
+            digest, size, mtime_ns, rel = line.rstrip("\n").split("\t", 3)
+            entries[rel] = (int(size), int(mtime_ns), digest)
+    return entries
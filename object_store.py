@@ -0,0 +1,228 @@
+# ───────────────────────────────────────────────────────────────────────
+# CONTENT-ADDRESSED OBJECT STORE (BASE_BACKUP/.objects, whole-file dedup)
+# ───────────────────────────────────────────────────────────────────────
+import io
+import logging
+import os
+import time
+import uuid
+import zipfile
+from pathlib import Path
+from typing import Iterator, Optional, Set, Tuple
+
+from backup_tool.config import LOAD_CONFIG
+from backup_tool.copy_engine import copy_and_hash
+from backup_tool.manifest import hash_file, load_manifest
+from backup_tool.tree_walker import walk_tree
+from backup_tool.utils import emoji
+
+env = LOAD_CONFIG()
+DEDUP_STORE = env.get("DEDUP_STORE", "false").lower() in ("1", "true", "yes")
+
+OBJECTS_DIR = ".objects"
+TMP_STALE_SECONDS = 3600   # leftovers of an interrupted add() older than this are swept
+GRACE_SECONDS = 3600       # objects added or reused this recently are never swept (a snapshot may be about to list them)
+GC_BATCH = 500             # objects checked between scheduler yields
+
+
+class ObjectStore:
+    """
+    One copy of every distinct file content under BASE_BACKUP/.objects/<2 hex>/<rest>,
+    named by its BLAKE2b-256 (the digest the manifests already record), shared by
+    every job. Snapshot files are hard links to their object, so a snapshot is still
+    a plain, complete folder while identical content takes space once.
+
+    The reference count of an object is its hard-link count: st_nlink - 1 snapshots
+    use it. Objects are only ever created whole (written under .objects/tmp, linked
+    into the snapshot, then linked into place), so the count never drops to zero
+    for an object a snapshot is about to use. Snapshot files must therefore never
+    be modified in place; full snapshots are not (the watcher writes its own
+    Backup_runtime_ folder, which does not use the store).
+
+    Chunks of large files (see chunk_store) live in the same namespace but are not
+    linked into snapshots; a <file>.cdc recipe in the snapshot lists them instead.
+    """
+    def __init__(self, base: Path):
+        self.root = Path(base) / OBJECTS_DIR
+        self.tmp = self.root / "tmp"
+        self.available = True   # False once hard links failed (FAT, some network shares)
+
+    def exists(self) -> bool:
+        return self.root.is_dir()
+
+    def path_for(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest[2:]
+
+    @staticmethod
+    def _link(obj: Path, dst_file: Path):
+        try:
+            os.link(obj, dst_file)
+        except FileExistsError:
+            dst_file.unlink()
+            os.link(obj, dst_file)
+
+    def put(self, src_file: Path, dst_file: Path, st: os.stat_result,
+            digest: Optional[str] = None) -> Tuple[str, str, os.stat_result]:
+        """
+        Make `dst_file` a copy of `src_file` (stat `st`) through the store; returns
+        (outcome, digest, stat). "deduped": the content was already stored and is
+        linked, nothing written. Otherwise the copy strategy used to add it. A file
+        whose hash is not known yet is hashed first (a read) so duplicates are never
+        written. A new object is copied and hashed in one pass and stored under the
+        digest of the bytes actually written, so a file that changed since it was
+        hashed (or a stale `digest`) cannot leave an object under the wrong name; the
+        returned digest and stat are those of the copy.
+        """
+        digest = digest or hash_file(src_file)
+        if not self.available:
+            return copy_and_hash(src_file, dst_file)
+        try:
+            self._link(self.path_for(digest), dst_file)
+            return "deduped", digest, st
+        except FileNotFoundError:
+            pass  # not stored yet (or swept a moment ago)
+        except OSError:
+            self.available = False  # no hard links here: plain copies from now on
+            return copy_and_hash(src_file, dst_file)
+        self.tmp.mkdir(parents=True, exist_ok=True)
+        tmp = self.tmp / uuid.uuid4().hex
+        try:
+            outcome, digest, st = copy_and_hash(src_file, tmp)
+            self._link(tmp, dst_file)
+            obj = self.path_for(digest)
+            obj.parent.mkdir(exist_ok=True)
+            try:
+                os.link(tmp, obj)
+            except FileExistsError:
+                pass  # another snapshot stored the same content meanwhile; ours stays a private copy
+        finally:
+            tmp.unlink(missing_ok=True)
+        return outcome, digest, st
+
+    def put_chunk(self, digest: str, data: bytes) -> bool:
+        """Store one chunk unless it is already there; True if it was written."""
+        obj = self.path_for(digest)
+        try:
+            st = obj.stat()
+            os.utime(obj, ns=(st.st_atime_ns, st.st_mtime_ns))  # same times, new ctime: GC grace for a reused chunk
+            return False
+        except FileNotFoundError:
+            pass
+        self.tmp.mkdir(parents=True, exist_ok=True)
+        tmp = self.tmp / uuid.uuid4().hex
+        try:
+            with open(tmp, "wb") as f:
+                f.write(data)
+            obj.parent.mkdir(exist_ok=True)
+            os.replace(tmp, obj)  # same name, same content: a concurrent writer's copy is as good as ours
+        finally:
+            tmp.unlink(missing_ok=True)
+        return True
+
+
+def _recipe_digests(snap: Path) -> Iterator[str]:
+    """Chunk digests referenced by the .cdc recipes of one snapshot folder or archive."""
+    from backup_tool.archive_index import ensure_index, read_entry
+    from backup_tool.chunk_store import PENDING_SUFFIX, RECIPE_SUFFIX, pending_digests, recipe_digests
+
+    if snap.is_dir():
+        for rel, entry in walk_tree(snap):
+            if rel.endswith(RECIPE_SUFFIX):
+                with open(entry.path, "r", encoding="utf-8") as f:
+                    yield from recipe_digests(f.read())
+            elif rel.endswith(RECIPE_SUFFIX + PENDING_SUFFIX):
+                try:
+                    with open(entry.path, "r", encoding="utf-8") as f:
+                        yield from pending_digests(f.read())
+                except FileNotFoundError:
+                    # finished since the folder was listed: its recipe exists now (unless it failed)
+                    try:
+                        with open(entry.path[:-len(PENDING_SUFFIX)], "r", encoding="utf-8") as f:
+                            yield from recipe_digests(f.read())
+                    except FileNotFoundError:
+                        pass
+        return
+    recipes = [e for e in ensure_index(snap) if e.path.endswith(RECIPE_SUFFIX)]
+    if recipes:
+        with open(snap, "rb") as f:
+            for e in recipes:
+                buf = io.BytesIO()
+                read_entry(f, e, buf)
+                yield from recipe_digests(buf.getvalue().decode("utf-8"))
+
+
+def _live_digests(base: Path) -> Set[str]:
+    """
+    Mark phase: every digest listed in the manifest of a snapshot folder of any job,
+    plus every chunk listed in a recipe of a snapshot folder or archive, or in the
+    .cdc.pending journal of a file still being chunked.
+    """
+    marked = set()
+    for job_dir in base.iterdir():
+        if not job_dir.is_dir() or job_dir.name.startswith("."):
+            continue
+        for snap in job_dir.iterdir():
+            if not snap.name.startswith(("Backup_", "snapshot_")):
+                continue
+            if snap.is_dir():
+                marked.update(digest for _size, _mtime, digest in (load_manifest(snap) or {}).values())
+            elif not snap.name.endswith((".zip", ".tar.zst")):
+                continue
+            try:
+                marked.update(_recipe_digests(snap))
+            except (ValueError, OSError, zipfile.BadZipFile) as e:
+                # an unreadable recipe must not get its chunks swept: skip the sweep altogether
+                raise RuntimeError(f"Reading chunk recipes of {snap} failed: {e}") from e
+    return marked
+
+
+def collect_garbage(base: Path, logger: logging.Logger) -> Iterator[None]:
+    """
+    Mark and sweep the object store: an object is deleted when no snapshot file links
+    to it (st_nlink == 1) and no surviving snapshot manifest lists its digest.
+    Objects touched within GRACE_SECONDS are kept, and stale temporary files of
+    interrupted adds go. Yields every GC_BATCH objects.
+    """
+    store = ObjectStore(base)
+    if not store.exists():
+        return
+    try:
+        marked = _live_digests(Path(base))
+    except RuntimeError as e:
+        logger.error(f"[⚠️ ERROR] Object store GC skipped: {e}")
+        return
+    yield
+    removed = freed = 0
+    checked = 0
+    for fan in store.root.iterdir():
+        if not fan.is_dir():
+            continue
+        is_tmp = fan == store.tmp
+        for obj in fan.iterdir():
+            checked += 1
+            try:
+                st = obj.stat()
+                if is_tmp:
+                    garbage = time.time() - st.st_ctime > TMP_STALE_SECONDS  # mtime is the source's
+                else:
+                    garbage = (st.st_nlink <= 1 and (fan.name + obj.name) not in marked
+                               and time.time() - st.st_ctime > GRACE_SECONDS)
+                if garbage:
+                    obj.unlink()
+                    removed += 1
+                    freed += st.st_size
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.error(f"[⚠️ ERROR] Sweeping {obj}: {e}")
+            if checked % GC_BATCH == 0:
+                yield
+    if removed:
+        logger.info(emoji("[🧹 GC]") + f" Object store: removed {removed} unreferenced objects, {freed / 2**20:.1f} MiB freed")
+    yield
+
+
+def run_gc(base: Path, logger: logging.Logger):
+    """collect_garbage() in one go, after a cleanup command deleted snapshots."""
+    for _ in collect_garbage(base, logger):
+        pass
@@ -0,0 +1,204 @@
+# ───────────────────────────────────────────────────────────────────────
+# PACK SEGMENTS (small files of a snapshot appended into a few large files)
+# ───────────────────────────────────────────────────────────────────────
+import io
+import itertools
+import os
+import threading
+import zipfile
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from backup_tool.archive_index import IndexEntry, read_entry
+from backup_tool.config import LOAD_CONFIG
+from backup_tool.manifest import new_hasher
+
+env = LOAD_CONFIG()
+PACK_SMALL_FILES = env.get("PACK_SMALL_FILES", "false").lower() in ("1", "true", "yes")
+PACK_THRESHOLD_KB = int(env.get("PACK_THRESHOLD_KB", "64") or 64)
+PACK_THRESHOLD_BYTES = PACK_THRESHOLD_KB * 1024
+
+PACK_DIR = ".packs"
+PACK_INDEX = f"{PACK_DIR}/index.tsv"
+SEGMENT_BYTES = 64 * 1024 * 1024   # a new segment once this much was appended
+WRITE_BUFFER = 1024 * 1024
+
+_HEADER = "# segment\toffset\tlength\tmode\tmtime_ns\tpath\n"
+
+
+class PackEntry(NamedTuple):
+    """Where one packed file is: `length` bytes at `offset` in <snapshot>/.packs/<segment>."""
+    path: str
+    segment: str
+    offset: int
+    length: int
+    mode: int
+    mtime_ns: int
+
+
+class PackWriter:
+    """
+    Appends small files to segment files under <snapshot>/.packs/ instead of creating
+    one file each; close() writes .packs/index.tsv. Every copy worker thread appends
+    to its own open segment, so adds never wait on each other. Segments left by an
+    interrupted attempt are kept; new ones are numbered after them.
+    """
+    def __init__(self, root: Path):
+        self.dir = Path(root) / PACK_DIR
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.entries: List[PackEntry] = []
+        numbers = [int(p.name[4:-5]) for p in self.dir.glob("seg-*.pack") if p.name[4:-5].isdigit()]
+        self._numbers = itertools.count(max(numbers, default=0) + 1)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.segments = []
+
+    def _segment(self, size: int):
+        seg = getattr(self._local, "seg", None)
+        if seg is None or (seg[2] and seg[2] + size > SEGMENT_BYTES):
+            with self._lock:
+                name = f"seg-{next(self._numbers):05d}.pack"
+                f = open(self.dir / name, "wb", buffering=WRITE_BUFFER)
+                self.segments.append(f)
+            seg = self._local.seg = [name, f, 0]
+        return seg
+
+    def add(self, src_file: Path, rel: str, st: os.stat_result) -> Tuple[str, PackEntry]:
+        """Append `src_file` (stat `st`) as `rel`; returns (its BLAKE2b, its entry)."""
+        with open(src_file, "rb", buffering=0) as f:
+            data = f.read()
+        seg = self._segment(len(data))
+        name, out, offset = seg
+        out.write(data)
+        seg[2] += len(data)
+        hasher = new_hasher()
+        hasher.update(data)
+        entry = PackEntry(rel, name, offset, len(data), st.st_mode & 0o7777, st.st_mtime_ns)
+        with self._lock:
+            self.entries.append(entry)
+        return hasher.hexdigest(), entry
+
+    def keep(self, entry: PackEntry):
+        """List a file an interrupted attempt already packed (its bytes stay where they are)."""
+        with self._lock:
+            self.entries.append(entry)
+
+    def flush(self):
+        """Push every segment's buffered bytes to disk."""
+        with self._lock:
+            for f in self.segments:
+                f.flush()
+                os.fsync(f.fileno())
+
+    def close(self) -> Path:
+        """Close every segment and atomically write .packs/index.tsv."""
+        for f in self.segments:
+            f.close()
+        target = self.dir.parent / PACK_INDEX
+        tmp = target.with_name(target.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8", newline="\n") as f:
+            f.write(_HEADER)
+            for e in sorted(self.entries):
+                f.write(f"{e.segment}\t{e.offset}\t{e.length}\t{e.mode:o}\t{e.mtime_ns}\t{e.path}\n")
+        os.replace(tmp, target)
+        return target
+
+
+def parse_pack_index(text: str) -> List[PackEntry]:
+    entries = []
+    for line in text.splitlines():
+        if line.startswith("#") or not line.strip():
+            continue
+        segment, offset, length, mode, mtime_ns, rel = line.split("\t", 5)
+        entries.append(PackEntry(rel, segment, int(offset), int(length), int(mode, 8), int(mtime_ns)))
+    return entries
+
+
+def load_pack_index(source: Path, archive_entries: Optional[List[IndexEntry]] = None) -> Optional[List[PackEntry]]:
+    """
+    The packed files of a snapshot folder, or of an archive given its index entries;
+    None if the snapshot has no packs.
+    """
+    if archive_entries is None:
+        path = source / PACK_INDEX
+        if not path.is_file():
+            return None
+        return parse_pack_index(path.read_text(encoding="utf-8"))
+    member = next((e for e in archive_entries if e.path == PACK_INDEX), None)
+    if member is None:
+        return None
+    buf = io.BytesIO()
+    with open(source, "rb") as f:
+        read_entry(f, member, buf)
+    return parse_pack_index(buf.getvalue().decode("utf-8"))
+
+
+def is_pack_member(rel: str) -> bool:
+    """True for the segment files and index, which are listed and restored through the index only."""
+    return rel.startswith(PACK_DIR + "/")
+
+
+class _RangeSink:
+    """Writable that keeps only the given (offset, length) ranges of what is streamed through it."""
+    def __init__(self, ranges: List[Tuple[int, int]]):
+        self._ranges = ranges          # sorted by offset
+        self._next = 0
+        self._pos = 0
+        self.parts: Dict[Tuple[int, int], io.BytesIO] = {r: io.BytesIO() for r in ranges}
+
+    def write(self, buf) -> int:
+        view = memoryview(buf)
+        start, end = self._pos, self._pos + len(view)
+        i = self._next
+        while i < len(self._ranges):
+            offset, length = self._ranges[i]
+            if offset >= end:
+                break
+            lo, hi = max(offset, start), min(offset + length, end)
+            if hi > lo:
+                self.parts[(offset, length)].write(view[lo - start:hi - start])
+            if offset + length > end:
+                break
+            i += 1
+        self._next = i
+        self._pos = end
+        return len(view)
+
+
+def read_packed(source: Path, entries: List[PackEntry], archive_entries: Optional[List[IndexEntry]] = None
+                ) -> Iterator[Tuple[PackEntry, Optional[bytes], Optional[Exception]]]:
+    """
+    Yield (entry, data, error) for each packed file in `entries`, reading every
+    segment once: seeks within it in a snapshot folder, one streaming pass over the
+    segment member in an archive.
+    """
+    by_segment: Dict[str, List[PackEntry]] = {}
+    for e in entries:
+        by_segment.setdefault(e.segment, []).append(e)
+    members = {e.path: e for e in archive_entries} if archive_entries is not None else None
+    for segment, group in sorted(by_segment.items()):
+        group.sort(key=lambda e: e.offset)
+        done = 0
+        try:
+            if members is None:
+                with open(source / PACK_DIR / segment, "rb") as f:
+                    for e in group:
+                        f.seek(e.offset)
+                        data = f.read(e.length)
+                        if len(data) != e.length:
+                            raise ValueError(f"Truncated pack segment {segment}")
+                        yield e, data, None
+                        done += 1
+            else:
+                member = members.get(f"{PACK_DIR}/{segment}")
+                if member is None:
+                    raise ValueError(f"Pack segment {segment} is missing from {source.name}")
+                sink = _RangeSink(sorted({(e.offset, e.length) for e in group}))
+                with open(source, "rb") as f:
+                    read_entry(f, member, sink)
+                for e in group:
+                    yield e, sink.parts[(e.offset, e.length)].getvalue(), None
+                    done += 1
+        except (ValueError, OSError, zipfile.BadZipFile) as err:
+            for e in group[done:]:
+                yield e, None, err
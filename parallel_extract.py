@@ -0,0 +1,222 @@
+# ───────────────────────────────────────────────────────────────────────
+# PARALLEL EXTRACTION (decompress)
+# ───────────────────────────────────────────────────────────────────────
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from backup_tool.archive_index import IndexEntry, ensure_index, read_entry, read_frame, read_manifest
+from backup_tool.parallel_zip import COMPRESS_WORKERS, member_path
+
+PROGRESS_SECONDS = 2.0
+RESTORING_SUFFIX = ".restoring"   # a member is written to <name>.restoring and renamed once verified
+
+
+class ExtractStats:
+    """Totals of one extraction, for the progress line and the final report."""
+    def __init__(self, total_files: int, total_bytes: int, workers: int):
+        self.total_files = total_files
+        self.total_bytes = total_bytes
+        self.workers = workers
+        self.files = 0
+        self.bytes = 0
+        self.failed = 0
+        self.rejected = 0
+        self.started = time.monotonic()
+        self.seconds = 0.0
+
+    def progress(self) -> str:
+        pct = 100 * self.bytes / self.total_bytes if self.total_bytes else 100
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        return (f"{pct:3.0f}% {self.files}/{self.total_files} files, {self.bytes / 2**20:.1f}/"
+                f"{self.total_bytes / 2**20:.1f} MiB, {self.bytes / 2**20 / elapsed:.1f} MiB/s")
+
+    def report(self) -> str:
+        problems = []
+        if self.failed:
+            problems.append(f"{self.failed} failed")
+        if self.rejected:
+            problems.append(f"{self.rejected} unsafe paths skipped")
+        rate = self.bytes / 2**20 / self.seconds if self.seconds else 0.0
+        return (f"{self.files} files, {self.bytes / 2**20:.1f} MiB in {self.seconds:.1f} s, {rate:.1f} MiB/s "
+                f"[{self.workers} workers]" + (f" ({', '.join(problems)})" if problems else ""))
+
+
+def _preallocate(f, size: int):
+    """Reserve `size` bytes for a file about to be written, so large members do not fragment; best effort."""
+    if size and hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(f.fileno(), 0, size)
+        except OSError:
+            pass  # e.g. not supported by the filesystem
+
+
+def _member_mtimes(archive: Path, entries: List[IndexEntry]) -> Dict[str, int]:
+    """mtime_ns of each member: exact from the manifest.tsv member, else the zip's 2-second DOS time."""
+    mtimes = {}
+    if archive.name.endswith(".zip"):
+        with zipfile.ZipFile(archive, "r") as zf:
+            for info in zf.infolist():
+                mtimes[info.filename] = int(datetime(*info.date_time).timestamp()) * 10**9
+    for rel, (_size, mtime_ns, _digest) in read_manifest(archive, entries).items():
+        mtimes[rel] = mtime_ns
+    return mtimes
+
+
+def extract_archive(archive: Path, dest_dir: Path, workers: Optional[int] = None,
+                    progress: Optional[Callable[[ExtractStats], None]] = None, logger=None) -> ExtractStats:
+    """
+    Extract every member of the zip or tar.zst `archive` under `dest_dir` on `workers`
+    threads (default COMPRESS_WORKERS, all cores); the decompressors release the GIL.
+
+    Work is planned from the archive index (see archive_index): each zip member, or
+    each zstd frame of a tar.zst, is one unit, largest first, and every worker thread
+    reads through its own file handle. Member paths are checked before anything is
+    written (no absolute paths, '..' or paths through symlinks out of `dest_dir`);
+    destination files are preallocated, every member is written to <name>.restoring
+    and renamed into place only after its CRC-32/BLAKE2b check passes (a member that
+    fails is deleted and counted in stats.failed), and mtimes are restored in one pass
+    at the end. progress(stats) is called at most every PROGRESS_SECONDS.
+    """
+    archive = Path(archive)
+    dest_dir = Path(dest_dir).resolve()
+    workers = max(1, workers or COMPRESS_WORKERS)
+    entries = ensure_index(archive)
+
+    # Validate every destination first; nothing is written for an unsafe name
+    targets: Dict[str, Path] = {}
+    rejected = 0
+    checked_dirs: Dict[Path, bool] = {}
+    for entry in entries:
+        try:
+            target = member_path(dest_dir, entry.path)
+        except ValueError as e:
+            rejected += 1
+            if logger:
+                logger.warning(f"[⚠️ WARNING] {e}: skipped")
+            continue
+        parent = target.parent
+        if parent not in checked_dirs:
+            checked_dirs[parent] = parent.resolve().is_relative_to(dest_dir)  # before mkdir: may follow symlinks
+            if checked_dirs[parent]:
+                parent.mkdir(parents=True, exist_ok=True)
+        if not checked_dirs[parent]:
+            rejected += 1
+            if logger:
+                logger.warning(f"[⚠️ WARNING] {entry.path!r} leads outside {dest_dir} through a symlink: skipped")
+            continue
+        targets[entry.path] = target
+
+    wanted = [e for e in entries if e.path in targets]
+    if archive.name.endswith(".zip"):
+        units = [[e] for e in wanted]
+    else:
+        frames: Dict[int, List[IndexEntry]] = {}
+        for e in wanted:
+            frames.setdefault(e.offset, []).append(e)
+        units = [sorted(group, key=lambda e: e.skip) for group in frames.values()]
+    units.sort(key=lambda unit: sum(e.size for e in unit), reverse=True)
+
+    stats = ExtractStats(len(wanted), sum(e.size for e in wanted), workers)
+    stats.rejected = rejected
+    lock = threading.Lock()
+    last_report = [time.monotonic()]
+    local = threading.local()
+    handles = []
+
+    def _handle():
+        if not hasattr(local, "f"):
+            local.f = open(archive, "rb")
+            with lock:
+                handles.append(local.f)
+        return local.f
+
+    restored, reported = set(), set()   # members moved into place / already counted as failed
+
+    def _partial(entry: IndexEntry) -> Path:
+        target = targets[entry.path]
+        return target.with_name(target.name + RESTORING_SUFFIX)
+
+    def _open_dest(entry: IndexEntry):
+        out = open(_partial(entry), "wb")
+        _preallocate(out, entry.size)
+        return out
+
+    def _done(entry: IndexEntry):
+        """The member passed its check: move it into place and count it."""
+        os.replace(_partial(entry), targets[entry.path])
+        with lock:
+            restored.add(entry.path)
+            stats.files += 1
+            stats.bytes += entry.size
+            now = time.monotonic()
+            if progress and now - last_report[0] >= PROGRESS_SECONDS:
+                last_report[0] = now
+                progress(stats)
+
+    def _extract(unit: List[IndexEntry]):
+        f = _handle()
+        if unit[0].crc is not None:  # zip member
+            entry = unit[0]
+            try:
+                with _open_dest(entry) as out:
+                    read_entry(f, entry, out)
+            except BaseException:
+                _partial(entry).unlink(missing_ok=True)
+                raise
+            _done(entry)
+        else:
+            def _frame_done(entry: IndexEntry, error: Optional[ValueError]):
+                if error is None:
+                    _done(entry)
+                    return
+                _partial(entry).unlink(missing_ok=True)
+                with lock:
+                    reported.add(entry.path)
+                    stats.failed += 1
+                if logger:
+                    logger.error(f"[❌ ERROR] Extracting {entry.path}: {error}")
+
+            try:
+                read_frame(f, unit, _open_dest, _frame_done)
+            except BaseException:
+                for entry in unit:
+                    if entry.path not in restored:
+                        _partial(entry).unlink(missing_ok=True)
+                raise
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="extract") as pool:
+            futures = {pool.submit(_extract, unit): unit for unit in units}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    unit = futures[future]
+                    failed = [entry for entry in unit if entry.path not in restored and entry.path not in reported]
+                    with lock:
+                        stats.failed += len(failed)
+                    if logger:
+                        logger.error(f"[❌ ERROR] Extracting {failed[0].path if failed else unit[0].path}"
+                                     + (f" (+{len(failed) - 1} more in its frame)" if len(failed) > 1 else "") + f": {e}")
+    finally:
+        for f in handles:
+            f.close()
+
+    # Bulk mtime pass once every file is complete (writing would bump them again);
+    # members that failed were never moved into place and keep no mtime
+    for rel, mtime_ns in _member_mtimes(archive, entries).items():
+        if rel in restored:
+            try:
+                os.utime(targets[rel], ns=(mtime_ns, mtime_ns))
+            except OSError:
+                pass
+    stats.seconds = time.monotonic() - stats.started
+    if progress:
+        progress(stats)
+    return stats
@@ -0,0 +1,506 @@
+# ───────────────────────────────────────────────────────────────────────
+# PARALLEL ZIP ENGINE (multi-core compression, selectable codecs)
+# ───────────────────────────────────────────────────────────────────────
+import bz2
+import lzma
+import multiprocessing
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, Optional
+
+from backup_tool.compress_policy import DEFAULT_POLICY, CompressionPolicy, file_type
+from backup_tool.config import LOAD_CONFIG
+from backup_tool.manifest import new_hasher
+
+try:                                    # Python 3.14+
+    from compression import zstd as _zstd
+except ImportError:
+    try:
+        import zstandard as _zstd       # optional third-party package
+    except ImportError:
+        _zstd = None
+
+env = LOAD_CONFIG()
+COMPRESS_CODEC = env.get("COMPRESS_CODEC", "deflate").strip().lower()
+COMPRESS_LEVEL = int(env["COMPRESS_LEVEL"]) if str(env.get("COMPRESS_LEVEL", "")).strip() else None
+COMPRESS_WORKERS = int(env.get("COMPRESS_WORKERS", "0")) or os.cpu_count() or 1
+
+ZIP_ZSTD = 93                  # ZIP method id of Zstandard (APPNOTE 6.3.7)
+CHUNK_BYTES = 16 << 20         # deflate members are split into chunks of this size, compressed in parallel
+SPOOL_BYTES = 64 << 20         # larger members of the other codecs are compressed to a temp file, not memory
+DEFLATE_WINDOW = 32 << 10      # history primed into each deflate chunk, as pigz does
+READ_CHUNK = 1 << 20
+
+CODECS = {  # name -> (ZIP method, default level, chunkable)
+    "deflate": (zipfile.ZIP_DEFLATED, 6, True),
+    "bz2": (zipfile.ZIP_BZIP2, 9, False),
+    "lzma": (zipfile.ZIP_LZMA, 6, False),
+    "zstd": (ZIP_ZSTD, 3, False),
+}
+
+
+def available_codecs() -> list:
+    return [name for name in CODECS if name != "zstd" or _zstd is not None]
+
+
+def check_codec(codec: str) -> str:
+    codec = (codec or COMPRESS_CODEC).lower()
+    if codec not in CODECS:
+        raise ValueError(f"Unknown codec '{codec}' (choose from {', '.join(CODECS)})")
+    if codec == "zstd" and _zstd is None:
+        raise ValueError("Codec 'zstd' needs Python 3.14+ or the 'zstandard' package")
+    return codec
+
+
+# ─── Codecs (run in the worker processes) ───────────────────────────────
+
+class _LZMAZipCompressor:
+    """LZMA with the 4-byte version/properties header ZIP expects (same as zipfile's, plus a preset)."""
+    def __init__(self, preset: int):
+        props = lzma._encode_filter_properties({"id": lzma.FILTER_LZMA1, "preset": preset})
+        self._header = struct.pack("<BBH", 9, 4, len(props)) + props
+        self._comp = lzma.LZMACompressor(lzma.FORMAT_RAW, filters=[
+            lzma._decode_filter_properties(lzma.FILTER_LZMA1, props)])
+
+    def compress(self, data: bytes) -> bytes:
+        out, self._header = self._header + self._comp.compress(data), b""
+        return out
+
+    def flush(self) -> bytes:
+        return self._header + self._comp.flush()
+
+
+def _compressor(codec: str, level: int):
+    if codec == "deflate":
+        return zlib.compressobj(level, zlib.DEFLATED, -15)
+    if codec == "bz2":
+        return bz2.BZ2Compressor(level)
+    if codec == "lzma":
+        return _LZMAZipCompressor(level)
+    if _zstd.__name__ == "zstandard":
+        return _zstd.ZstdCompressor(level=level).compressobj()
+    return _zstd.ZstdCompressor(level=level)
+
+
+def zstd_writer(fileobj, level: int, workers: int):
+    """Writable stream that zstd-compresses into `fileobj` on `workers` threads (tar.zst archives)."""
+    if _zstd is None:
+        raise ValueError("tar.zst archives need Python 3.14+ or the 'zstandard' package")
+    if _zstd.__name__ == "zstandard":
+        return _zstd.ZstdCompressor(level=level, threads=workers).stream_writer(fileobj)
+    param = _zstd.CompressionParameter
+    try:
+        return _zstd.ZstdFile(fileobj, "w", options={param.compression_level: level, param.nb_workers: workers})
+    except _zstd.ZstdError:
+        return _zstd.ZstdFile(fileobj, "w", level=level)  # libzstd built without threads
+
+
+def zstd_end_frame(writer):
+    """End the current zstd frame of a zstd_writer(); decompression can start afresh at the next output byte."""
+    if _zstd.__name__ == "zstandard":
+        writer.flush(_zstd.FLUSH_FRAME)
+    else:
+        writer.flush(writer.FLUSH_FRAME)
+
+
+def zstd_reader(fileobj):
+    """Readable stream of the decompressed data of the zstd stream `fileobj`."""
+    if _zstd is None:
+        raise ValueError("tar.zst archives need Python 3.14+ or the 'zstandard' package")
+    if _zstd.__name__ == "zstandard":
+        return _zstd.ZstdDecompressor().stream_reader(fileobj, read_across_frames=True)
+    return _zstd.ZstdFile(fileobj, "r")
+
+
+def _decompressor(method: int):
+    """Streaming decompressor for the raw data of a zip member written with `method`."""
+    if method == zipfile.ZIP_STORED:
+        return _Stored()
+    if method == zipfile.ZIP_DEFLATED:
+        return zlib.decompressobj(-zlib.MAX_WBITS)
+    if method == zipfile.ZIP_BZIP2:
+        return bz2.BZ2Decompressor()
+    if method == zipfile.ZIP_LZMA:
+        return zipfile.LZMADecompressor()
+    if method != ZIP_ZSTD or _zstd is None:
+        raise NotImplementedError(f"Compression method {method} is not supported")
+    if _zstd.__name__ == "zstandard":
+        return _zstd.ZstdDecompressor().decompressobj()
+    return _zstd.ZstdDecompressor()
+
+
+def _chunk(path: str, offset: int, length: int, level: int, last: bool, store: bool = False):
+    """
+    One piece of a deflate or stored member. Deflate pieces are raw deflate streams
+    primed with the preceding 32 KiB and byte-aligned unless last. None if a
+    single-piece member's file is gone.
+    """
+    try:
+        f = open(path, "rb")
+    except (FileNotFoundError, PermissionError):
+        if offset == 0 and last:
+            return None
+        raise
+    with f:
+        if store:
+            f.seek(offset)
+            data = f.read() if last else f.read(length)
+            return zlib.crc32(data), len(data), data, None, None
+        prime_from = max(0, offset - DEFLATE_WINDOW)
+        f.seek(prime_from)
+        prime = f.read(offset - prime_from)
+        data = f.read() if last else f.read(length)
+    comp = zlib.compressobj(level, zlib.DEFLATED, -15, zdict=prime) if prime else zlib.compressobj(level, zlib.DEFLATED, -15)
+    out = comp.compress(data) + comp.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+    return zlib.crc32(data), len(data), out, None, None
+
+
+class _Store:
+    def compress(self, data: bytes) -> bytes:
+        return data
+
+    def flush(self) -> bytes:
+        return b""
+
+
+class _Stored:
+    def decompress(self, data: bytes) -> bytes:
+        return data
+
+
+def _whole_member(path: str, codec: str, level: int, spool: Optional[str], store: bool = False, hashing: bool = False):
+    """
+    A complete member in one stream; written to `spool` instead of returned when given.
+    With `hashing`, the BLAKE2b of the content comes back too (same read pass). None
+    if the file is gone.
+    """
+    try:
+        f = open(path, "rb")
+    except (FileNotFoundError, PermissionError):
+        return None  # vanished (or locked) since it was listed: left out of the archive
+    comp = _Store() if store else _compressor(codec, level)
+    hasher = new_hasher() if hashing else None
+    crc, size = 0, 0
+    parts = []
+    out = open(spool, "wb") if spool else None
+    try:
+        with f:
+            for buf in iter(lambda: f.read(READ_CHUNK), b""):
+                crc = zlib.crc32(buf, crc)
+                size += len(buf)
+                if hasher is not None:
+                    hasher.update(buf)
+                piece = comp.compress(buf)
+                out.write(piece) if out else parts.append(piece)
+        piece = comp.flush()
+        out.write(piece) if out else parts.append(piece)
+    finally:
+        if out:
+            out.close()
+    return crc, size, (None if out else b"".join(parts)), spool, (hasher.hexdigest() if hasher else None)
+
+
+def _lower_worker_priority():
+    import psutil
+    try:
+        proc = psutil.Process()
+        proc.nice(psutil.BELOW_NORMAL_PRIORITY_CLASS if os.name == "nt" else 10)
+        if sys.platform.startswith("linux"):
+            proc.ionice(psutil.IOPRIO_CLASS_IDLE)
+    except (psutil.Error, OSError, AttributeError):
+        pass
+
+
+# ─── Archive assembly (in the calling process) ──────────────────────────
+
+def crc32_combine(crc1: int, crc2: int, len2: int) -> int:
+    """CRC-32 of A+B from crc32(A), crc32(B) and len(B) (zlib's crc32_combine)."""
+    def times(mat, vec):
+        total, i = 0, 0
+        while vec:
+            if vec & 1:
+                total ^= mat[i]
+            vec >>= 1
+            i += 1
+        return total
+
+    def square(mat):
+        return [times(mat, mat[n]) for n in range(32)]
+
+    if len2 <= 0:
+        return crc1
+    odd = [0xEDB88320] + [1 << n for n in range(31)]  # operator for one zero bit
+    even = square(odd)                                 # two zero bits
+    odd = square(even)                                 # four zero bits
+    while True:
+        even = square(odd)
+        if len2 & 1:
+            crc1 = times(even, crc1)
+        len2 >>= 1
+        if not len2:
+            break
+        odd = square(even)
+        if len2 & 1:
+            crc1 = times(odd, crc1)
+        len2 >>= 1
+        if not len2:
+            break
+    return crc1 ^ crc2
+
+
+class ArchiveStats:
+    """Totals of one archive run, for the throughput report."""
+    def __init__(self, codec: str, level: int, workers: int):
+        self.codec = codec
+        self.level = level
+        self.workers = workers
+        self.files = 0
+        self.stored = 0
+        self.skipped = 0
+        self.failed = 0      # members stored incomplete (changed while they were read)
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.by_type: Dict[str, list] = {}   # extension -> [files, stored, bytes in, bytes out]
+        self.started = time.monotonic()
+        self.seconds = 0.0
+
+    def add(self, name: str, size: int, compressed: int, stored: bool):
+        """Count one finished member (bytes_in is counted per piece, as the pieces arrive)."""
+        self.files += 1
+        self.stored += stored
+        self.bytes_out += compressed
+        row = self.by_type.setdefault(file_type(name), [0, 0, 0, 0])
+        row[0] += 1
+        row[1] += stored
+        row[2] += size
+        row[3] += compressed
+
+    def report(self) -> str:
+        mib = 1 << 20
+        ratio = (self.bytes_out / self.bytes_in * 100) if self.bytes_in else 100.0
+        rate = self.bytes_in / mib / self.seconds if self.seconds > 0 else 0.0
+        failed = f", {self.failed} failed" if self.failed else ""
+        return (f"{self.files} files ({self.stored} stored{failed}), {self.bytes_in / mib:.1f} MiB → {self.bytes_out / mib:.1f} MiB "
+                f"({ratio:.0f}%) in {self.seconds:.1f} s, {rate:.1f} MiB/s [{self.codec}-{self.level}, {self.workers} workers]")
+
+    def type_report(self, top: int = 10) -> list:
+        """One line per file type, largest input first: files, stored, size in → out."""
+        lines = []
+        for ext, (files, stored, size, compressed) in sorted(self.by_type.items(), key=lambda kv: -kv[1][2])[:top]:
+            ratio = compressed / size * 100 if size else 100.0
+            lines.append(f"{ext:<8} {files:>6} files, {stored:>6} stored, {size / (1 << 20):>9.1f} MiB → "
+                         f"{compressed / (1 << 20):>9.1f} MiB ({ratio:.0f}%)")
+        return lines
+
+
+class _Member:
+    """One archive member while its pieces come back from the workers."""
+    __slots__ = ("zinfo", "zip64", "store", "crc", "size")
+
+    def __init__(self, zinfo: zipfile.ZipInfo, zip64: bool, store: bool):
+        self.zinfo = zinfo
+        self.zip64 = zip64
+        self.store = store
+        self.crc = 0
+        self.size = 0
+
+
+def _files(src_dir: Path):
+    for root, _, files in os.walk(src_dir):
+        for f in sorted(files):
+            path = Path(root) / f
+            yield path, path.relative_to(src_dir)
+
+
+def archive_steps(src_dir: Optional[Path], zip_path: Path, codec: Optional[str] = None, level: Optional[int] = None,
+                  workers: Optional[int] = None, low_priority: bool = False,
+                  policy: Optional[CompressionPolicy] = DEFAULT_POLICY, members: Optional[Iterable] = None,
+                  on_member: Optional[Callable] = None, trailer: Optional[Callable[[], Dict[str, bytes]]] = None) -> Iterator[None]:
+    """
+    Write every file under `src_dir` into `zip_path`, yielding after each piece is
+    written (so a scheduler can pause it); the generator's return value is the
+    ArchiveStats. See write_archive().
+
+    Instead of walking `src_dir`, `members` may list (path, arcname) pairs. With
+    `on_member`, every member is hashed in the same read pass that compresses it and
+    on_member(arcname, blake2b hex) is called once it is written (members are then
+    not split into chunks); `trailer()` may return small {arcname: bytes} members to
+    append last, e.g. a manifest.
+    """
+    codec = check_codec(codec)
+    method, default_level, chunkable = CODECS[codec]
+    level = default_level if level is None else level
+    workers = max(1, workers or COMPRESS_WORKERS)
+    stats = ArchiveStats(codec, level, workers)
+    spool_dir = Path(tempfile.mkdtemp(prefix=".spool-", dir=Path(zip_path).parent))
+    # pieces in flight: bounds memory to ~2 × workers × CHUNK_BYTES; a low-priority run keeps
+    # one per worker, so little keeps compressing while its scheduler pauses it
+    window = workers if low_priority else workers * 2
+
+    def _units():
+        """(member, piece index, is last piece, submit(pool) -> Future) in archive order."""
+        for n, (path, arcname) in enumerate(members if members is not None else _files(src_dir)):
+            try:
+                zinfo = zipfile.ZipInfo.from_file(path, arcname)
+            except OSError:
+                stats.skipped += 1  # vanished
+                continue
+            store = policy is not None and policy.should_store(path, zinfo.file_size)[0]
+            zinfo.compress_type = zipfile.ZIP_STORED if store else method
+            if zinfo.compress_type == zipfile.ZIP_LZMA:
+                zinfo.flag_bits |= 0x02  # end-of-stream marker present
+            member = _Member(zinfo, zinfo.file_size * 1.05 > zipfile.ZIP64_LIMIT, store)
+            if on_member is not None:
+                spool = str(spool_dir / str(n)) if zinfo.file_size > SPOOL_BYTES else None
+                yield member, 0, True, (lambda pool, p=str(path), s=spool, st=store:
+                                        pool.submit(_whole_member, p, codec, level, s, st, True))
+            elif (chunkable or store) and zinfo.file_size > CHUNK_BYTES:
+                pieces = (zinfo.file_size + CHUNK_BYTES - 1) // CHUNK_BYTES
+                for i in range(pieces):
+                    last = i == pieces - 1
+                    yield member, i, last, (lambda pool, o=i * CHUNK_BYTES, l=last, p=str(path):
+                                            pool.submit(_chunk, p, o, CHUNK_BYTES, level, l, store))
+            elif chunkable or store:
+                yield member, 0, True, (lambda pool, p=str(path): pool.submit(_chunk, p, 0, 0, level, True, store))
+            else:
+                spool = str(spool_dir / str(n)) if zinfo.file_size > SPOOL_BYTES else None
+                yield member, 0, True, (lambda pool, p=str(path), s=spool:
+                                               pool.submit(_whole_member, p, codec, level, s))
+
+    ctx = multiprocessing.get_context("spawn")  # no fork() of a process that runs observer and copy threads
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                               initializer=_lower_worker_priority if low_priority else None)
+    try:
+        # zipfile does the bookkeeping (central directory, ZIP64 end records); members are
+        # written straight to its file object because their data is already compressed
+        with zipfile.ZipFile(zip_path, "w", allowZip64=True) as zf:
+            fp = zf.fp
+            inflight = deque()
+            for member, index, last, submit in _units():
+                inflight.append((member, index, last, submit(pool)))
+                if len(inflight) >= window:
+                    yield from _write_next(zf, fp, inflight, stats, on_member)
+            while inflight:
+                yield from _write_next(zf, fp, inflight, stats, on_member)
+            zf.start_dir = fp.tell()
+            for arcname, data in (trailer() if trailer is not None else {}).items():
+                zf.writestr(arcname, data, compress_type=zipfile.ZIP_DEFLATED)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        shutil.rmtree(spool_dir, ignore_errors=True)
+    stats.seconds = time.monotonic() - stats.started
+    return stats
+
+
+def _write_next(zf: zipfile.ZipFile, fp, inflight: deque, stats: ArchiveStats, on_member: Optional[Callable] = None):
+    """Wait for the oldest piece in flight and append it to the archive."""
+    member, index, last, future = inflight.popleft()
+    result = future.result()
+    if result is None:  # single-piece member whose file vanished: nothing was written for it
+        stats.skipped += 1
+        yield
+        return
+    crc, size, data, spool, digest = result
+    zinfo = member.zinfo
+    if index == 0:
+        zinfo.header_offset = fp.tell()
+        zinfo.CRC = zinfo.compress_size = zinfo.file_size = 0
+        fp.write(zinfo.FileHeader(member.zip64))   # placeholder; rewritten below once sizes are known
+    if data is not None:
+        fp.write(data)
+        zinfo.compress_size += len(data)
+    else:
+        with open(spool, "rb") as f:
+            shutil.copyfileobj(f, fp, READ_CHUNK)
+            zinfo.compress_size += f.tell()
+        os.unlink(spool)
+    member.crc = crc32_combine(member.crc, crc, size) if index else crc
+    member.size += size
+    stats.bytes_in += size
+    if last:
+        zinfo.CRC, zinfo.file_size = member.crc, member.size
+        if not member.zip64 and (zinfo.file_size > zipfile.ZIP64_LIMIT or zinfo.compress_size > zipfile.ZIP64_LIMIT):
+            raise zipfile.LargeZipFile(f"{zinfo.filename} grew past 4 GiB while being archived")
+        end = fp.tell()
+        fp.seek(zinfo.header_offset)
+        fp.write(zinfo.FileHeader(member.zip64))
+        fp.seek(end)
+        zf.filelist.append(zinfo)
+        zf.NameToInfo[zinfo.filename] = zinfo
+        stats.add(zinfo.filename, zinfo.file_size, zinfo.compress_size, member.store)
+        if on_member is not None:
+            on_member(zinfo.filename, digest)
+    yield
+
+
+def write_archive(src_dir: Path, zip_path: Path, codec: Optional[str] = None, level: Optional[int] = None,
+                  workers: Optional[int] = None, low_priority: bool = False,
+                  policy: Optional[CompressionPolicy] = DEFAULT_POLICY, members: Optional[Iterable] = None,
+                  on_member: Optional[Callable] = None, trailer: Optional[Callable[[], Dict[str, bytes]]] = None) -> ArchiveStats:
+    """
+    Compress every file under `src_dir` into the ZIP `zip_path` on a pool of `workers`
+    processes (default COMPRESS_WORKERS, all cores) and return the throughput stats.
+
+    Members are compressed in parallel and written in order. Deflate members larger
+    than CHUNK_BYTES are split into chunks compressed independently (each primed with
+    the previous 32 KiB, as pigz does) and concatenated into one valid deflate stream,
+    so even a single huge file uses every core; bz2, lzma and zstd members are one
+    stream each and run in parallel with each other. Members that may exceed 4 GiB get
+    ZIP64 headers. Files that `policy` finds already compressed (see CompressionPolicy)
+    are stored as they are; policy=None compresses everything. `members`, `on_member`
+    and `trailer` are passed on to archive_steps().
+    """
+    steps = archive_steps(src_dir, zip_path, codec, level, workers, low_priority, policy, members, on_member, trailer)
+    while True:
+        try:
+            next(steps)
+        except StopIteration as done:
+            return done.value
+
+
+def member_path(dest_dir: Path, name: str) -> Path:
+    """
+    Where member `name` goes under `dest_dir`. Raises ValueError for names that could
+    land outside it: absolute paths, drive letters, '..' components or NUL bytes.
+    """
+    norm = name.replace("\\", "/")
+    parts = [p for p in norm.split("/") if p not in ("", ".")]
+    if not parts or "\0" in norm or norm.startswith("/") or ".." in parts or ":" in parts[0]:
+        raise ValueError(f"Unsafe member path {name!r}")
+    return Path(dest_dir).joinpath(*parts)
+
+
+def copy_member(f, header_offset: int, compress_size: int, method: int, crc: int, dest, name: str = "?"):
+    """
+    Decompress one member straight from the open zip file `f` into `dest`, given where
+    its local header starts (as in the central directory or an archive index), and
+    check its CRC-32. Reads only that member: no central directory is needed.
+    """
+    f.seek(header_offset)
+    header = f.read(zipfile.sizeFileHeader)
+    if len(header) != zipfile.sizeFileHeader or header[:4] != zipfile.stringFileHeader:
+        raise zipfile.BadZipFile(f"No local header for {name!r} at offset {header_offset}")
+    name_len, extra_len = struct.unpack("<HH", header[26:30])
+    f.seek(name_len + extra_len, os.SEEK_CUR)
+    decomp = _decompressor(method)
+    remaining, actual = compress_size, 0
+    while remaining:
+        buf = f.read(min(READ_CHUNK, remaining))
+        if not buf:
+            raise zipfile.BadZipFile(f"Truncated member {name!r}")
+        remaining -= len(buf)
+        out = decomp.decompress(buf)
+        actual = zlib.crc32(out, actual)
+        dest.write(out)
+    if actual != crc:
+        raise zipfile.BadZipFile(f"Bad CRC-32 for file {name!r}")
+
@@ -4,10 +4,21 @@ import time
 
 def relaunch_loop(job_name, command, delay=5):
     retry = 5
+    command = list(command)
     while retry <= 5:
         print(f"[🔁 RESTART] Launching backup job: {job_name}")
         proc = subprocess.Popen(command)
         proc.wait()
+        if "snapshot" in command:
+            if proc.returncode == 0:
+                print(f"[✅ DONE] Snapshot of '{job_name}' completed.")
+                return 0
+            if retry <= 1:
+                print(f"[❌ ERROR] Snapshot of '{job_name}' failed 5 times; run it again with --resume.")
+                return proc.returncode
+            # Pick the unfinished snapshot up from its checkpoint instead of copying everything again
+            if "--resume" not in command:
+                command.append("--resume")
         print(f"[⚠️ CRASH] Job '{job_name}' exited. Restarting in {delay}s...")
         time.sleep(delay)
         retry -= 1
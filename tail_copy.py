@@ -0,0 +1,112 @@
+# ───────────────────────────────────────────────────────────────────────
+# APPEND-AWARE TAIL COPY (watch mode)
+# ───────────────────────────────────────────────────────────────────────
+import hashlib
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from backup_tool.manifest import HASH_CHUNK
+
+FINGERPRINT_BYTES = 64 * 1024   # prefix and tail window compared to recognise pure appends
+TRACK_MAX_FILES = 4096          # most recently copied files whose tail state is kept
+
+
+def _fingerprint(f, offset: int, length: int) -> bytes:
+    f.seek(offset)
+    return hashlib.blake2b(f.read(length), digest_size=16).digest()
+
+
+class _Tail:
+    __slots__ = ("dest", "inode", "size", "prefix", "tail", "hasher")
+
+    def __init__(self, dest: Path, inode: int, size: int, prefix: bytes, tail: bytes, hasher):
+        self.dest = dest
+        self.inode = inode
+        self.size = size        # bytes held by `dest`
+        self.prefix = prefix    # fingerprint of the first min(size, FINGERPRINT_BYTES) bytes
+        self.tail = tail        # fingerprint of the last min(size, FINGERPRINT_BYTES) bytes
+        self.hasher = hasher    # BLAKE2b state after `size` bytes, or None without a manifest
+
+
+class AppendTracker:
+    """
+    Remembers, for the files the watcher copied last, how much it copied plus a
+    fingerprint of the first and last FINGERPRINT_BYTES of that copy. When such a file
+    has only grown (same inode, larger, both fingerprints still match at their old
+    offsets), try_append() writes just the new bytes onto the existing backup instead of
+    copying the whole file again, so a growing log costs O(delta) writes, not O(size).
+
+    The BLAKE2b state of the copy is kept too, so the manifest digest is extended from
+    the new bytes alone. Anything else (truncation, rewrite, a different inode, a backup
+    copy that changed on disk) returns None and the caller does a full copy. Changes in
+    the middle of a file that keep both windows intact are not detected; that is the
+    price of not reading the whole file.
+    """
+    def __init__(self, max_files: int = TRACK_MAX_FILES):
+        self.max_files = max_files
+        self._lock = threading.Lock()
+        self._tails: "OrderedDict[str, _Tail]" = OrderedDict()
+
+    def remember(self, rel: str, dest: Path, inode: int, hasher=None):
+        """Record the state of a fresh full copy of `rel` at `dest`."""
+        try:
+            with open(dest, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                window = min(size, FINGERPRINT_BYTES)
+                tail = _Tail(dest, inode, size, _fingerprint(f, 0, window), _fingerprint(f, size - window, window), hasher)
+        except OSError:
+            self.forget(rel)
+            return
+        with self._lock:
+            self._tails[rel] = tail
+            self._tails.move_to_end(rel)
+            while len(self._tails) > self.max_files:
+                self._tails.popitem(last=False)
+
+    def forget(self, rel: str):
+        with self._lock:
+            self._tails.pop(rel, None)
+
+    def try_append(self, rel: str, src: Path, dest: Path, st: os.stat_result) -> Optional[tuple]:
+        """
+        Append the new bytes of `src` onto `dest` if `rel` only grew since the last copy,
+        up to the size in `st` (bytes written after that are left for the next event).
+        Returns (bytes appended, hex digest or None), or None if a full copy is needed.
+        """
+        with self._lock:
+            tail = self._tails.pop(rel, None)  # claimed; put back by remember() below
+        if tail is None or tail.dest != dest or tail.inode != st.st_ino or st.st_size <= tail.size:
+            return None
+        try:
+            if os.stat(dest).st_size != tail.size:
+                return None
+            window = min(tail.size, FINGERPRINT_BYTES)
+            with open(src, "rb") as fsrc:
+                if (_fingerprint(fsrc, 0, window) != tail.prefix
+                        or _fingerprint(fsrc, tail.size - window, window) != tail.tail):
+                    return None
+                fsrc.seek(tail.size)
+                appended = 0
+                with open(dest, "r+b") as fdst:
+                    fdst.seek(tail.size)
+                    while tail.size + appended < st.st_size:  # up to `st` only: the digest must describe what it records
+                        buf = fsrc.read(min(HASH_CHUNK, st.st_size - tail.size - appended))
+                        if not buf:
+                            break
+                        fdst.write(buf)
+                        if tail.hasher is not None:
+                            tail.hasher.update(buf)
+                        appended += len(buf)
+                    fdst.truncate()
+            if tail.size + appended != st.st_size:
+                return None  # shrank while it was appended: the caller does a full copy
+            shutil.copystat(src, dest)
+        except OSError:
+            return None
+        digest = tail.hasher.hexdigest() if tail.hasher is not None else None
+        self.remember(rel, dest, st.st_ino, tail.hasher)
+        return appended, digest
@@ -14,6 +14,7 @@ from backup_tool.backup_job_mane import BASE_BACKUP, perform_backup
 from backup_tool.cleanup_cmd import cleanup_old_backups, cleanup_old_snapshots, cleanup_with_prompt
 from backup_tool.compress_decompress import compress_snapshot, sync_cloud, manual_snapshot, decompress_snapshot
 from backup_tool.config import LOAD_CONFIG, validate_config
+from backup_tool.exclude_matcher import CompiledExcludeSet
 from backup_tool.tele_email_init import send_notification
 from backup_tool.watcher import emoji
 from backup_tool.utils import create_test_environment, find_igbackup_file_uptree, parse_backup_folder_date, pid_path_for, should_ignore, src_path_for
@@ -48,6 +49,7 @@ required_notify_keys = [
 def test_job(args):
     """
     Runs the automated test suite for backup logic using actual backup functions.
+    Steps [0]-[9] stop at their first failure; steps [10] onwards run either way.
     """
     base = Path.cwd()
     test_src, test_dst = create_test_environment(base)
@@ -55,6 +57,27 @@ def test_job(args):
     print(f"  → Created: {test_src}")
     print(f"  → Created: {test_dst}")
     print(f"  → Created: {base / '.igbackup'}")
+
+    basic_passed = _basic_tests(test_src, test_dst)
+    failed = _engine_tests(test_src, test_dst)
+    if basic_passed and not failed:
+        print("\nAll Tests Passed \n")
+    else:
+        print("\nTests FAILED: " + ", ".join((["[0]-[9]"] if not basic_passed else []) + [f"[{n}]" for n in failed]) + "\n")
+
+    if not args.keep:
+        shutil.rmtree(test_src, ignore_errors=True)
+        shutil.rmtree(test_dst, ignore_errors=True)
+        ig = Path.cwd() / ".igbackup"
+        if ig.exists():
+            ig.unlink()
+        print("Cleanup: deleted 'test_source', 'test_backup', and '.igbackup'.")
+    else:
+        print("Test folders retained (use `backup test –-keep` to keep them).")
+
+
+def _basic_tests(test_src: Path, test_dst: Path) -> bool:
+    """Steps [0]-[9]: configuration, copy, exclusion, compression, PID files, watcher, cleanup, snapshot, notification."""
     job_name = "test_job"
     tag = "Test Run"
     
@@ -108,17 +131,17 @@ def test_job(args):
         backup_folders = sorted([f for f in backup_dir.iterdir() if f.is_dir() and f.name.startswith("Backup_full_")], key=lambda x: x.stat().st_mtime, reverse=True)
         if not backup_folders:
             print("    FAILED: No backup folder created.")
-            return
+            return False
         latest = backup_folders[0]
         files = list(latest.rglob("*.*"))
         if len(files) >= 7:
             print("    PASSED: Files copied using perform_backup.")
         else:
             print(f"    FAILED: Not all files copied. Found {len(files)} files.")
-            return
+            return False
     except Exception as e:
         print(f"    FAILED: perform_backup raised: {e}")
-        return
+        return False
 
     # 2) Exclusion Test (calls should_ignore)
     print("\n[2] Exclusion Test (using should_ignore):")
@@ -126,11 +149,18 @@ def test_job(args):
     ignore_list = []
     if igbackup_file:
         ignore_list = [line.strip() for line in igbackup_file.read_text().splitlines() if line.strip()]
-    excluded = [test_src / "empty1.txt", test_src / "empty2.txt", test_src / "empty_folder"]
+    # files the test .igbackup excludes (*.log, *.tmp, *.pyc); should_ignore stats them, so they must exist
+    excluded = [test_src / "notes.log", test_src / "cache.tmp", test_src / "special_names" / "module.pyc"]
+    for item in excluded:
+        item.write_text("excluded")
+    kept = [test_src / "regular_files" / "file_0.txt", test_src / "special_names" / "file with spaces.txt"]
+    wrong = [p for p in excluded if not should_ignore(p, test_src, ignore_list)]
+    wrong += [p for p in kept if should_ignore(p, test_src, ignore_list)]
     for item in excluded:
-        if not should_ignore(item, test_src, ignore_list):
-            print(f"    FAILED: {item} was not excluded.")
-            return
+        item.unlink()
+    if wrong:
+        print(f"    FAILED: {', '.join(str(p.relative_to(test_src)) for p in wrong)} excluded wrongly or not at all.")
+        return False
     print("    PASSED: Exclusion logic works.")
 
     # 3) Compression/Decompression Test (using compress_snapshot & decompress_snapshot):
@@ -190,30 +220,28 @@ def test_job(args):
             pid_file.unlink()
         else:
             print("    FAILED: PID file not created.")
-            return
+            return False
     except Exception as e:
         print(f"    FAILED: PID file error: {e}")
-        return
+        return False
     src_dot_file = src_path_for(job_name)
     try:
         src_dot_file.write_text(str(os.getpid()))
         if src_dot_file.exists():
             print("First test .src:    PASSED: .src file created.")
-            src_dot_file.unlink()
         else:
             print("    FAILED: .src file not created.")
-            return
+            return False
         
-        src_dot_file.read_text().strip()
-        if src_dot_file.exists():
-            print("Second Test .src    PASSED: .src file created.")
+        if src_dot_file.read_text().strip() == str(os.getpid()):
+            print("Second Test .src    PASSED: .src file read back.")
             src_dot_file.unlink()
         else:
             print("    FAILED: .src file not created.")
-            return
+            return False
     except Exception as e:
         print(f"    FAILED: .src file error: {e}")
-        return
+        return False
     
 
     # 5) Watcher Simulation Test (launches real watcher process)
@@ -223,7 +251,7 @@ def test_job(args):
         pid_file.unlink()
     cmd = [
         sys.executable,
-        str(Path(__file__).resolve()),
+        str(Path(__file__).resolve().parent / "backup_cli.py"),
         "run-job",
         "-s", str(test_src),
         "-d", str(test_dst),
@@ -239,40 +267,28 @@ def test_job(args):
         creationflags=creationflags,
         close_fds=(os.name != "nt")
     )
-    time.sleep(2)  # let watcher start
+    time.sleep(3)  # let watcher start
 
     new_file = test_src / "new_file.txt"
     with open(new_file, "w") as f:
         f.write("Watcher test\n")
-    time.sleep(2)  # allow watcher to copy
+    time.sleep(2)  # allow watcher to see the change
 
-    copied = test_dst / "new_file.txt"
-    if copied.exists():
+    # SIGTERM runs the final sync, which picks up anything the cooldown still holds
+    proc.terminate()
+    try:
+        proc.wait(timeout=120)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+    new_file.unlink(missing_ok=True)
+
+    if any(test_dst.glob("Backup_runtime_*/new_file.txt")):
         print("    PASSED: Watcher copied new_file.txt")
-        # stop the watcher
-        try:
-            pid = int(pid_file.read_text())
-            if os.name == "nt":
-                subprocess.run(["taskkill", "/PID", str(pid), "/F"], stdout=subprocess.DEVNULL)
-            else:
-                os.kill(pid, signal.SIGTERM)
-            pid_file.unlink()
-        except Exception:
-            pass
     else:
         print("   FAILED: new_file.txt not copied by watcher")
         print("Suggested fix: Check run-job event scheduling and copying logic.")
-        # Attempt to kill anyway
-        try:
-            p = int(pid_file.read_text())
-            if os.name == "nt":
-                subprocess.run(["taskkill", "/PID", str(p), "/F"], stdout=subprocess.DEVNULL)
-            else:
-                os.kill(p, signal.SIGTERM)
-            pid_file.unlink()
-        except:
-            pass
-        return
+        return False
     
     # 6) Using clean up commands
     print("[6] Testing the Cleanup commands:")
@@ -325,14 +341,477 @@ def test_job(args):
         print(f"Fail the send notification test - {e}")
         
     
-    print("\nAll Tests Passed \n")
-    
-    if not args.keep:
-        shutil.rmtree(test_src, ignore_errors=True)
-        shutil.rmtree(test_dst, ignore_errors=True)
-        ig = Path.cwd() / ".igbackup"
-        if ig.exists():
-            ig.unlink()
-        print("Cleanup: deleted 'test_source', 'test_backup', and '.igbackup'.")
+    return True
+
+
+def _engine_tests(test_src: Path, test_dst: Path) -> list:
+    """Steps [10] onwards, each on its own fixtures; returns the numbers of the steps that failed."""
+    failed = []
+    igbackup_file = find_igbackup_file_uptree(test_src)
+    ignore_list = [line.strip() for line in igbackup_file.read_text().splitlines() if line.strip()] if igbackup_file else []
+
+    # 10) Compiled exclusion matcher: equivalence with the fnmatch loops + micro-benchmark
+    print("[10] Compiled Exclusion Matcher Test (CompiledExcludeSet vs fnmatch):")
+    import fnmatch
+
+    def legacy_is_excluded(rel_path, patterns):
+        rp = str(rel_path).replace("\\", "/")
+        for pat in patterns:
+            pat_norm = pat.rstrip("/")
+            if pat_norm.endswith("*"):
+                if fnmatch.fnmatch(rp, pat_norm):
+                    return True
+            else:
+                if fnmatch.fnmatch(rp, pat_norm) or fnmatch.fnmatch(rp, pat_norm + "*"):
+                    return True
+        return False
+
+    def legacy_matches(rel_path, patterns):
+        return any(fnmatch.fnmatch(str(rel_path), pattern) for pattern in patterns)
+
+    eq_patterns = ignore_list + [
+        "node_modules/", "**/node_modules/", ".git/", "*.pyc", "__pycache__/", "build", "dist/*",
+        "docs/**/*.md", "[abc]*.txt", "file_?.txt", "nested_structure/many_files/file_0[0-4]*",
+        "*/level2", "special_names/@*", "", "test", "logs/*",
+    ]
+    eq_paths = [rel.as_posix() for rel in (p.relative_to(test_src) for p in test_src.rglob("*"))]
+    eq_paths += [
+        "node_modules", "node_modules/x/y.js", "a/node_modules/b.js", "a/b/node_modules", ".git/HEAD",
+        ".github/workflows/ci.yml", "x.pyc", "pkg/__pycache__/m.cpython-311.pyc", "build", "build/out.o",
+        "builder.py", "dist", "dist/pkg.whl", "docs/a/b/c.md", "docs/readme.md", "a.txt", "d.txt",
+        "file_1.txt", "file_10.txt", "nested_structure/level1/level2/x", "temp/", "t.tmp", "UPPER.LOG",
+        "tests/unit.py", "testdata/a.bin", "builder/x.o", "logs/a/b.log", "dist/a/b.whl",
+    ]
+    compiled = CompiledExcludeSet(eq_patterns)
+    mismatches = [
+        (p, kind) for p in eq_paths for kind, got, want in (
+            ("is_excluded", compiled.is_excluded(p), legacy_is_excluded(p, eq_patterns)),
+            ("matches", compiled.matches(p), legacy_matches(p, eq_patterns)),
+        ) if got != want
+    ]
+    # A directory a full snapshot prunes may only hold paths should_ignore drops anyway
+    mismatches += [
+        (p, "prunes_dir") for p in eq_paths
+        if any(compiled.prunes_dir(p[:i]) for i in range(len(p)) if p[i] == "/") and not legacy_matches(p, eq_patterns)
+    ]
+    if not compiled.prunes_dir("logs") or compiled.prunes_dir("tests") or compiled.prunes_dir("builder"):
+        mismatches.append(("logs/tests/builder", "prunes_dir"))
+    if mismatches:
+        failed.append(10)
+        print(f"    FAILED: {len(mismatches)} decisions differ from fnmatch, e.g. {mismatches[:5]}")
     else:
-        print("Test folders retained (use `backup test –-keep` to keep them).")
+        print(f"    PASSED: {len(eq_paths)} paths x {len(eq_patterns)} patterns decide exactly like fnmatch.")
+
+    rounds = max(1, 20000 // len(eq_paths))
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for p in eq_paths:
+            legacy_is_excluded(p, eq_patterns)
+    legacy_rate = rounds * len(eq_paths) / (time.perf_counter() - t0)
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for p in eq_paths:
+            compiled.is_excluded(p)
+    compiled_rate = rounds * len(eq_paths) / (time.perf_counter() - t0)
+    print(f"    BENCH: fnmatch loop {legacy_rate:,.0f} matches/s, compiled {compiled_rate:,.0f} matches/s "
+          f"({compiled_rate / legacy_rate:.1f}x)")
+
+    # 11) Retention: compression and expiry keep the newest full snapshot and the live runtime folder
+    print("[11] Retention Test (cleanup_old_backups + expire_old_snapshots):")
+    import logging
+    from datetime import timedelta
+    from backup_tool.change_journal import ChangeJournal
+    from backup_tool.maintenance import RETENTION_DAYS, expire_old_snapshots
+
+    ret_dir = test_dst / "retention_job"
+    shutil.rmtree(ret_dir, ignore_errors=True)
+    ret_dir.mkdir(parents=True)
+    days = RETENTION_DAYS if RETENTION_DAYS > 0 else 30
+
+    def stamp(prefix, age_days):
+        return prefix + (datetime.now() - timedelta(days=age_days)).strftime("%d-%m-%Y_%H-%M")
+
+    old_full, newest_full = stamp("Backup_full_", days + 20), stamp("Backup_full_", days + 10)
+    old_runtime, live_runtime = stamp("Backup_runtime_", days + 6), stamp("Backup_runtime_", days + 5)
+    recent_runtime = stamp("Backup_runtime_", 1)
+    for name in (old_full, newest_full, old_runtime, live_runtime, recent_runtime):
+        (ret_dir / name).mkdir()
+        (ret_dir / name / "file.txt").write_text(name)
+    old_zip = stamp("Backup_full_", days + 30) + ".zip"
+    shutil.make_archive(str(ret_dir / old_zip[:-4]), "zip", ret_dir / old_full)
+    journal = ChangeJournal(ret_dir)
+    journal.begin(ret_dir / live_runtime, time.time_ns())  # a watcher is still copying into it
+    journal.close()
+    abandoned, resumable = stamp("Backup_full_", days + 3) + ".partial", stamp("Backup_full_", days + 2) + ".partial"
+    for name in (abandoned, resumable):
+        (ret_dir / name).mkdir()
+        (ret_dir / name / "checkpoint.tsv").write_text("# kind\n")
+    last_written = time.time() - (days + 3) * 86400
+    for p in (ret_dir / abandoned / "checkpoint.tsv", ret_dir / abandoned):
+        os.utime(p, (last_written, last_written))
+
+    def names(kind):
+        return {p.name for p in ret_dir.iterdir() if p.name.startswith("Backup_") and (p.is_dir() if kind == "dir" else p.suffix == ".zip")}
+
+    kept = {newest_full, live_runtime, recent_runtime, abandoned, resumable}
+    cleanup_old_backups(None, ret_dir, days)
+    compressed = names("dir") == kept and names("zip") == {old_full + ".zip", old_runtime + ".zip", old_zip}
+    for _ in expire_old_snapshots(ret_dir, days, logging.getLogger("backup_test")):
+        pass
+    if compressed and names("dir") == kept - {abandoned} and not names("zip"):
+        print(f"    PASSED: past {days} days zipped then deleted; newest full, live runtime, recent and resumable folders kept.")
+    else:
+        failed.append(11)
+        print(f"    FAILED: left {sorted(names('dir'))} and {sorted(names('zip'))} (compression step ok: {compressed})")
+    shutil.rmtree(ret_dir, ignore_errors=True)
+
+    # 12) Daemon: a <job>.job request starts a hosted job, <job>.kill stops it with a final sync
+    print("[12] Daemon Request Test (<job>.job / <job>.kill):")
+    from backup_tool.daemon import DAEMON_TAG, WatchDaemon, request_start, request_stop, spec_path_for
+
+    daemon_job = "test_daemon_job"
+    daemon_dst = BASE_BACKUP / daemon_job
+    shutil.rmtree(daemon_dst, ignore_errors=True)
+    daemon = WatchDaemon(workers=2)
+    daemon.observer.start()
+    try:
+        request_start(daemon_job, test_src, daemon_dst, None, None)
+        daemon._poll()
+        pid_file = pid_path_for(daemon_job)
+        started = (daemon_job in daemon.jobs and pid_file.exists()
+                   and pid_file.read_text().splitlines()[-1] == DAEMON_TAG and src_path_for(daemon_job).exists())
+        probe = test_src / "daemon_probe.txt"
+        probe.write_text("written while the daemon hosts the job")
+        request_stop(daemon_job)
+        daemon._poll()
+        for t in list(daemon._stopping.values()):
+            t.join(timeout=120)
+        leftovers = [p.name for p in (spec_path_for(daemon_job), pid_file, src_path_for(daemon_job),
+                                      pid_file.with_suffix(".kill")) if p.exists()]
+        synced = any(daemon_dst.glob("Backup_runtime_*/daemon_probe.txt"))
+        if started and synced and not leftovers and daemon_job not in daemon.jobs:
+            print("    PASSED: job started from its .job request, stopped by .kill with a final sync, files removed.")
+        else:
+            failed.append(12)
+            print(f"    FAILED: started={started}, probe synced={synced}, leftover request files={leftovers}")
+        probe.unlink(missing_ok=True)
+    except Exception as e:
+        failed.append(12)
+        print(f"    FAILED: daemon requests raised: {e}")
+    finally:
+        daemon.observer.stop()
+        daemon.observer.join()
+        daemon.pool.shutdown()
+        shutil.rmtree(daemon_dst, ignore_errors=True)
+
+    # 13) Object store: put, dedup, refcount by hard-link count, GC
+    print("[13] Object Store Test (put / dedup / nlink refcount / GC):")
+    from backup_tool import object_store
+    from backup_tool.manifest import Manifest, hash_file
+
+    store_base = test_dst / "object_store"
+    shutil.rmtree(store_base, ignore_errors=True)
+    snap = store_base / "store_job" / "Backup_full_01-01-2000_00-00"
+    snap.mkdir(parents=True)
+    store = object_store.ObjectStore(store_base)
+    same_a, same_b, other = (test_dst / n for n in ("same_a.txt", "same_b.txt", "other.txt"))
+    same_a.write_text("identical content")
+    same_b.write_text("identical content")
+    other.write_text("different content")
+    stale = "ab" * 32  # a digest the file no longer has
+
+    out_a, digest_a, _ = store.put(same_a, snap / same_a.name, same_a.stat())
+    out_b, digest_b, _ = store.put(same_b, snap / same_b.name, same_b.stat())
+    out_c, digest_c, _ = store.put(other, snap / other.name, other.stat(), stale)
+    obj_a, obj_c = store.path_for(digest_a), store.path_for(digest_c)
+    stored = (out_a != "deduped" and out_b == "deduped" and digest_a == digest_b == hash_file(same_a)
+              and digest_c == hash_file(other) and obj_c.exists() and not store.path_for(stale).exists()
+              and obj_a.stat().st_nlink == 3 and (snap / same_b.name).read_text() == "identical content")
+
+    (snap / same_a.name).unlink()
+    (snap / same_b.name).unlink()
+    manifest = Manifest()
+    manifest.add(same_a.name, same_a.stat(), digest_a)
+    manifest.write(snap)
+    grace, object_store.GRACE_SECONDS = object_store.GRACE_SECONDS, -1
+    try:
+        object_store.run_gc(store_base, logging.getLogger("backup_test"))
+        kept_by_manifest = obj_a.exists() and obj_a.stat().st_nlink == 1
+        Manifest().write(snap)
+        object_store.run_gc(store_base, logging.getLogger("backup_test"))
+        swept = not obj_a.exists() and obj_c.exists()
+    finally:
+        object_store.GRACE_SECONDS = grace
+    if stored and kept_by_manifest and swept:
+        print("    PASSED: duplicate linked, stale digest corrected, object kept while listed, swept once unreferenced.")
+    else:
+        failed.append(13)
+        print(f"    FAILED: put/dedup ok={stored}, kept while listed={kept_by_manifest}, swept when unreferenced={swept}")
+    for f in (same_a, same_b, other):
+        f.unlink(missing_ok=True)
+    shutil.rmtree(store_base, ignore_errors=True)
+
+    # 14) Resume: a snapshot killed half-way is continued by --resume without touching shared inodes
+    print("[14] Resume Test (interrupted snapshot + --resume):")
+    import argparse
+    from backup_tool.checkpoint import CHECKPOINT_NAME, Checkpoint, partial_snapshots
+    from backup_tool.manifest import load_manifest
+
+    resume_job = "test_resume_job"
+    resume_dst = BASE_BACKUP / resume_job
+    resume_src = test_dst / "resume_source"
+    shutil.rmtree(resume_dst, ignore_errors=True)
+    shutil.rmtree(resume_src, ignore_errors=True)
+    resume_src.mkdir(parents=True)
+    for i in range(300):
+        (resume_src / f"file_{i:03d}.txt").write_text(f"resume test file {i}\n" * 20)
+    crash_code = (
+        "import argparse, itertools, os, sys\n"
+        "from pathlib import Path\n"
+        "import backup_tool.checkpoint as checkpoint\n"
+        "import backup_tool.backup_job_mane as jobs\n"
+        "checkpoint.FLUSH_ROWS = 20\n"
+        "jobs.DEDUP_STORE = jobs.PACK_SMALL_FILES = jobs.INCREMENTAL_SNAPSHOTS = False\n"
+        "copied = itertools.count()\n"
+        "real_copy = jobs.copy_and_hash\n"
+        "def copy_then_crash(*a, **k):\n"
+        "    if next(copied) == 150:\n"
+        "        os._exit(9)  # killed half-way: no cleanup, nothing published\n"
+        "    return real_copy(*a, **k)\n"
+        "jobs.copy_and_hash = copy_then_crash\n"
+        "args = argparse.Namespace(workers=1, incremental=False, dedup=False, pack=False, archive=None, resume=False)\n"
+        "jobs.perform_backup(args=args, src=Path(sys.argv[1]), job=sys.argv[2], tag='resume test')\n"
+    )
+    crash = subprocess.run([sys.executable, "-c", crash_code, str(resume_src), resume_job],
+                           env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)), capture_output=True)
+    unfinished = partial_snapshots(resume_dst)
+    shared = test_dst / "shared_inode.txt"
+    shared.write_text("content of another snapshot")
+    done_before = 0
+    if unfinished:
+        journal = Checkpoint(unfinished[-1])
+        done_before = len(journal.done)
+        journal.close()
+        # a file the checkpoint does not list yet, left behind as a hard link into another snapshot
+        pending = next(p for p in sorted(resume_src.iterdir()) if p.name not in journal.done)
+        (unfinished[-1] / pending.name).unlink(missing_ok=True)
+        os.link(shared, unfinished[-1] / pending.name)
+    interrupted = crash.returncode == 9 and len(unfinished) == 1 and 0 < done_before < 300
+
+    resume_args = argparse.Namespace(workers=2, incremental=False, dedup=False, pack=False, archive=None, resume=True)
+    resumed = perform_backup(args=resume_args, src=resume_src, job=resume_job, tag="resume test") is True
+    published = [p for p in resume_dst.glob("Backup_full_*") if p.is_dir()]
+    complete = (len(published) == 1 and not partial_snapshots(resume_dst)
+                and not (published[0] / CHECKPOINT_NAME).exists()
+                and len(load_manifest(published[0]) or {}) == 300
+                and all((published[0] / p.name).read_bytes() == p.read_bytes() for p in resume_src.iterdir()))
+    untouched = shared.read_text() == "content of another snapshot" and shared.stat().st_nlink == 1
+    if interrupted and resumed and complete and untouched:
+        print(f"    PASSED: killed after {done_before} checkpointed files, resumed to a complete snapshot, shared inode untouched.")
+    else:
+        failed.append(14)
+        print(f"    FAILED: interrupted={interrupted} (exit {crash.returncode}, {done_before} done), resumed={resumed}, "
+              f"complete={complete}, shared inode untouched={untouched}")
+    shutil.rmtree(resume_dst, ignore_errors=True)
+    shutil.rmtree(resume_src, ignore_errors=True)
+    shared.unlink(missing_ok=True)
+
+    # 15) Parallel zip: CRC-32 combination, chunked deflate stitching and the store/compress policy
+    print("[15] Parallel Zip Test (crc32_combine / chunked deflate / compression policy):")
+    import random
+    import zipfile
+    import zlib
+    from backup_tool import parallel_zip
+    from backup_tool.compress_policy import TRUST_AFTER, CompressionPolicy
+
+    pz_dir = test_dst / "parallel_zip"
+    shutil.rmtree(pz_dir, ignore_errors=True)
+    (pz_dir / "src").mkdir(parents=True)
+    rng = random.Random(21)
+    part_a, part_b = rng.randbytes(70_000), b"stitched " * 9_000
+    combined = parallel_zip.crc32_combine(zlib.crc32(part_a), zlib.crc32(part_b), len(part_b))
+    combine_ok = combined == zlib.crc32(part_a + part_b) and parallel_zip.crc32_combine(zlib.crc32(part_a), 0, 0) == zlib.crc32(part_a)
+
+    words = [b"alpha", b"beta", b"gamma", b"delta", b"epsilon", b"zeta"]
+    big = b" ".join(rng.choice(words) for _ in range(120_000))   # ~700 KB, several chunks below
+    (pz_dir / "src" / "big.txt").write_bytes(big)
+    real_chunk = parallel_zip.CHUNK_BYTES
+    parallel_zip.CHUNK_BYTES = 64 << 10
+    pieces = -(-len(big) // parallel_zip.CHUNK_BYTES)
+    try:
+        parallel_zip.write_archive(pz_dir / "src", pz_dir / "chunked.zip", codec="deflate", workers=2, policy=None)
+        with zipfile.ZipFile(pz_dir / "chunked.zip") as zf:
+            stitched_ok = zf.testzip() is None and zf.read("big.txt") == big
+    except Exception as e:
+        stitched_ok = False
+        print(f"    chunked write_archive raised: {e}")
+    finally:
+        parallel_zip.CHUNK_BYTES = real_chunk
+
+    policy = CompressionPolicy()
+    samples = {"photo.jpg": b"\xff\xd8\xff" + rng.randbytes(5000), "noise.dat": rng.randbytes(64 << 10),
+               "text.txt": b"plain text compresses well\n" * 3000, "tiny.txt": b"small"}
+    for name, data in samples.items():
+        (pz_dir / name).write_bytes(data)
+    verdicts = {name: policy.should_store(pz_dir / name, len(data)) for name, data in samples.items()}
+    for i in range(TRUST_AFTER + 1):
+        (pz_dir / f"table_{i}.csv").write_bytes(f"{i},row,value\n".encode() * 1000)
+    csv_reasons = [policy.should_store(pz_dir / f"table_{i}.csv", 13_000)[1] for i in range(TRUST_AFTER + 1)]
+    policy_ok = (verdicts == {"photo.jpg": (True, "extension"), "noise.dat": (True, "sample"),
+                              "text.txt": (False, "sample"), "tiny.txt": (False, "small")}
+                 and csv_reasons == ["sample"] * TRUST_AFTER + ["extension cache"])
+    if combine_ok and stitched_ok and policy_ok:
+        print(f"    PASSED: CRCs combine, {pieces}-chunk deflate member verifies, "
+              f"policy stores by extension/sample and trusts an extension after {TRUST_AFTER} files.")
+    else:
+        failed.append(15)
+        print(f"    FAILED: crc32_combine={combine_ok}, chunked member={stitched_ok}, policy={policy_ok} "
+              f"({verdicts}, {csv_reasons})")
+    shutil.rmtree(pz_dir, ignore_errors=True)
+
+    # 16) Archive snapshots (zip / tar.zst), full extraction and partial restore
+    print("[16] Archive Mode + Restore Test (snapshot --archive / decompress / restore -p):")
+    from backup_tool.archive_index import index_path
+    from backup_tool.archive_snapshot import archive_backup
+    from backup_tool.compress_decompress import restore_snapshot
+    from backup_tool.parallel_extract import extract_archive
+
+    arc_job = "test_archive_job"
+    arc_dst = BASE_BACKUP / arc_job
+    arc_src = test_dst / "archive_source"
+    arc_out = test_dst / "archive_out"
+    for d in (arc_dst, arc_src, arc_out):
+        shutil.rmtree(d, ignore_errors=True)
+    (arc_src / "docs" / "deep").mkdir(parents=True)
+    (arc_src / "media").mkdir()
+    for i in range(20):
+        (arc_src / "docs" / f"note_{i:02d}.txt").write_text(f"note {i}\n" * (i * 50 + 1))
+    (arc_src / "docs" / "deep" / "empty.txt").write_bytes(b"")
+    (arc_src / "media" / "noise.bin").write_bytes(rng.randbytes(300_000))
+    (arc_src / "media" / "clip.jpg").write_bytes(b"\xff\xd8\xff" + rng.randbytes(20_000))
+    source_files = {p.relative_to(arc_src).as_posix(): p.read_bytes() for p in arc_src.rglob("*") if p.is_file()}
+
+    def _tree(root: Path) -> dict:
+        return {p.relative_to(root).as_posix(): p.read_bytes() for p in root.rglob("*")
+                if p.is_file() and p.name != "manifest.tsv"}
+
+    archive_problems = []
+    arc_args = argparse.Namespace(workers=2)
+    for fmt in ("zip", "tar.zst"):
+        try:
+            target, stats = archive_backup(arc_args, arc_src, arc_job, fmt)
+            if stats.files < len(source_files) or not index_path(target).exists():
+                archive_problems.append(f"{fmt}: {stats.files} members, index={index_path(target).exists()}")
+            out = arc_out / fmt
+            result = extract_archive(target, out, workers=2)
+            if result.failed or result.rejected or _tree(out) != source_files:
+                archive_problems.append(f"{fmt}: extraction differs ({result.report()})")
+            picked = arc_out / f"{fmt}-restore"
+            restore_snapshot(argparse.Namespace(name=arc_job, snapshot=target.name, path=["docs/deep", "media/*.bin"],
+                                                output=str(picked), list=False, stdout=False))
+            want = {rel: data for rel, data in source_files.items() if rel.startswith("docs/deep/") or rel.endswith(".bin")}
+            if _tree(picked) != want:
+                archive_problems.append(f"{fmt}: restore -p gave {sorted(_tree(picked))}")
+        except Exception as e:
+            archive_problems.append(f"{fmt}: raised {e}")
+
+    # A folder snapshot with small files packed: restore cuts them out of the segments
+    pack_args = argparse.Namespace(workers=2, incremental=False, dedup=False, pack=True, archive=None, resume=False)
+    try:
+        perform_backup(args=pack_args, src=arc_src, job=arc_job, tag="pack test")
+        packed_snap = next(p for p in arc_dst.glob("Backup_full_*") if p.is_dir())
+        picked = arc_out / "pack-restore"
+        restore_snapshot(argparse.Namespace(name=arc_job, snapshot=packed_snap.name, path=["docs"],
+                                            output=str(picked), list=False, stdout=False))
+        want = {rel: data for rel, data in source_files.items() if rel.startswith("docs/")}
+        if not (packed_snap / ".packs").is_dir() or _tree(picked) != want:
+            archive_problems.append(f"pack: restore -p gave {sorted(_tree(picked))}")
+    except Exception as e:
+        archive_problems.append(f"pack: raised {e}")
+
+    if not archive_problems:
+        print(f"    PASSED: zip and tar.zst snapshots of {len(source_files)} files extract and restore byte-identical, packed folder restores too.")
+    else:
+        failed.append(16)
+        print(f"    FAILED: {'; '.join(archive_problems)}")
+
+    # 17) Restore safety: unsafe member names, symlink escapes and failed checks leave nothing behind
+    print("[17] Archive Safety Test (unsafe paths / symlink escape / CRC & BLAKE2b failures):")
+    from backup_tool.archive_index import ensure_index
+    from backup_tool.parallel_extract import RESTORING_SUFFIX
+
+    safety = test_dst / "archive_safety"
+    shutil.rmtree(safety, ignore_errors=True)
+    outside, dest = safety / "outside", safety / "dest"
+    outside.mkdir(parents=True)
+    dest.mkdir()
+    safety_problems = []
+
+    for name in ("../x", "a/../../x", "/etc/passwd", "C:/x", "c:evil.txt", "a\0b", ""):
+        try:
+            parallel_zip.member_path(dest, name)
+            safety_problems.append(f"member_path accepted {name!r}")
+        except ValueError:
+            pass
+    if parallel_zip.member_path(dest, "a/./b.txt") != dest / "a" / "b.txt":
+        safety_problems.append("member_path rejected a plain name")
+
+    # Hand-made zip: three unsafe names and one through a symlink pointing out of dest
+    (dest / "link").symlink_to(outside, target_is_directory=True)
+    evil = safety / "evil.zip"
+    with zipfile.ZipFile(evil, "w") as zf:
+        for name in ("../evil.txt", "/abs.txt", "C:/drive.txt", "link/escape.txt", "ok.txt"):
+            zf.writestr(name, f"payload of {name}")
+    result = extract_archive(evil, dest, workers=2)
+    escaped = [str(p) for p in (safety / "evil.txt", outside / "escape.txt", Path("/abs.txt"), dest / "C:") if p.exists()]
+    if result.rejected != 4 or result.files != 1 or escaped or (dest / "ok.txt").read_text() != "payload of ok.txt":
+        safety_problems.append(f"unsafe zip: rejected={result.rejected}, files={result.files}, written outside={escaped}")
+
+    def _corrupt(archive: Path, member: str, column: int, value: str):
+        """Rewrite one column of `member`'s row in the archive index (5 = CRC-32, 6 = BLAKE2b)."""
+        ensure_index(archive)
+        idx = index_path(archive)
+        rows = idx.read_text(encoding="utf-8").splitlines(keepends=True)
+        for i, row in enumerate(rows):
+            cols = row.rstrip("\n").split("\t", 7)
+            if len(cols) == 8 and cols[7] == member:
+                cols[column] = value
+                rows[i] = "\t".join(cols) + "\n"
+        idx.write_text("".join(rows), encoding="utf-8")
+
+    crc_zip = safety / "crc.zip"
+    with zipfile.ZipFile(crc_zip, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("good.txt", "intact member\n" * 100)
+        zf.writestr("bad.txt", "member whose CRC-32 will not match\n" * 100)
+    _corrupt(crc_zip, "bad.txt", 5, "deadbeef")
+    crc_out = safety / "crc_out"
+    result = extract_archive(crc_zip, crc_out, workers=2)
+    leftovers = [p.name for p in crc_out.rglob(f"*{RESTORING_SUFFIX}")]
+    if result.failed != 1 or result.files != 1 or (crc_out / "bad.txt").exists() or leftovers:
+        safety_problems.append(f"CRC failure: failed={result.failed}, files={result.files}, "
+                               f"bad.txt present={(crc_out / 'bad.txt').exists()}, leftovers={leftovers}")
+
+    # tar.zst: members share one zstd frame; a BLAKE2b failure costs only that member
+    try:
+        zst, _stats = archive_backup(arc_args, arc_src, arc_job, "tar.zst")
+        zst_copy = safety / "frame.tar.zst"
+        shutil.copy2(zst, zst_copy)
+        _corrupt(zst_copy, "docs/note_05.txt", 6, "0" * 64)
+        zst_out = safety / "zst_out"
+        result = extract_archive(zst_copy, zst_out, workers=2)
+        leftovers = [p.name for p in zst_out.rglob(f"*{RESTORING_SUFFIX}")]
+        want = {rel: data for rel, data in source_files.items() if rel != "docs/note_05.txt"}
+        if result.failed != 1 or (zst_out / "docs" / "note_05.txt").exists() or leftovers or _tree(zst_out) != want:
+            safety_problems.append(f"BLAKE2b failure: failed={result.failed}, files={result.files}, leftovers={leftovers}")
+    except Exception as e:
+        safety_problems.append(f"tar.zst frame: raised {e}")
+
+    if not safety_problems:
+        print("    PASSED: unsafe names and symlink escapes skipped, CRC-32/BLAKE2b failures leave no file, rest of the frame restored.")
+    else:
+        failed.append(17)
+        print(f"    FAILED: {'; '.join(safety_problems)}")
+    for d in (arc_dst, arc_src, arc_out, safety):
+        shutil.rmtree(d, ignore_errors=True)
+
+    return failed
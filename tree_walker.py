@@ -0,0 +1,89 @@
+# ───────────────────────────────────────────────────────────────────────
+# PRUNING SOURCE-TREE WALKER (os.scandir)
+# ───────────────────────────────────────────────────────────────────────
+import os
+from pathlib import Path
+from typing import Callable, Iterator, Optional, Tuple
+
+
+def walk_tree(
+    root: Path,
+    dir_excluded: Optional[Callable[[str], bool]] = None,
+    on_dir: Optional[Callable[[str], None]] = None,
+) -> Iterator[Tuple[str, os.DirEntry]]:
+    """
+    Yield (rel_path, DirEntry) for every file under `root`.
+
+    - `rel_path` is relative to `root` and always uses "/" separators.
+    - `dir_excluded(rel_dir)` is asked before descending; an excluded directory is
+      never opened, so nothing below it is listed or stat'ed.
+    - `on_dir(rel_dir)` is called for each directory that is descended into
+      ("" for `root` itself), e.g. to create the matching target folder.
+    - Use `entry.stat()` for the file's stat: scandir caches it (free on Windows,
+      one call on POSIX), so callers never stat the same file twice.
+
+    Like os.walk, unreadable directories are skipped silently and symlinked
+    directories are not followed. Symlinks to files are yielded as files.
+    """
+    stack = [(str(root), "")]
+    while stack:
+        path, rel = stack.pop()
+        if on_dir is not None:
+            on_dir(rel)
+        try:
+            it = os.scandir(path)
+        except OSError:
+            continue
+        subdirs = []
+        with it:
+            for entry in it:
+                child = f"{rel}/{entry.name}" if rel else entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if dir_excluded is None or not dir_excluded(child):
+                            subdirs.append((entry.path, child))
+                    elif entry.is_file():
+                        yield child, entry
+                except OSError:
+                    continue
+        # reversed so directories come off the stack in listing order
+        stack.extend(reversed(subdirs))
+
+
+def walk_changed_dirs(
+    root: Path,
+    since_ns: int,
+    dir_excluded: Optional[Callable[[str], bool]] = None,
+) -> Iterator[Tuple[str, os.DirEntry]]:
+    """
+    Like walk_tree(), but only yield the files of directories whose mtime is at or
+    after `since_ns`, i.e. directories that gained, lost or renamed an entry since then.
+
+    Every directory is still listed (one stat per directory for its mtime), but the
+    files of untouched directories are never stat'ed, which keeps a reconciliation
+    pass proportional to the number of directories rather than files.
+    """
+    try:
+        root_changed = os.stat(root).st_mtime_ns >= since_ns
+    except OSError:
+        return
+    stack = [(str(root), "", root_changed)]
+    while stack:
+        path, rel, changed = stack.pop()
+        try:
+            it = os.scandir(path)
+        except OSError:
+            continue
+        subdirs = []
+        with it:
+            for entry in it:
+                child = f"{rel}/{entry.name}" if rel else entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if dir_excluded is None or not dir_excluded(child):
+                            subdirs.append((entry.path, child, entry.stat(follow_symlinks=False).st_mtime_ns >= since_ns))
+                    elif changed and entry.is_file():
+                        yield child, entry
+                except OSError:
+                    continue
+        stack.extend(reversed(subdirs))
@@ -17,12 +17,15 @@ try:
 except ImportError:
     notification = None
 
+from backup_tool.checkpoint import PARTIAL_SUFFIX
 from backup_tool.config import LOAD_CONFIG
+from backup_tool.exclude_matcher import CompiledExcludeSet, compiled_for
 
 EMOJI_ENABLED = LOAD_CONFIG().get("EMOJI_ENABLED", False)
 LOGS_DIR = Path(LOAD_CONFIG().get("LOGS_DIR", "logs")).resolve()
 BASE_BACKUP = LOAD_CONFIG().get("BASE_BACKUP", "")
 PID_DIR = Path(LOAD_CONFIG().get("PID_DIR", "pid")).resolve()
+DEFAULT_EXCLUDE_FILENAME = LOAD_CONFIG().get("DEFAULT_EXCLUDE_FILENAME", ".igbackup")
 COLOR_ENABLED = LOAD_CONFIG().get("COLOR_ENABLED", "true").lower() in ("1", "true", "yes")
 EXCLUDE_EXTENSIONS = LOAD_CONFIG().get("EXCLUDE_EXTENSIONS", "").split(",") if LOAD_CONFIG().get("EXCLUDE_EXTENSIONS") else []
 MAX_FILE_SIZE_MB = int(LOAD_CONFIG().get("MAX_FILE_SIZE_MB", "100"))
@@ -243,6 +246,15 @@ def find_igbackup_file_uptree(source_dir: Path):
         current = current.parent
     return None
 
+def snapshot_excludes(source_dir: Path) -> CompiledExcludeSet:
+    """The .igbackup rules snapshots apply (nearest .igbackup at or above source_dir), compiled."""
+    igbackup_file = find_igbackup_file_uptree(source_dir)
+    ignore_list = []
+    if igbackup_file:
+        with open(igbackup_file, "r", encoding="utf-8") as f:
+            ignore_list = [line.strip() for line in f if line.strip()]
+    return CompiledExcludeSet(ignore_list)
+
 def HAS_ENOUGH_DISK_SPACE(path: str, min_free_mb: int) -> bool:
     """Check if the given path has at least min_free_mb of free space."""
     total, used, free = shutil.disk_usage(path)
@@ -258,10 +270,11 @@ def notify(title: str, message: str):
         print(f"[NOTIFY] {title}: {message}")
         
 
-def get_latest_snapshot(job: str, base_backup: Path) -> Optional[Path]:
+def get_latest_snapshot(job: str, base_backup: Path, prefixes: tuple = ("Backup_", "snapshot_")) -> Optional[Path]:
     """
     Under BASE_BACKUP/<job>/, find the most‐recent subdirectory whose name starts
-    with “Backup_” (or “snapshot_”), and return its Path. Returns None if none found.
+    with one of `prefixes` (default: “Backup_” or “snapshot_”), and return its Path.
+    Unfinished snapshots (<name>.partial) are skipped. Returns None if none found.
     """
     job_dir = base_backup / job
     if not job_dir.exists() or not job_dir.is_dir():
@@ -269,7 +282,7 @@ def get_latest_snapshot(job: str, base_backup: Path) -> Optional[Path]:
 
     candidates = []
     for child in job_dir.iterdir():
-        if child.is_dir() and (child.name.startswith("Backup_") or child.name.startswith("snapshot_")):
+        if child.is_dir() and child.name.startswith(prefixes) and not child.name.endswith(PARTIAL_SUFFIX):
             candidates.append(child)
 
     if not candidates:
@@ -320,13 +333,13 @@ def pid_path_for(job: str) -> Path:
     return PID_DIR / f"{job}.pid"
 
 
-def should_ignore(path: Path, src, ignore_list):
-    from fnmatch import fnmatch
-    if any(fnmatch(str(path.relative_to(src)), pattern) for pattern in ignore_list):
-        return True
-    if path.suffix.lower() in [e.lower() for e in EXCLUDE_EXTENSIONS]:
+def should_ignore(path: Path, src, ignore_list, st: Optional[os.stat_result] = None):
+    """`st` may carry a stat already known to the caller (e.g. from os.scandir)."""
+    excludes = compiled_for(ignore_list)
+    rel = path.relative_to(src)
+    if excludes.matches(rel) or excludes.excludes_extension(rel):
         return True
-    if path.stat().st_size > MAX_FILE_SIZE_BYTES:
+    if (st or path.stat()).st_size > MAX_FILE_SIZE_BYTES:
         return True
     return False
 
@@ -0,0 +1,212 @@
+# ───────────────────────────────────────────────────────────────────────
+# ONE WATCHED JOB (run-job process or daemon)
+# ───────────────────────────────────────────────────────────────────────
+import logging
+import stat
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Union
+
+from backup_tool.change_journal import ChangeJournal
+from backup_tool.chunk_store import chunking_enabled, recipe_path, store_chunked
+from backup_tool.config import LOAD_CONFIG
+from backup_tool.copy_engine import CopyWorkerPool, PoolLane, copy_and_hash
+from backup_tool.exclude_matcher import CompiledExcludeSet
+from backup_tool.file_index import FileIndex
+from backup_tool.logger import setup_logger
+from backup_tool.maintenance import job_scheduler
+from backup_tool.manifest import Manifest
+from backup_tool.object_store import ObjectStore
+from backup_tool.tele_email_init import send_notification
+from backup_tool.tree_walker import walk_changed_dirs, walk_tree
+from backup_tool.utils import emoji, read_exclude_patterns, update_summary_log
+from backup_tool.watch_planner import internal_dirs, register_watches
+from backup_tool.watcher import IncrementalBackupHandler
+
+env = LOAD_CONFIG()
+BASE_BACKUP = Path(env.get("BASE_BACKUP", "backup")).resolve()
+BACKUP_DELAY = int(env.get("BACKUP_DELAY", "30"))
+PID_DIR = Path(env.get("PID_DIR", "pid")).resolve()
+LOGS_DIR = Path(env.get("LOGS_DIR", "logs")).resolve()
+
+JOURNAL_MTIME_SLACK_NS = 2_000_000_000  # coarse directory mtimes (FAT, SMB) must still count as "changed since start"
+
+
+def _journal_candidates(src: Path, state, excludes: CompiledExcludeSet):
+    """
+    Paths a final sync or recovery has to look at, as (rel, DirEntry or None, journaled):
+    the journaled files, files under journaled directories, and files of directories
+    whose mtime says they changed since the run began (catches events the watcher
+    never delivered). Only the journaled ones have to be in the runtime folder; of the
+    others only what changed since its last backup is copied.
+    """
+    seen = set()
+    def _new(rel):
+        if rel in seen:
+            return False
+        seen.add(rel)
+        return True
+
+    for rel in state.files:
+        if _new(rel):
+            yield rel, None, True
+    for tree in state.trees:
+        prune = lambda d, t=tree: excludes.excludes_dir(f"{t}/{d}")
+        for rel, entry in walk_tree(src / tree, dir_excluded=prune):
+            if _new(f"{tree}/{rel}"):
+                yield f"{tree}/{rel}", entry, True
+    for rel, entry in walk_changed_dirs(src, state.since_ns, dir_excluded=excludes.excludes_dir):
+        if _new(rel):
+            yield rel, entry, False
+
+
+def _sync_into(src: Path, dest_root: Path, candidates, excludes: CompiledExcludeSet, index: FileIndex, manifest: Manifest, logger) -> int:
+    """
+    Copy each candidate (rel, DirEntry or None, journaled) that changed since its last
+    backup, and each journaled one that is missing from dest_root. An unchanged file
+    that is only a sibling in a changed directory is not copied again, so the work
+    follows the amount of change rather than the size of the directories.
+    """
+    copied_count = 0
+    for rel_str, entry, journaled in candidates:
+        file_path = src / rel_str
+        try:
+            st = entry.stat() if entry is not None else file_path.stat()
+        except OSError:
+            continue  # deleted again
+        if not stat.S_ISREG(st.st_mode):
+            continue
+        rel = Path(rel_str)
+        if excludes.should_ignore(rel, st):
+            continue
+        if excludes.is_excluded(rel):
+            continue
+        if st.st_size == 0:
+            continue
+
+        # Copy anything modified since it was last backed up, plus journaled files missing from dest_root
+        dst_path = dest_root / rel
+        chunked = chunking_enabled(st.st_size)
+        if index.is_unchanged(rel, st):
+            present = (recipe_path(dst_path) if chunked else dst_path).exists()
+            if present and rel not in manifest:
+                digest = index.known_hash(rel, st)
+                if digest is not None:
+                    manifest.add(rel, st, digest)  # copied by a run that died before writing its manifest
+            if present or not journaled:
+                continue
+        dst_path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            if chunked:
+                digest, _, _ = store_chunked(file_path, dst_path, ObjectStore(BASE_BACKUP))
+            else:
+                _, digest, st = copy_and_hash(file_path, dst_path)
+            index.update(rel, st, digest)
+            manifest.add(rel, st, digest)
+            logger.info(emoji("[📄 SYNC]") + f" {rel}")
+            copied_count += 1
+        except Exception as e:
+            logger.error(f"[❌ ERROR] Final copy {rel}: {e}")
+    return copied_count
+
+
+def _recover_journal(src: Path, dst: Path, journal: ChangeJournal, excludes: CompiledExcludeSet, index: FileIndex, fallback_root: Path, logger):
+    """Replay the journal of a run that crashed or was killed before its final sync."""
+    state = journal.load()
+    if state is None:
+        return
+    prev_root = dst / state.dest_root
+    if not prev_root.is_dir():
+        prev_root = fallback_root
+    logger.info(emoji("[♻️ RECOVER]") + f" Replaying {len(state)} journaled changes into {prev_root.name}")
+    manifest = Manifest.load(prev_root)
+    copied_count = _sync_into(src, prev_root, _journal_candidates(src, state, excludes), excludes, index, manifest, logger)
+    index.flush()
+    manifest.write(prev_root)
+    journal.reset()
+    ts = datetime.now().strftime("%d-%m-%Y %H:%M")
+    update_summary_log(dst, ts, "✔️", f"{prev_root.name} (recovered) → {copied_count} files copied.")
+
+
+
+class WatchJob:
+    """
+    State of one watched job: source, BASE_BACKUP/<job>, its runtime folder, index,
+    change journal, manifest, watcher handler and maintenance scheduler.
+
+    start() registers the job's watches on a running observer (see WatchRegistry) and
+    copies through a pool (its own CopyWorkerPool in a run-job process, a lane of the
+    shared pool in the daemon); stop() unschedules it, drains its copies and runs the
+    final sync.
+    """
+    def __init__(self, source, dest, exclude: Optional[str], compress_days: Optional[int], delay: int = BACKUP_DELAY):
+        self.src = Path(source).resolve()  # → /path/to/source
+        self.dst = Path(dest).resolve()    # → BASE_BACKUP/<job>
+        self.name = self.dst.name
+        self.compress_days = compress_days
+        self.delay = delay
+        self.logger: logging.Logger = setup_logger(self.dst / "logs", f"watcher_{self.src.name}")
+        self.patterns = read_exclude_patterns(self.src, exclude)
+        self.excludes = CompiledExcludeSet(self.patterns)
+        self.dest_root = None
+        self.handler = None
+        self.registry = None
+        self.maintenance = None
+
+    def start(self, observer, pool: Union[CopyWorkerPool, PoolLane], busy=None):
+        """
+        Recover a leftover journal, then start watching into a fresh Backup_runtime_<timestamp>
+        folder. Maintenance pauses while `busy()` is true (default: while `pool` has copies queued).
+        """
+        self.logger.info(emoji("[🚀 START]") + f" Watching: {self.src} → {self.dst}")
+
+        timestamp = datetime.now().strftime('Backup_runtime_%d-%m-%Y_%H-%M')
+        self.dest_root = self.dst / timestamp
+        self.dest_root.mkdir(parents=True, exist_ok=True)
+
+        self.index = FileIndex(self.dst)
+        self.journal = ChangeJournal(self.dst)
+        _recover_journal(self.src, self.dst, self.journal, self.excludes, self.index, self.dest_root, self.logger)
+        self.full_sync = self.index.is_empty()  # nothing backed up yet: the final sync has to seed everything
+        self.journal.begin(self.dest_root, time.time_ns() - JOURNAL_MTIME_SLACK_NS)
+
+        self.manifest = Manifest()
+        self.pool = pool  # copies run here, never on the observer thread
+        self.handler = IncrementalBackupHandler(
+            self.src, self.dest_root, self.patterns, self.logger, self.compress_days, DELAY=self.delay,
+            index=self.index, manifest=self.manifest, pool=pool, journal=self.journal,
+            ignore_dirs=internal_dirs(self.src, self.dst, LOGS_DIR, PID_DIR),  # never react to our own writes
+        )
+        self.registry = register_watches(observer, self.handler, self.logger)
+        self.maintenance = job_scheduler(self.dst, self.logger, self.compress_days, index=self.index, source=self.src,
+                                         busy=busy or pool.busy, keep={self.dest_root})
+        self.maintenance.start()
+
+    def stop(self, observer=None) -> int:
+        """Stop watching (unschedule from `observer` if it keeps running), drain, final sync. Returns files synced."""
+        if self.maintenance is not None:
+            self.maintenance.stop()
+        if self.registry is not None:
+            self.registry.stop(unschedule=observer is not None)
+        self.handler.close()   # hand whatever is still settling in the change queue to the pool …
+        self.pool.shutdown()   # … and let the copy workers drain it before the final sync
+
+        # FINAL SYNC into dest_root: replay the journal instead of rescanning the source
+        self.logger.info(emoji("[🔄 FINAL SYNC]") + " Checking for missed files…")
+        self.journal.close()
+        if self.full_sync:
+            candidates = ((rel, entry, True) for rel, entry in walk_tree(self.src, dir_excluded=self.excludes.excludes_dir))
+        else:
+            candidates = _journal_candidates(self.src, self.journal.load(), self.excludes)
+        copied_count = _sync_into(self.src, self.dest_root, candidates, self.excludes, self.index, self.manifest, self.logger)
+        self.index.close()
+        self.manifest.write(self.dest_root)
+        self.journal.reset()
+
+        # Append final‐sync summary into BASE_BACKUP/<job>/summary.log
+        ts = datetime.now().strftime("%d-%m-%Y %H:%M")
+        update_summary_log(self.dst, ts, "✔️", f"{self.dest_root.name} (final sync) → {copied_count} files copied.")
+        send_notification("Backup Completed", f"Backup has complete in folder{self.dst}")
+        self.logger.info(emoji("[✅ END]") + " Job completed.")
+        return copied_count
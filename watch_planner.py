@@ -0,0 +1,483 @@
+# ───────────────────────────────────────────────────────────────────────
+# WATCH REGISTRATION (+ polling fallback)
+# ───────────────────────────────────────────────────────────────────────
+import contextlib
+import ctypes
+import errno
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from watchdog.events import (DirCreatedEvent, DirDeletedEvent, DirModifiedEvent, DirMovedEvent,
+                             FileClosedEvent, FileCreatedEvent, FileDeletedEvent, FileModifiedEvent,
+                             FileMovedEvent)
+from watchdog.observers.api import ObservedWatch
+from watchdog.utils import UnsupportedLibcError
+
+from backup_tool.tree_walker import walk_tree
+from backup_tool.utils import emoji
+
+# inotify bindings (Linux only); elsewhere the observer's recursive watch is used
+inotify_c = None
+if sys.platform.startswith("linux"):
+    try:
+        from watchdog.observers import inotify_c
+    except (ImportError, OSError, UnsupportedLibcError):
+        inotify_c = None
+
+POLL_MIN_SECONDS = 2.0    # polling interval right after a change was seen
+POLL_MAX_SECONDS = 60.0   # interval is doubled on every quiet scan up to this
+MOVE_PAIR_SECONDS = 0.5   # an IN_MOVED_FROM still unpaired after this was a move out of the tree
+READ_BYTES = 64 << 10     # inotify events read per os.read()
+
+# failures meaning "out of inotify watches/instances", not "path is broken"
+_LIMIT_ERRNOS = {errno.ENOSPC, errno.EMFILE}
+
+if inotify_c is not None:
+    _IN = inotify_c.InotifyConstants
+    _WATCH_MASK = (_IN.IN_MODIFY | _IN.IN_ATTRIB | _IN.IN_CLOSE_WRITE | _IN.IN_MOVED_FROM | _IN.IN_MOVED_TO
+                   | _IN.IN_CREATE | _IN.IN_DELETE | _IN.IN_DELETE_SELF
+                   | _IN.IN_ONLYDIR | _IN.IN_DONT_FOLLOW | _IN.IN_EXCL_UNLINK)
+
+
+def internal_dirs(source: Path, *paths: Path) -> List[str]:
+    """Those of `paths` (backup destination, logs, …) that live inside `source`, relative to it."""
+    found = []
+    for p in paths:
+        try:
+            rel = Path(p).resolve().relative_to(source).as_posix()
+        except ValueError:
+            continue
+        if rel != ".":
+            found.append(rel)
+    return found
+
+
+class PollingScanner:
+    """
+    Fallback for subtrees that could not get a watch (inotify limits). Each root is
+    rescanned and compared with the previous (size, mtime_ns) of its files; differences
+    are dispatched to the handler as ordinary created/modified/deleted events.
+
+    The interval adapts: POLL_MIN_SECONDS after a scan that found changes, doubling on
+    every quiet scan up to POLL_MAX_SECONDS.
+    """
+    def __init__(self, source: Path, handler, dir_excluded: Callable[[str], bool], logger: logging.Logger):
+        self.source = source
+        self.handler = handler
+        self.dir_excluded = dir_excluded
+        self.logger = logger
+        self._roots: Dict[str, bool] = {}
+        self._state: Dict[str, Dict[str, tuple]] = {}
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = None
+
+    def add(self, rel: str, recursive: bool):
+        with self._cond:
+            self._roots[rel] = recursive
+            self._state[rel] = self._scan(rel, recursive)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="watch-poll", daemon=True)
+                self._thread.start()
+
+    def roots(self) -> Dict[str, bool]:
+        with self._cond:
+            return dict(self._roots)
+
+    def remove(self, rel: str):
+        """Stop polling `rel` and any root below it (the folder was deleted or moved away)."""
+        with self._cond:
+            for root in [r for r in self._roots if _under(r, rel)]:
+                del self._roots[root]
+                del self._state[root]
+
+    def rename(self, old: str, new: str):
+        """Roots at or below `old` now live under `new`: keep their state, so nothing looks deleted."""
+        with self._cond:
+            for root in [r for r in self._roots if _under(r, old)]:
+                moved = new + root[len(old):]
+                self._roots[moved] = self._roots.pop(root)
+                self._state[moved] = {new + p[len(old):]: sig for p, sig in self._state.pop(root).items()}
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        interval = POLL_MIN_SECONDS
+        while True:
+            with self._cond:
+                self._cond.wait(interval)
+                if self._stopped:
+                    return
+                roots = dict(self._roots)
+            changed = False
+            for rel, recursive in roots.items():
+                try:
+                    changed |= self._rescan(rel, recursive)
+                except Exception as e:
+                    self.logger.error(f"[❌ ERROR] Polling {rel or '.'}: {e}")
+            interval = POLL_MIN_SECONDS if changed else min(POLL_MAX_SECONDS, interval * 2)
+
+    def _scan(self, rel: str, recursive: bool) -> Dict[str, tuple]:
+        root = self.source / rel
+        state = {}
+        if recursive:
+            for sub, entry in walk_tree(root, dir_excluded=lambda d: self.dir_excluded(f"{rel}/{d}" if rel else d)):
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                state[f"{rel}/{sub}" if rel else sub] = (st.st_size, st.st_mtime_ns)
+            return state
+        try:
+            with os.scandir(root) as it:
+                for entry in it:
+                    name = f"{rel}/{entry.name}" if rel else entry.name
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not self.dir_excluded(name):
+                                state[name] = None  # a directory: only its appearance matters here
+                        elif entry.is_file():
+                            st = entry.stat()
+                            state[name] = (st.st_size, st.st_mtime_ns)
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return state
+
+    def _rescan(self, rel: str, recursive: bool) -> bool:
+        new = self._scan(rel, recursive)
+        with self._cond:
+            if rel not in self._state:
+                return False  # removed meanwhile
+            old = self._state[rel]
+            self._state[rel] = new
+        events = []
+        for path, sig in new.items():
+            prev = old.get(path, False)
+            if prev is False:
+                events.append((DirCreatedEvent if sig is None else FileCreatedEvent)(str(self.source / path)))
+            elif sig != prev:
+                events.append(FileModifiedEvent(str(self.source / path)))
+        for path, sig in old.items():
+            if path not in new:
+                events.append((DirDeletedEvent if sig is None else FileDeletedEvent)(str(self.source / path)))
+        for event in events:
+            self.handler.dispatch(event)
+        return bool(events)
+
+
+def _under(rel: str, top: str) -> bool:
+    """True if folder `rel` is `top` or lies below it ("" is the source itself)."""
+    return not top or rel == top or rel.startswith(top + "/")
+
+
+class InotifyTree:
+    """
+    One inotify instance for a whole source tree, with a watch on each folder that is
+    not excluded. watchdog's recursive schedule() watches every folder, node_modules
+    and .git included; here excluded folders and the backup's own folders never get a
+    watch. Folders that are created or moved in later are watched as they appear (and
+    files already inside them are reported), and the watches of folders that are
+    moved out of the tree or renamed to an excluded name are removed.
+
+    When a folder's watch fails on the inotify watch limit, that folder and its
+    subtree are handed to the PollingScanner; the rest stays on inotify. Events are
+    dispatched to the handler from this class's reader thread, like the poller's.
+    """
+    def __init__(self, source: Path, handler, dir_excluded: Callable[[str], bool], poller: PollingScanner,
+                 logger: logging.Logger):
+        self.source = source
+        self.handler = handler
+        self.dir_excluded = dir_excluded
+        self.poller = poller
+        self.logger = logger
+        self._fd = -1
+        self._kill_r = self._kill_w = -1
+        self._wd_rel: Dict[int, str] = {}
+        self._rel_wd: Dict[str, int] = {}
+        self._moved_from: Dict[int, tuple] = {}  # cookie -> (rel, is_dir, deadline)
+        self._limit_logged = False
+        self._thread = None
+
+    def start(self):
+        """Open the inotify instance and watch the tree; raises OSError if no instance is available."""
+        fd = inotify_c.inotify_init()
+        if fd == -1:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._fd = fd
+        self._kill_r, self._kill_w = os.pipe()
+        self._watch_tree("", report=False)
+        self._thread = threading.Thread(target=self._run, name="watch-inotify", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            os.write(self._kill_w, b"!")
+            self._thread.join()
+            self._thread = None
+        for fd in (self._fd, self._kill_r, self._kill_w):
+            if fd != -1:
+                os.close(fd)  # closing the instance removes all its watches
+        self._fd = self._kill_r = self._kill_w = -1
+
+    def watched(self) -> int:
+        """Number of folders with a watch."""
+        return len(self._rel_wd)
+
+    # ─── Watches ─────────────────────────────────────────────────────
+    def _add_watch(self, rel: str):
+        path = self.source / rel
+        wd = inotify_c.inotify_add_watch(self._fd, os.fsencode(path), _WATCH_MASK)
+        if wd == -1:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), str(path))
+        self._wd_rel[wd] = rel
+        self._rel_wd[rel] = wd
+
+    def _watch_tree(self, rel: str, report: bool):
+        """
+        Watch folder `rel` and every non-excluded folder below it. With `report`, the
+        files already inside are dispatched as created: a new folder may have been
+        filled before its watch existed.
+        """
+        stack = [rel]
+        while stack:
+            cur = stack.pop()
+            try:
+                self._add_watch(cur)  # before listing, so nothing created meanwhile is missed
+            except OSError as e:
+                if e.errno in _LIMIT_ERRNOS:
+                    self._poll_subtree(cur, e, report)
+                elif not cur:
+                    self.logger.error(f"[❌ ERROR] Watching {self.source}: {e}")
+                continue  # otherwise vanished or unreadable: nothing to watch
+            try:
+                with os.scandir(self.source / cur) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            for entry in entries:
+                child = f"{cur}/{entry.name}" if cur else entry.name
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+                if is_dir:
+                    if not self.dir_excluded(child):
+                        stack.append(child)
+                        if report:
+                            self.handler.dispatch(DirCreatedEvent(entry.path))
+                elif report:
+                    self.handler.dispatch(FileCreatedEvent(entry.path))
+
+    def _poll_subtree(self, rel: str, error: OSError, report: bool):
+        if not self._limit_logged:
+            self._limit_logged = True
+            self.logger.warning(f"[⚠️ WATCH LIMIT] inotify watches exhausted ({error.strerror}); polling "
+                                f"{self.source / rel} and any other folder that gets no watch.")
+        self.poller.add(rel, True)
+        if report:
+            for sub, entry in walk_tree(self.source / rel, dir_excluded=lambda d: self.dir_excluded(f"{rel}/{d}" if rel else d)):
+                self.handler.dispatch(FileCreatedEvent(entry.path))
+
+    def _unwatch_tree(self, rel: str):
+        """Remove the watches of `rel` and below (moved out of the tree or to an excluded name)."""
+        for sub in [r for r in self._rel_wd if _under(r, rel)]:
+            wd = self._rel_wd.pop(sub)
+            del self._wd_rel[wd]
+            inotify_c.inotify_rm_watch(self._fd, wd)  # fails harmlessly if the kernel already dropped it
+        self.poller.remove(rel)
+
+    def _moved_dir(self, old: str, new: str):
+        """Folder `old` was renamed to `new` inside the tree: its watches move with it."""
+        was_watched = old in self._rel_wd
+        for sub in [r for r in self._rel_wd if _under(r, old)]:
+            wd = self._rel_wd.pop(sub)
+            self._rel_wd[new + sub[len(old):]] = wd
+            self._wd_rel[wd] = new + sub[len(old):]
+        self.poller.rename(old, new)
+        if self.dir_excluded(new):
+            self._unwatch_tree(new)
+        elif not was_watched:
+            self._watch_tree(new, report=False)  # the handler copies the contents of a folder moved in
+
+    # ─── Events ──────────────────────────────────────────────────────
+    def _run(self):
+        poll = select.poll()
+        poll.register(self._fd, select.POLLIN)
+        poll.register(self._kill_r, select.POLLIN)
+        while True:
+            timeout = None
+            if self._moved_from:
+                timeout = max(0, min(d for _r, _d, d in self._moved_from.values()) - time.monotonic()) * 1000
+            ready = {fd for fd, _ in poll.poll(timeout)}
+            if self._kill_r in ready:
+                return
+            if self._fd in ready:
+                try:
+                    buf = os.read(self._fd, READ_BYTES)
+                except InterruptedError:
+                    continue
+                except OSError as e:
+                    self.logger.error(f"[❌ ERROR] Reading inotify events for {self.source}: {e}")
+                    return
+                for wd, mask, cookie, name in _parse_events(buf):
+                    try:
+                        self._handle(wd, mask, cookie, name)
+                    except Exception as e:
+                        self.logger.error(f"[❌ ERROR] Watch event in {self.source}: {e}")
+            self._expire_moves()
+
+    def _handle(self, wd: int, mask: int, cookie: int, name: str):
+        if mask & _IN.IN_Q_OVERFLOW:
+            self.logger.warning(f"[⚠️ WARNING] inotify queue overflowed for {self.source}; "
+                                f"the final sync picks up the changes that were lost.")
+            return
+        parent = self._wd_rel.get(wd)
+        if mask & _IN.IN_IGNORED:
+            if parent is not None and self._rel_wd.get(parent) == wd:
+                del self._rel_wd[parent]
+            self._wd_rel.pop(wd, None)
+            return
+        if parent is None or not name:
+            return  # a watch removed meanwhile, or an event on a watched folder itself
+        rel = f"{parent}/{name}" if parent else name
+        path = str(self.source / rel)
+        is_dir = bool(mask & _IN.IN_ISDIR)
+
+        if mask & _IN.IN_MOVED_FROM:
+            self._moved_from[cookie] = (rel, is_dir, time.monotonic() + MOVE_PAIR_SECONDS)
+        elif mask & _IN.IN_MOVED_TO and cookie in self._moved_from:
+            old = self._moved_from.pop(cookie)[0]
+            if is_dir:
+                self._moved_dir(old, rel)
+            self.handler.dispatch((DirMovedEvent if is_dir else FileMovedEvent)(str(self.source / old), path))
+        elif mask & (_IN.IN_CREATE | _IN.IN_MOVED_TO):  # an unpaired IN_MOVED_TO came from outside the tree
+            if is_dir:
+                self.handler.dispatch(DirCreatedEvent(path))
+                if not self.dir_excluded(rel):
+                    self._watch_tree(rel, report=True)
+            else:
+                self.handler.dispatch(FileCreatedEvent(path))
+        elif mask & _IN.IN_DELETE:
+            if is_dir:
+                self.poller.remove(rel)  # its own watch goes with an IN_IGNORED
+            self.handler.dispatch((DirDeletedEvent if is_dir else FileDeletedEvent)(path))
+        elif mask & _IN.IN_CLOSE_WRITE:
+            self.handler.dispatch(FileClosedEvent(path))
+        elif mask & (_IN.IN_MODIFY | _IN.IN_ATTRIB):
+            self.handler.dispatch((DirModifiedEvent if is_dir else FileModifiedEvent)(path))
+
+    def _expire_moves(self):
+        """IN_MOVED_FROM events whose partner never came: moved out of the tree, i.e. deleted."""
+        now = time.monotonic()
+        for cookie, (rel, is_dir, deadline) in list(self._moved_from.items()):
+            if deadline > now:
+                continue
+            del self._moved_from[cookie]
+            if is_dir:
+                self._unwatch_tree(rel)  # watches follow the folder out of the tree
+            self.handler.dispatch((DirDeletedEvent if is_dir else FileDeletedEvent)(str(self.source / rel)))
+
+
+def _parse_events(buf: bytes):
+    """(wd, mask, cookie, name) of each struct inotify_event in `buf`."""
+    i = 0
+    while i + 16 <= len(buf):
+        wd, mask, cookie, length = struct.unpack_from("iIII", buf, i)
+        yield wd, mask, cookie, os.fsdecode(buf[i + 16:i + 16 + length].rstrip(b"\0"))
+        i += 16 + length
+
+
+class WatchRegistry:
+    """
+    Watches a job's source. On Linux that is one InotifyTree: a single inotify
+    instance with watches on the folders that are not excluded, so node_modules,
+    .git and the backup's own folders cost no watches. (watchdog's schedule() gives
+    every call its own instance plus emitter and buffer threads, and its recursive
+    watch covers every folder.) Elsewhere the source is one recursive schedule() on
+    the observer, which ReadDirectoryChangesW and FSEvents serve with one handle, and
+    the handler drops events from excluded folders.
+
+    Subtrees whose watch fails on the inotify watch limit are polled by a
+    PollingScanner, which skips excluded folders; the whole source is polled only if
+    no inotify instance (or schedule()) can be had at all.
+    """
+    def __init__(self, observer, handler, source: Path, dir_excluded: Callable[[str], bool], logger: logging.Logger):
+        self.observer = observer
+        self.handler = handler
+        self.source = source
+        self.dir_excluded = dir_excluded
+        self.logger = logger
+        self.poller = PollingScanner(source, handler, dir_excluded, logger)
+        self._tree = None
+        self._watch = None
+
+    def start(self):
+        """Register the watches (or the poll); the observer must already be running."""
+        if inotify_c is not None:
+            self._start_inotify()
+            return
+        path = str(self.source)
+        try:
+            self._watch = self.observer.schedule(self.handler, path, recursive=True)
+        except OSError as e:
+            # schedule() registers the handler before its emitter fails to start: drop that stale entry
+            with contextlib.suppress(KeyError, ValueError):
+                self.observer.remove_handler_for_watch(self.handler, ObservedWatch(path, recursive=True))
+            if e.errno not in _LIMIT_ERRNOS:
+                self.logger.error(f"[❌ ERROR] Watching {self.source}: {e}")
+                return
+            self.logger.warning(f"[⚠️ WATCH LIMIT] {e}; polling {self.source} instead.")
+            self.poller.add("", True)
+            return
+        self.logger.info(emoji("[👁️ WATCHING]") + f" {self.source} (one recursive watch)")
+
+    def _start_inotify(self):
+        tree = InotifyTree(self.source, self.handler, self.dir_excluded, self.poller, self.logger)
+        try:
+            tree.start()
+        except OSError as e:
+            tree.stop()
+            if e.errno not in _LIMIT_ERRNOS:
+                self.logger.error(f"[❌ ERROR] Watching {self.source}: {e}")
+                return
+            self.logger.warning(f"[⚠️ WATCH LIMIT] {e}; polling {self.source} instead.")
+            self.poller.add("", True)
+            return
+        self._tree = tree
+        polled = len(self.poller.roots())
+        self.logger.info(emoji("[👁️ WATCHING]") + f" {self.source} ({tree.watched()} folders on one inotify instance"
+                         + (f", {polled} subtrees polled" if polled else "") + ")")
+
+    def stop(self, unschedule: bool = True):
+        """Stop the inotify reader and the poller; `unschedule` the watch if the observer keeps running."""
+        if self._tree is not None:
+            self._tree.stop()
+            self._tree = None
+        if unschedule and self._watch is not None:
+            with contextlib.suppress(KeyError, OSError):
+                self.observer.unschedule(self._watch)
+            self._watch = None
+        self.poller.stop()
+
+
+def register_watches(observer, handler, logger: logging.Logger) -> WatchRegistry:
+    """Start watching an IncrementalBackupHandler's source (see WatchRegistry); the observer must be running."""
+    registry = WatchRegistry(observer, handler, handler.source, handler.watch_excluded, logger)
+    registry.start()
+    return registry
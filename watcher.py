@@ -3,21 +3,35 @@ import time
 import shutil
 import os
 from pathlib import Path
-import zipfile
-import fnmatch
 import logging
-from datetime import datetime, timedelta
+import threading
+from datetime import datetime
+from typing import Optional
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from dotenv import load_dotenv, set_key, dotenv_values
 from backup_tool.config import LOAD_CONFIG
+from backup_tool.change_journal import ChangeJournal
+from backup_tool.change_queue import WATCH_SETTLE_SECONDS, CoalescingChangeQueue
+from backup_tool.chunk_store import CDC_THRESHOLD_BYTES, chunking_enabled, recipe_path, store_chunked
+from backup_tool.copy_engine import CopyWorkerPool, copy_and_hash, fast_copy
+from backup_tool.exclude_matcher import CompiledExcludeSet, compiled_for
+from backup_tool.file_index import FileIndex
+from backup_tool.maintenance import job_scheduler
+from backup_tool.manifest import Manifest, new_hasher
+from backup_tool.object_store import ObjectStore
+from backup_tool.tail_copy import AppendTracker
+from backup_tool.tree_walker import walk_tree
+from backup_tool.watch_planner import internal_dirs, register_watches
 
 env = LOAD_CONFIG()
+BASE_BACKUP = Path(env.get("BASE_BACKUP", "backup")).resolve()
 BACKUP_DELAY = int(env.get("BACKUP_DELAY", "30"))
 EXCLUDE_EXTENSIONS = env.get("EXCLUDE_EXTENSIONS", "").split(",") if env.get("EXCLUDE_EXTENSIONS") else []
 MAX_FILE_SIZE_MB = int(env.get("MAX_FILE_SIZE_MB", "100"))
 MAX_FILE_SIZE_BYTES = MAX_FILE_SIZE_MB * 1024 * 1024
 MAX_FILE_SIZE_BYTES = MAX_FILE_SIZE_MB * 1024 * 1024
+TOMBSTONES_NAME = "tombstones.tsv"
 
 
 
@@ -26,107 +40,282 @@ def emoji(text: str) -> str:
     return text
 
 def is_excluded(rel_path: Path, patterns: list) -> bool:
-    rp = str(rel_path).replace("\\", "/")
-    for pat in patterns:
-        pat_norm = pat.rstrip("/")
-        if pat_norm.endswith("*"):
-            if fnmatch.fnmatch(rp, pat_norm):
-                return True
-        else:
-            if fnmatch.fnmatch(rp, pat_norm) or fnmatch.fnmatch(rp, pat_norm + "*"):
-                return True
-    return False
+    return compiled_for(patterns).is_excluded(rel_path)
 
 class IncrementalBackupHandler(FileSystemEventHandler):
     """
     Watches for file creation/modification events and copies only changed/created
-    files to backup destination if not excluded. Also compresses old snapshots.
+    files to backup destination if not excluded.
+    Events only mark paths dirty in a CoalescingChangeQueue; each dirty path is copied
+    once it has been quiet for WATCH_SETTLE_SECONDS, and files that keep changing are
+    held back by an adaptive cooldown of up to DELAY seconds. Large files are only
+    copied once their size and mtime stay put for WATCH_STABLE_PROBES probes, or once
+    the writer closes them. Call close() to flush.
+    With a `pool`, settled paths are copied by its worker threads; the observer thread
+    itself never copies or creates folders. Old snapshots are compressed by the
+    job's MaintenanceScheduler, never on the copy path.
+    With an `index`, files whose stat still matches the job index are not copied again
+    and every copy is recorded there. With a `manifest`, each copy is hashed in the
+    same read pass and listed in it. A file that only grew since its last copy gets
+    just its new bytes appended to the backup (see AppendTracker). Files of at least
+    CDC_THRESHOLD_MB are stored as new chunks plus a <file>.cdc recipe (see chunk_store).
+    Moves are applied as renames inside dest (copy, index row and manifest entry follow
+    the file), so renaming a folder or an editor's temp-file-then-rename save copies
+    nothing again. Deletions keep the backed-up copy and are appended to
+    dest/tombstones.tsv.
+    With a `journal`, every path that is marked dirty is also appended to the job's
+    on-disk change journal, which the final sync and crash recovery replay.
+    Events under `ignore_dirs` (the backup's own folders when they live inside the
+    source) are dropped, like those of excluded folders; on Linux those folders get
+    no watch in the first place (see WatchRegistry).
     """
-    def __init__(self, source: Path, dest: Path, exclude_patterns: list, logger: logging.Logger, compress_days: int, DELAY: int = BACKUP_DELAY):
+    def __init__(self, source: Path, dest: Path, exclude_patterns: list, logger: logging.Logger, compress_days: int, DELAY: int = BACKUP_DELAY, index: Optional[FileIndex] = None, manifest: Optional[Manifest] = None, pool: Optional[CopyWorkerPool] = None, journal: Optional[ChangeJournal] = None, ignore_dirs: Optional[list] = None):
 
         self.source = source
         self.dest = dest
         self.exclude_patterns = exclude_patterns
+        self.excludes = CompiledExcludeSet(exclude_patterns)
         self.logger = logger
-        self.last_event_time = 0
         self.compress_days = compress_days
         self.DELAY = DELAY
+        self.index = index
+        self.manifest = manifest
+        self.pool = pool
+        self.journal = journal
+        self.ignore_dirs = [d.rstrip("/") for d in (ignore_dirs or [])]
+        self.tails = AppendTracker()
+        self.chunks = ObjectStore(BASE_BACKUP) if CDC_THRESHOLD_BYTES else None
+        self._tombstone_lock = threading.Lock()
+        sink = self._submit if pool is not None else self.backup_file
+        self.queue = CoalescingChangeQueue(sink, settle=WATCH_SETTLE_SECONDS, max_cooldown=DELAY, logger=logger, probe=self._probe)
 
     def on_any_event(self, event):
-        if event.is_directory:
-            return
-
-        now = time.time()
-        if now - self.last_event_time < self.DELAY:
+        # moves and deletions are handled by on_moved / on_deleted
+        if event.event_type in ("opened", "closed_no_write", "moved", "deleted"):
             return
-        self.last_event_time = now
 
-        src_path = Path(str(event.src_path))
-        try:
-            rel = src_path.relative_to(self.source)
-        except Exception:
-            return  # outside source tree
+        rel = self._rel(event.src_path)
+        if rel is None:
+            return  # outside source tree, or our own writes
+        if event.is_directory:
+            return  # a new folder's files get events of their own
 
-        if is_excluded(rel, self.exclude_patterns):
+        if self.excludes.is_excluded(rel):
             self.logger.info(emoji("[⚠️ SKIP]") + f" Excluded: {rel}")
             return
-        if rel.suffix.lower() in [e.lower() for e in EXCLUDE_EXTENSIONS]:
+        if self.excludes.excludes_extension(rel):
             self.logger.info(f"[⚠️ SKIP EXT] {rel}")
             return
+        if self.journal is not None:
+            self.journal.record(rel)
+        self.queue.push(rel, closed=event.event_type == "closed")
+
+    def on_moved(self, event):
+        old = self._rel(event.src_path)
+        new = self._rel(event.dest_path)
+        old_tracked = old is not None and not self._ignored(old, event.is_directory)
+        new_tracked = new is not None and not self._ignored(new, event.is_directory)
+
+        if not new_tracked:
+            if old_tracked:
+                self._forget(old, event.is_directory, "moved")  # moved out of the tree or into an excluded name
+            return
+        if self.journal is not None:
+            self.journal.record(new, tree=event.is_directory)
+        if not old_tracked:
+            # moved in (e.g. an excluded temp file renamed over its target): a new file to copy
+            if event.is_directory:
+                self._run(new, self._push_tree, new)
+            else:
+                self.queue.push(new)
+            return
 
+        # Renamed inside the tree: pending events follow the file so it is copied once,
+        # under its final name; the existing backup is renamed rather than copied again.
+        pending = self.queue.rename(old, new, tree=True)
+        self._run(old, self._apply_move, old, new, pending)
+
+    def on_deleted(self, event):
+        rel = self._rel(event.src_path)
+        if rel is None or self._ignored(rel, event.is_directory):
+            return
+        self._forget(rel, event.is_directory, "deleted")
+
+    def _probe(self, rel: str):
+        """(size, mtime_ns) for the change queue's write-stability check; None if the file is gone."""
         try:
-            if rel.stat().st_size > MAX_FILE_SIZE_BYTES:
-                self.logger.info(f"[⚠️ SKIP SIZE] {rel} exceeds max size.")
-                return
-        except Exception:
-            pass
+            st = (self.source / rel).stat()
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
 
+    def _rel(self, path) -> Optional[str]:
+        """Event path → "/"-separated path relative to source, or None if outside it."""
         try:
-            if src_path.stat().st_size == 0:
+            rel = Path(str(path)).relative_to(self.source).as_posix()
+        except ValueError:
+            return None
+        return None if self.is_internal(rel) else rel
+
+    def is_internal(self, rel: str) -> bool:
+        """True for the backup's own folders inside the source (see ignore_dirs)."""
+        return any(rel == d or rel.startswith(d + "/") for d in self.ignore_dirs)
+
+    def watch_excluded(self, rel_dir: str) -> bool:
+        """Directories whose events are dropped (and never polled): excluded ones and our own."""
+        return self.excludes.excludes_dir(rel_dir) or self.is_internal(rel_dir)
+
+    def _ignored(self, rel: str, is_dir: bool) -> bool:
+        if self.excludes.is_excluded(rel):
+            return True
+        return not is_dir and self.excludes.excludes_extension(rel)
+
+    def _run(self, key: str, fn, *args):
+        """Run bookkeeping on the copy pool (ordered with copies of the same path), or inline without one."""
+        if self.pool is not None:
+            self.pool.submit(key, fn, *args)
+        else:
+            fn(*args)
+
+    def _push_tree(self, rel_dir: str):
+        for rel, _ in walk_tree(self.source / rel_dir, dir_excluded=lambda d: self.watch_excluded(f"{rel_dir}/{d}")):
+            rel = f"{rel_dir}/{rel}"
+            if not self.excludes.excludes_extension(rel):
+                self.queue.push(rel)
+
+    def _apply_move(self, old: str, new: str, pending: bool):
+        self.tails.forget(old)
+        old_path, new_path = self.dest / old, self.dest / new
+        moved = False
+        try:
+            moved = self._move_backup(old_path, new_path)
+        except OSError as e:
+            self.logger.error(f"[❌ ERROR] Renaming backup {old} → {new}: {e}")
+        if self.pool is not None:
+            self.pool.forget_dir(old_path)
+        if self.index is not None:
+            self.index.rename(old, new, tree=True)
+            self.index.flush()
+        if self.manifest is not None:
+            self.manifest.rename(old, new, tree=True)
+
+        if moved:
+            self.logger.info(emoji("[🔀 MOVED]") + f" {old} → {new}")
+        elif not pending and not new_path.exists() and (self.index is None or self.index.get(new) is None):
+            self.queue.push(new)  # nothing was backed up under the old name yet
+
+    def _move_backup(self, old_path: Path, new_path: Path) -> bool:
+        """Rename the backed-up copy; a directory is merged file by file into an existing one."""
+        if not old_path.exists():
+            if not recipe_path(old_path).is_file():
+                return False
+            old_path, new_path = recipe_path(old_path), recipe_path(new_path)  # a chunked file
+        new_path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.replace(old_path, new_path)
+            return True
+        except OSError:
+            if not (old_path.is_dir() and new_path.is_dir()):
+                raise
+        for rel, entry in walk_tree(old_path):
+            target = new_path / rel
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(entry.path, target)
+        shutil.rmtree(old_path, ignore_errors=True)
+        return True
+
+    def _forget(self, rel: str, is_dir: bool, reason: str):
+        """Drop pending work and index rows for a path that left the tree; keep its backup, record a tombstone."""
+        self.queue.discard(rel, tree=True)
+        self.tails.forget(rel)
+        if self.index is not None:
+            self.index.remove(rel, tree=True)
+            self.index.flush()
+        line = f"{datetime.now().isoformat(timespec='seconds')}\t{'dir' if is_dir else 'file'}\t{reason}\t{rel}\n"
+        try:
+            with self._tombstone_lock, open(self.dest / TOMBSTONES_NAME, "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError as e:
+            self.logger.error(f"[❌ ERROR] Recording tombstone for {rel}: {e}")
+        self.logger.info(emoji("[🪦 DELETED]") + f" {rel}")
+
+    def close(self):
+        """Hand everything still pending in the change queue to the copy path, then stop its flush thread."""
+        self.queue.close()
+
+    def _submit(self, rel_str: str):
+        self.pool.submit(rel_str, self.backup_file, rel_str)
+
+    def backup_file(self, rel_str: str):
+        """Copy one dirty path (relative to source) into dest, if it still needs it."""
+        rel = Path(rel_str)
+        src_path = self.source / rel
+        if not src_path.is_file():
+            return  # deleted, or replaced by a directory, before it settled
+
+        st = None
+        try:
+            st = src_path.stat()
+            if st.st_size > MAX_FILE_SIZE_BYTES:
+                self.logger.info(f"[⚠️ SKIP SIZE] {rel} exceeds max size.")
+                return
+            if st.st_size == 0:
                 self.logger.info(f"[⚠️ EMPTY] Skipping empty file: {rel}")
                 return
         except Exception:
             pass
 
+        if st is not None and self.index is not None and self.index.is_unchanged(rel, st):
+            return  # e.g. open/close or metadata-only events: content already backed up
+
         dest_path = self.dest / rel
-        dest_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.pool is not None:
+            self.pool.ensure_dir(dest_path.parent)
+        else:
+            dest_path.parent.mkdir(parents=True, exist_ok=True)
         try:
-            shutil.copy2(src_path, dest_path)
-            self.logger.info(emoji(f"[🗂️ COPIED]") + f" {rel} → {dest_path.relative_to(self.dest)}")
-            if self.compress_days is not None:
-                self._compress_old_snapshots()
+            digest = None
+            chunked = self.chunks is not None and st is not None and chunking_enabled(st.st_size)
+            appended = self.tails.try_append(rel_str, src_path, dest_path, st) if st is not None and not chunked else None
+            if chunked:
+                self.tails.forget(rel_str)
+                digest, _, strategy = store_chunked(src_path, dest_path, self.chunks)
+                dest_path = recipe_path(dest_path)
+            elif appended is not None:
+                delta, digest = appended
+                strategy = f"append +{delta} B"
+            elif self.manifest is not None:
+                hasher = new_hasher()
+                strategy, digest, st = copy_and_hash(src_path, dest_path, hasher=hasher)
+                self.tails.remember(rel_str, dest_path, st.st_ino, hasher)
+            else:
+                strategy = fast_copy(src_path, dest_path)
+                if st is not None:
+                    self.tails.remember(rel_str, dest_path, st.st_ino)
+            if self.chunks is not None and not chunked:
+                recipe_path(dest_path).unlink(missing_ok=True)  # shrank below the threshold since it was chunked
+            if digest is not None and st is not None and self.manifest is not None:
+                self.manifest.add(rel, st, digest)
+            if st is not None and self.index is not None:
+                self.index.update(rel, st, digest)
+                self.index.flush()
+            self.logger.info(emoji(f"[🗂️ COPIED]") + f" {rel} → {dest_path.relative_to(self.dest)} ({strategy})")
         except Exception as e:
             self.logger.error(f"[❌ ERROR] Copy failed for {rel}: {e}")
 
-    def _compress_old_snapshots(self):
-        cutoff = datetime.now() - timedelta(days=self.compress_days)
-        for item in self.dest.iterdir():
-            if item.is_dir() and item.name.startswith("snapshot_"):
-                try:
-                    ts_str = item.name[len("snapshot_"):]
-                    ts = datetime.strptime(ts_str, "%d-%m-%Y_%H-%M-%S")
-                    if ts < cutoff:
-                        zip_name = item.with_suffix(".zip")
-                        with zipfile.ZipFile(zip_name, "w", compression=zipfile.ZIP_DEFLATED) as zf:
-                            for root, _, files in os.walk(item):
-                                for f in files:
-                                    file_path = Path(root) / f
-                                    arcname = file_path.relative_to(item)
-                                    zf.write(file_path, arcname)
-                        shutil.rmtree(item)
-                        self.logger.info(f"[🗜️ COMPRESSED] {item.name} → {zip_name.name}")
-                except Exception as e:
-                    self.logger.error(f"[⚠️ ERROR] Compressing {item}: {e}")
-
 def start_watcher(source_dir: Path, backup_dir: Path, exclude_patterns: list, logger: logging.Logger, compress_days: int):
     """
     Launches a Watchdog observer that uses IncrementalBackupHandler.
     Blocks until KeyboardInterrupt.
     """
-    handler = IncrementalBackupHandler(source_dir, backup_dir, exclude_patterns, logger, compress_days, DELAY=BACKUP_DELAY)
+    pool = CopyWorkerPool(logger=logger)
+    handler = IncrementalBackupHandler(source_dir, backup_dir, exclude_patterns, logger, compress_days, DELAY=BACKUP_DELAY, pool=pool,
+                                       ignore_dirs=internal_dirs(source_dir, backup_dir))
     observer = Observer()
-    observer.schedule(handler, str(source_dir), recursive=True)
     observer.start()
+    registry = register_watches(observer, handler, logger)  # after start(), so a watch-limit error falls back to polling
+    maintenance = job_scheduler(backup_dir, logger, compress_days, busy=pool.busy)
+    maintenance.start()
     print(f"[📡 WATCHING] Source: {source_dir}\n[💾 BACKUP TO] Destination: {backup_dir}")
 
     try:
@@ -136,4 +325,8 @@ def start_watcher(source_dir: Path, backup_dir: Path, exclude_patterns: list, lo
         print("[🛑 STOPPED] Backup watcher terminated.")
         observer.stop()
     observer.join()
+    maintenance.stop()
+    registry.stop(unschedule=False)
+    handler.close()
+    pool.shutdown()
 